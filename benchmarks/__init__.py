@@ -0,0 +1,19 @@
+"""Benchmarks for pybaum that are run with `asv <https://asv.readthedocs.io>`_.
+
+The benchmarks track the runtime and the peak memory of every public function of
+pybaum for different tree shapes and leaf types. Results are stored as JSON files per
+commit in ``.asv/results`` and can be compared with ``asv compare``.
+
+asv builds an environment for each commit it benchmarks, which requires network
+access to install numpy and pandas. To run the benchmarks offline in the current
+environment, install pybaum in development mode and record the results for the
+checked out commit::
+
+    pip install -e .
+    asv machine --yes
+    asv run --python=same --set-commit-hash $(git rev-parse HEAD)
+
+Repeat the last command after checking out another commit, then compare the two
+commits with ``asv compare <commit> <other-commit>``.
+
+"""
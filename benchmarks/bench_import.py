@@ -0,0 +1,5 @@
+"""Time of importing pybaum in a fresh interpreter."""
+
+
+def timeraw_import_pybaum():
+    return "import pybaum"
@@ -0,0 +1,159 @@
+"""Benchmark every public function of pybaum."""
+import asyncio
+
+import pybaum
+from pybaum import compile_tree
+from pybaum import FlatCache
+from pybaum import get_registry
+from pybaum import leaf_names
+from pybaum import leaf_paths
+from pybaum import profile
+from pybaum import SharedTree
+from pybaum import tree_equal
+from pybaum import tree_flatten
+from pybaum import tree_flatten_with_index
+from pybaum import tree_just_flatten
+from pybaum import tree_just_yield
+from pybaum import tree_load
+from pybaum import tree_map
+from pybaum import tree_map_async
+from pybaum import tree_map_parallel
+from pybaum import tree_memoize
+from pybaum import tree_multimap
+from pybaum import tree_save
+from pybaum import tree_stack
+from pybaum import tree_structure_hash
+from pybaum import tree_to_vector
+from pybaum import tree_unflatten
+from pybaum import tree_unstack
+from pybaum import tree_update
+from pybaum import tree_yield
+from pybaum import vector_to_tree
+
+from .trees import Case
+from .trees import LEAF_TYPES
+from .trees import SHAPES
+
+
+def _identity(leaf):
+    return leaf
+
+
+def _add(leaf, other):
+    return leaf + other
+
+
+async def _async_identity(leaf):
+    return leaf
+
+
+def _tree_just_yield(case):
+    for _ in tree_just_yield(case.tree, registry=case.registry):
+        pass
+
+
+def _tree_yield(case):
+    leaves, treedef = tree_yield(case.tree, registry=case.registry)
+    for _ in leaves:
+        pass
+
+
+def _shared_tree(case):
+    with SharedTree(case.tree, registry=case.registry) as shared:
+        tree = shared.to_tree(registry=case.registry)
+        del tree
+
+
+def _flat_cache(case):
+    cache = FlatCache(case.tree, registry=case.registry)
+    path = leaf_paths(case.tree, registry=case.registry).path(0)
+    cache.update(path, cache.flat[0])
+    cache.sync()
+
+
+def _tree_flatten_with_index(case):
+    _, _, index = tree_flatten_with_index(case.tree, registry=case.registry)
+    index.offset_of(index.locate(len(index) // 2))
+
+
+def _profile(case):
+    with profile() as prof:
+        tree_map(_identity, case.tree, registry=prof.instrument(case.registry))
+
+
+FUNCTIONS = {
+    "tree_flatten": lambda case: tree_flatten(case.tree, registry=case.registry),
+    "tree_just_flatten": lambda case: tree_just_flatten(
+        case.tree, registry=case.registry
+    ),
+    "tree_just_yield": _tree_just_yield,
+    "tree_unflatten": lambda case: tree_unflatten(
+        case.treedef, case.flat, registry=case.registry
+    ),
+    "tree_map": lambda case: tree_map(_identity, case.tree, registry=case.registry),
+    "tree_multimap": lambda case: tree_multimap(
+        _add, case.tree, case.other, registry=case.registry
+    ),
+    "leaf_names": lambda case: leaf_names(case.tree, registry=case.registry),
+    "tree_equal": lambda case: tree_equal(
+        case.tree, case.other, registry=case.registry
+    ),
+    "tree_update": lambda case: tree_update(
+        case.tree, case.update, registry=case.registry
+    ),
+    "tree_yield": _tree_yield,
+    "get_registry": lambda case: get_registry(types=case.registry_types),
+    "compile_tree": lambda case: compile_tree(case.tree, registry=case.registry),
+    "tree_to_vector": lambda case: tree_to_vector(case.tree, registry=case.registry),
+    "vector_to_tree": lambda case: vector_to_tree(case.vector, case.vector_treedef),
+    "tree_map_parallel": lambda case: tree_map_parallel(
+        _identity, case.tree, max_workers=2, registry=case.registry
+    ),
+    "tree_map_async": lambda case: asyncio.run(
+        tree_map_async(_async_identity, case.tree, registry=case.registry)
+    ),
+    "leaf_paths": lambda case: leaf_paths(case.tree, registry=case.registry),
+    "profile": _profile,
+    "tree_structure_hash": lambda case: tree_structure_hash(
+        case.tree, registry=case.registry
+    ),
+    "tree_memoize": lambda case: tree_memoize(_identity, registry=case.registry)(
+        case.tree
+    ),
+    "tree_save": lambda case: tree_save(case.path, case.tree, registry=case.registry),
+    "tree_load": lambda case: tree_load(case.path, registry=case.registry),
+    "SharedTree": _shared_tree,
+    "FlatCache": _flat_cache,
+    "tree_flatten_with_index": _tree_flatten_with_index,
+    "tree_stack": lambda case: tree_stack(
+        [case.tree, case.other], registry=case.registry
+    ),
+    "tree_unstack": lambda case: tree_unstack(case.stacked, registry=case.registry),
+}
+
+if set(FUNCTIONS) != set(pybaum.__all__):
+    raise ValueError(
+        "The benchmarks must cover exactly the public functions of pybaum. Missing: "
+        f"{sorted(set(pybaum.__all__) - set(FUNCTIONS))}."
+    )
+
+
+class PublicAPI:
+    """Runtime and peak memory of the public functions for all trees."""
+
+    params = (list(FUNCTIONS), SHAPES, LEAF_TYPES)
+    param_names = ["function", "shape", "leaf_type"]
+    timeout = 300
+
+    def setup(self, function, shape, leaf_type):
+        self.case = Case(shape, leaf_type)
+        self.func = FUNCTIONS[function]
+
+    def teardown(self, function, shape, leaf_type):  # noqa: U100
+        self.case.cleanup()
+
+    def time_call(self, function, shape, leaf_type):  # noqa: U100
+        self.func(self.case)
+
+    def peakmem_call(self, function, shape, leaf_type):  # noqa: U100
+        self.func(self.case)
@@ -0,0 +1,53 @@
+"""Compare sending pytrees through shared memory with pickling them."""
+import pickle
+
+import numpy as np
+from pybaum import SharedTree
+
+N_ARRAYS = 8
+
+
+class SharedTreeVsPickle:
+    """Send a pytree of arrays to another process and reconstruct it there.
+
+    The transfer is simulated in one process by pickling and unpickling. For
+    "shared", the pickle only contains the header and the pytree is reconstructed from
+    the shared memory block, for "pickle" the whole pytree is pickled.
+
+    """
+
+    params = ([10, 100, 1000], ["pickle", "shared"])
+    param_names = ["megabytes", "transport"]
+    timeout = 600
+
+    def setup(self, megabytes, transport):
+        size = megabytes * 2**20 // 8 // N_ARRAYS
+        self.tree = {
+            f"a{i}": [np.full(size, float(i)), {"scale": i}] for i in range(N_ARRAYS)
+        }
+        self.shared = SharedTree(self.tree) if transport == "shared" else None
+
+    def teardown(self, megabytes, transport):  # noqa: U100
+        if self.shared is not None:
+            self.shared.close()
+            self.shared.unlink()
+
+    def _round_trip(self):
+        if self.shared is None:
+            pickle.loads(pickle.dumps(self.tree, protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            received = pickle.loads(pickle.dumps(self.shared))
+            received.to_tree()
+            received.close()
+
+    def time_round_trip(self, megabytes, transport):  # noqa: U100
+        self._round_trip()
+
+    def peakmem_round_trip(self, megabytes, transport):  # noqa: U100
+        self._round_trip()
+
+    def time_create(self, megabytes, transport):  # noqa: U100
+        if self.shared is None:
+            pickle.dumps(self.tree, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            SharedTree(self.tree).__exit__()
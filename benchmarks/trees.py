@@ -0,0 +1,147 @@
+"""Create the pytrees used in the benchmarks."""
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pybaum import get_registry
+from pybaum import tree_flatten
+from pybaum import tree_map
+from pybaum import tree_save
+from pybaum import tree_stack
+from pybaum import tree_to_vector
+from pybaum.config import IS_JAX_INSTALLED
+
+SHAPES = ["wide", "deep", "balanced"]
+
+LEAF_TYPES = ["scalars", "numpy", "pandas", "namedtuples", "jax"]
+
+N_POSITIONS = 1000
+"""Number of positions in a tree. Each position contains one leaf object."""
+
+BRANCHING = 10
+"""Number of children per container in balanced trees."""
+
+ARRAY_SIZE = 10
+"""Number of elements of numpy arrays, pandas objects and jax arrays."""
+
+REGISTRY_TYPES = {
+    "scalars": [],
+    "numpy": ["numpy.ndarray"],
+    "pandas": ["pandas.Series", "pandas.DataFrame"],
+    "namedtuples": [],
+    "jax": ["jax.numpy.ndarray"],
+}
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+class Case:
+    """A pytree with a shape and leaf type and precomputed inputs for benchmarks.
+
+    Args:
+        shape (str): One of ``SHAPES``.
+        leaf_type (str): One of ``LEAF_TYPES``.
+
+    Raises:
+        NotImplementedError: If the leaf type is "jax" and jax is not installed. asv
+            skips benchmarks whose setup raises a NotImplementedError.
+
+    """
+
+    def __init__(self, shape, leaf_type):
+        if leaf_type == "jax" and not IS_JAX_INSTALLED:
+            raise NotImplementedError("jax is not installed.")
+        self.registry_types = REGISTRY_TYPES[leaf_type]
+        self.registry = get_registry(types=self.registry_types)
+        self.tree = make_tree(shape, leaf_type)
+        self.other = make_tree(shape, leaf_type)
+        self.update = tree_map(_add_one, self.tree, registry=self.registry)
+        self.flat, self.treedef = tree_flatten(self.tree, registry=self.registry)
+        self.vector, self.vector_treedef = tree_to_vector(
+            self.tree, registry=self.registry
+        )
+        self.stacked = tree_stack([self.tree, self.other], registry=self.registry)
+        handle, self.path = tempfile.mkstemp(suffix=".pybaum")
+        os.close(handle)
+        tree_save(self.path, self.tree, registry=self.registry)
+
+    def cleanup(self):
+        """Remove the file to which the tree was saved."""
+        os.remove(self.path)
+
+
+def make_tree(shape, leaf_type):
+    """Create a pytree with ``N_POSITIONS`` leaf objects.
+
+    Args:
+        shape (str): "wide" for a flat dictionary, "deep" for nested lists with one leaf
+            object per level and "balanced" for nested dictionaries with ``BRANCHING``
+            children per container.
+        leaf_type (str): One of ``LEAF_TYPES``.
+
+    Returns:
+        The pytree.
+
+    """
+    make_leaf = _leaf_factory(leaf_type)
+    if shape == "wide":
+        out = {f"a{i}": make_leaf(i) for i in range(N_POSITIONS)}
+    elif shape == "deep":
+        out = [make_leaf(0)]
+        for i in range(1, N_POSITIONS):
+            out = [make_leaf(i), out]
+    elif shape == "balanced":
+        positions = iter(range(N_POSITIONS))
+        out = _balanced(N_POSITIONS, positions, make_leaf)
+    else:
+        raise ValueError(f"Unknown shape {shape!r}.")
+    return out
+
+
+def _balanced(n_positions, positions, make_leaf):
+    if n_positions <= BRANCHING:
+        out = {f"a{i}": make_leaf(next(positions)) for i in range(n_positions)}
+    else:
+        size = -(-n_positions // BRANCHING)
+        out = {}
+        for i, start in enumerate(range(0, n_positions, size)):
+            n_children = min(size, n_positions - start)
+            out[f"a{i}"] = _balanced(n_children, positions, make_leaf)
+    return out
+
+
+def _leaf_factory(leaf_type):
+    if leaf_type == "scalars":
+        out = float
+    elif leaf_type == "numpy":
+        base = np.arange(ARRAY_SIZE, dtype=np.float64)
+        out = base.__add__
+    elif leaf_type == "pandas":
+        series = pd.Series(np.arange(ARRAY_SIZE, dtype=np.float64))
+        frame = pd.DataFrame(
+            np.arange(ARRAY_SIZE, dtype=np.float64).reshape(-1, 2),
+            columns=["value", "lower_bound"],
+        )
+
+        def out(i):
+            return series + i if i % 2 == 0 else frame + i
+
+    elif leaf_type == "namedtuples":
+
+        def out(i):
+            return Point(x=float(i), y=float(-i))
+
+    elif leaf_type == "jax":
+        import jax.numpy as jnp
+
+        base = jnp.arange(ARRAY_SIZE, dtype=jnp.float32)
+        out = base.__add__
+    else:
+        raise ValueError(f"Unknown leaf type {leaf_type!r}.")
+    return out
+
+
+def _add_one(leaf):
+    return leaf + 1
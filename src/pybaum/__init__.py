@@ -1,4 +1,18 @@
+from pybaum.compiled import compile_tree
+from pybaum.flat_cache import FlatCache
+from pybaum.hashing import tree_structure_hash
+from pybaum.leaf_index import tree_flatten_with_index
+from pybaum.memoize import tree_memoize
+from pybaum.parallel import tree_map_async
+from pybaum.parallel import tree_map_parallel
+from pybaum.paths import leaf_paths
+from pybaum.profiling import profile
 from pybaum.registry import get_registry
+from pybaum.serialization import tree_load
+from pybaum.serialization import tree_save
+from pybaum.shared import SharedTree
+from pybaum.stacking import tree_stack
+from pybaum.stacking import tree_unstack
 from pybaum.tree_util import leaf_names
 from pybaum.tree_util import tree_equal
 from pybaum.tree_util import tree_flatten
@@ -6,9 +20,11 @@ from pybaum.tree_util import tree_just_flatten
 from pybaum.tree_util import tree_just_yield
 from pybaum.tree_util import tree_map
 from pybaum.tree_util import tree_multimap
+from pybaum.tree_util import tree_to_vector
 from pybaum.tree_util import tree_unflatten
 from pybaum.tree_util import tree_update
 from pybaum.tree_util import tree_yield
+from pybaum.tree_util import vector_to_tree
 
 
 __all__ = [
@@ -23,4 +39,20 @@ __all__ = [
     "tree_update",
     "tree_yield",
     "get_registry",
+    "compile_tree",
+    "tree_to_vector",
+    "vector_to_tree",
+    "tree_map_parallel",
+    "tree_map_async",
+    "leaf_paths",
+    "profile",
+    "tree_structure_hash",
+    "tree_memoize",
+    "tree_save",
+    "tree_load",
+    "SharedTree",
+    "FlatCache",
+    "tree_flatten_with_index",
+    "tree_stack",
+    "tree_unstack",
 ]
@@ -0,0 +1,272 @@
+"""Compile flatten and unflatten functions for a fixed pytree structure.
+
+The generic functions in :mod:`pybaum.tree_util` determine the type of every node and
+look it up in the registry each time they are called. If many trees with the same
+structure are flattened and unflattened, this work can be done once. The functions in
+this module translate a :class:`~pybaum.treedef.PyTreeDef` into the source code of
+functions that only contain the operations needed for exactly this structure, similar
+to how :func:`collections.namedtuple` creates classes.
+
+"""
+from collections import OrderedDict
+from operator import itemgetter
+
+from pybaum.registry_entries import _unflatten_dict
+from pybaum.registry_entries import _unflatten_list
+from pybaum.registry_entries import _unflatten_namedtuple
+from pybaum.registry_entries import _unflatten_ordereddict
+from pybaum.registry_entries import _unflatten_tuple
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _tree_structure
+from pybaum.treedef import PyTreeDef
+
+COMPILE_CACHE_SIZE = 128
+
+_PLAN_CACHE = OrderedDict()
+
+_MAPPING_UNFLATTEN = (_unflatten_dict, _unflatten_ordereddict)
+
+_SEQUENCE_UNFLATTEN = (_unflatten_list, _unflatten_tuple, _unflatten_namedtuple)
+
+
+class CompiledTree:
+    """Flatten and unflatten functions for pytrees with a fixed structure.
+
+    Instances are created by :func:`compile_tree`. No checks are done that the
+    trees passed to :meth:`flatten` have the compiled structure, except that the
+    number of leaves matches.
+
+    Args:
+        treedef (PyTreeDef): The structure for which the plan is compiled.
+        registry (dict): The pytree registry used to create ``treedef``.
+
+    """
+
+    __slots__ = ("treedef", "_flatten", "_unflatten")
+
+    def __init__(self, treedef, registry):
+        self.treedef = treedef
+        self._flatten, self._unflatten = _compile(treedef, registry)
+
+    def flatten(self, tree):
+        """Flatten a pytree with the compiled structure.
+
+        Args:
+            tree: A pytree with the compiled structure.
+
+        Returns:
+            list: The leaves of ``tree``.
+
+        """
+        out = self._flatten(tree)
+        if len(out) != self.treedef.num_leaves:
+            raise ValueError("The tree does not have the compiled structure.")
+        return out
+
+    def unflatten(self, leaves):
+        """Reconstruct a pytree with the compiled structure.
+
+        Args:
+            leaves (list): The leaves of the pytree.
+
+        Returns:
+            The reconstructed pytree.
+
+        """
+        if not isinstance(leaves, list):
+            leaves = list(leaves)
+        if len(leaves) != self.treedef.num_leaves:
+            raise ValueError(
+                f"Treedef has {self.treedef.num_leaves} leaves but got {len(leaves)} "
+                "leaves."
+            )
+        return self._unflatten(leaves)
+
+
+def compile_tree(structure, is_leaf=None, registry=None):
+    """Compile fast flatten and unflatten functions for a pytree structure.
+
+    Compiled plans are cached in a least recently used cache with
+    ``COMPILE_CACHE_SIZE`` entries, keyed by the treedef and the identity of the
+    registry.
+
+    Args:
+        structure: A :class:`~pybaum.treedef.PyTreeDef` or a pytree with the
+            structure for which the functions are compiled.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf. Ignored
+            if ``structure`` is a treedef.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        CompiledTree: Object with ``flatten`` and ``unflatten`` methods.
+
+    """
+    registry = _process_pytree_registry(registry)
+
+    if isinstance(structure, PyTreeDef):
+        treedef = structure
+    else:
+        is_leaf = _process_is_leaf(is_leaf)
+        treedef = _tree_structure(structure, is_leaf=is_leaf, registry=registry)
+
+    key = (treedef, id(registry))
+    cached = _PLAN_CACHE.get(key)
+    if cached is not None and cached[0] is registry:
+        _PLAN_CACHE.move_to_end(key)
+        plan = cached[1]
+    else:
+        plan = CompiledTree(treedef, registry)
+        _PLAN_CACHE[key] = (registry, plan)
+        if len(_PLAN_CACHE) > COMPILE_CACHE_SIZE:
+            _PLAN_CACHE.popitem(last=False)
+    return plan
+
+
+def _compile(treedef, registry):
+    """Generate and execute the source code of the flatten and unflatten functions.
+
+    Both functions are straight-line code with one statement per container node. The
+    objects they need, i.e. registry functions, auxiliary data and dictionary keys
+    without a literal representation, are looked up in the namespace of the
+    generated functions.
+
+    """
+    namespace = {}
+    source = _flatten_source(treedef, registry, namespace) + _unflatten_source(
+        treedef, namespace
+    )
+    exec(source, namespace)  # noqa: S102
+    return namespace["flatten"], namespace["unflatten"]
+
+
+def _flatten_source(treedef, registry, namespace):
+    root = _nest(treedef)
+    if root[1].node_type is None:
+        return "def flatten(tree):\n    return [tree]\n"
+
+    lines = ["def flatten(tree):"]
+    items = [None] * treedef.num_leaves
+    stack = [("tree", root)]
+    while stack:
+        var, (node_id, node, start, children) = stack.pop()
+        if node.num_leaves > 0 and not children:
+            namespace[f"_b{node_id}"] = registry[node.node_type]["flatten_block"]
+            items[start] = f"*_b{node_id}({var})[0]"
+            continue
+        elif not children:
+            continue
+        is_flat = all(child[1].node_type is None for child in children)
+
+        if node.unflatten in _MAPPING_UNFLATTEN:
+            if is_flat and len(children) > 1:
+                namespace[f"_g{node_id}"] = itemgetter(*node.aux_data)
+                items[start] = f"*_g{node_id}({var})"
+                continue
+            accessors = [f"{var}[{_constant(k, namespace)}]" for k in node.aux_data]
+        elif node.unflatten in _SEQUENCE_UNFLATTEN:
+            if is_flat:
+                items[start] = f"*{var}"
+                continue
+            accessors = [f"{var}[{i}]" for i in range(len(children))]
+        else:
+            namespace[f"_f{node_id}"] = registry[node.node_type]["flatten"]
+            if is_flat:
+                items[start] = f"*_f{node_id}({var})[0]"
+                continue
+            lines.append(f"    c{node_id} = _f{node_id}({var})[0]")
+            accessors = [f"c{node_id}[{i}]" for i in range(len(children))]
+
+        for accessor, child in zip(accessors, children):
+            if child[1].node_type is None:
+                items[child[2]] = accessor
+            else:
+                lines.append(f"    n{child[0]} = {accessor}")
+                stack.append((f"n{child[0]}", child))
+
+    items = ", ".join(item for item in items if item is not None)
+    lines.append(f"    return [{items}]")
+    return "\n".join(lines) + "\n"
+
+
+def _unflatten_source(treedef, namespace):
+    lines = ["def unflatten(leaves):"]
+    stack = []
+    position = 0
+    for node_id, node in enumerate(treedef._nodes):
+        if node.node_type is None:
+            stack.append((f"leaves[{position}]", True))
+            position += 1
+            continue
+        elif node.num_children == 0:
+            position += node.num_leaves
+
+        children = stack[len(stack) - node.num_children :]
+        del stack[len(stack) - node.num_children :]
+        is_flat = all(child[1] for child in children)
+        flat_expr = f"leaves[{position - node.num_leaves}:{position}]"
+        exprs = [child[0] for child in children]
+
+        if node.unflatten is _unflatten_list:
+            expr = flat_expr if is_flat else f"[{', '.join(exprs)}]"
+        elif node.unflatten is _unflatten_tuple:
+            expr = f"tuple({flat_expr})" if is_flat else f"({', '.join(exprs)},)"
+        elif node.unflatten is _unflatten_dict:
+            keys = [_constant(key, namespace) for key in node.aux_data]
+            items = ", ".join(f"{key}: {expr}" for key, expr in zip(keys, exprs))
+            expr = f"{{{items}}}"
+        else:
+            namespace[f"_u{node_id}"] = node.unflatten
+            namespace[f"_a{node_id}"] = node.aux_data
+            children_expr = flat_expr if is_flat else f"[{', '.join(exprs)}]"
+            expr = f"_u{node_id}(_a{node_id}, {children_expr})"
+
+        lines.append(f"    n{node_id} = {expr}")
+        stack.append((f"n{node_id}", False))
+
+    lines.append(f"    return {stack[0][0]}")
+    return "\n".join(lines) + "\n"
+
+
+def _nest(treedef):
+    """Convert the post-order nodes of a treedef to nested tuples.
+
+    Each tuple contains the position of the node in the treedef, the node, the
+    position of its first leaf and the list of its children.
+
+    """
+    stack = []
+    position = 0
+    for node_id, node in enumerate(treedef._nodes):
+        if node.node_type is None:
+            stack.append((node_id, node, position, []))
+            position += 1
+        else:
+            if node.num_children == 0:
+                position += node.num_leaves
+            children = stack[len(stack) - node.num_children :]
+            del stack[len(stack) - node.num_children :]
+            stack.append((node_id, node, position - node.num_leaves, children))
+    return stack[0]
+
+
+def _constant(value, namespace):
+    """Get an expression that evaluates to value in the generated code."""
+    if type(value) in (str, int):
+        out = repr(value)
+    else:
+        out = f"_k{len(namespace)}"
+        namespace[out] = value
+    return out
@@ -1,23 +1,14 @@
-try:
-    import numpy as np  # noqa: F401
-except ImportError:
-    IS_NUMPY_INSTALLED = False
-else:
-    IS_NUMPY_INSTALLED = True
+"""Detect optional dependencies without importing them.
 
+The heavy optional dependencies are only imported once a registry entry or equality
+checker that needs them is used.
 
-try:
-    import pandas as pd  # noqa: F401
-except ImportError:
-    IS_PANDAS_INSTALLED = False
-else:
-    IS_PANDAS_INSTALLED = True
+"""
+from importlib.util import find_spec
 
 
-try:
-    import jax  # noqa: F401
-    import jaxlib  # noqa: F401
-except ImportError:
-    IS_JAX_INSTALLED = False
-else:
-    IS_JAX_INSTALLED = True
+IS_NUMPY_INSTALLED = find_spec("numpy") is not None
+
+IS_PANDAS_INSTALLED = find_spec("pandas") is not None
+
+IS_JAX_INSTALLED = find_spec("jax") is not None and find_spec("jaxlib") is not None
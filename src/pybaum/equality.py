@@ -1,27 +1,138 @@
 """Functions to check equality of pytree leaves."""
+import sys
+
 from pybaum.config import IS_JAX_INSTALLED
 from pybaum.config import IS_NUMPY_INSTALLED
 from pybaum.config import IS_PANDAS_INSTALLED
 
 
-if IS_NUMPY_INSTALLED:
-    import numpy as np
+_CHECKERS_CACHE = {}
+
+
+def get_equality_checkers():
+    """Get the default equality checkers for leaves of optional array libraries.
+
+    Checkers are only created for libraries that are already imported. If a library is
+    not imported, a pytree cannot contain its objects, so there is no need to import it.
+
+    Returns:
+        dict: Dictionary where keys are types and values are functions which assess
+        equality for the type of object.
+
+    """
+    loaded = _loaded_libraries()
+    out = _CHECKERS_CACHE.get(loaded)
+    if out is None:
+        out = {}
+        if loaded[0]:
+            import numpy as np
+
+            out[np.ndarray] = lambda a, b: bool((a == b).all())
+
+        if loaded[1]:
+            import pandas as pd
+
+            out[pd.Series] = lambda a, b: a.equals(b)
+            out[pd.DataFrame] = lambda a, b: a.equals(b)
+
+        if loaded[2]:
+            out["jax.numpy.ndarray"] = lambda a, b: bool((a == b).all())
+
+        _CHECKERS_CACHE[loaded] = out
+    return out
+
+
+def get_tolerance_checkers(rtol, atol):
+    """Get equality checkers that allow for numerical tolerance.
+
+    Two numbers a and b are considered equal if ``abs(a - b) <= atol + rtol * abs(b)``,
+    which is the criterion of :func:`numpy.allclose`. Arrays need to have the same
+    shape. Numeric arrays are compared with :func:`numpy.allclose`, arrays of all other
+    dtypes, e.g. strings or objects, need to be exactly equal. pandas objects in
+    addition need to have equal labels and are compared column by column. As for
+    :func:`get_equality_checkers`, only checkers for libraries that are already imported
+    are created.
+
+    Args:
+        rtol (float): Relative tolerance.
+        atol (float): Absolute tolerance.
+
+    Returns:
+        tuple: Dictionary where keys are types and values are functions which assess
+        equality for the type of object, and the function for all other objects.
+
+    """
+    loaded = _loaded_libraries()
+    out = {}
+
+    def scalar_close(a, b):
+        try:
+            equal = a == b or abs(a - b) <= atol + rtol * abs(b)
+        except TypeError:
+            equal = a == b
+        return bool(equal)
+
+    def is_numeric(dtype):
+        return isinstance(dtype, np.dtype) and dtype.kind in "iufc"
+
+    def array_close(a, b):
+        if a.shape != b.shape:
+            equal = False
+        elif is_numeric(a.dtype) and is_numeric(b.dtype):
+            equal = np.allclose(a, b, rtol=rtol, atol=atol)
+        else:
+            equal = (a == b).all()
+        return bool(equal)
+
+    def column_close(a, b):
+        if is_numeric(a.dtype) and is_numeric(b.dtype):
+            equal = array_close(a.to_numpy(), b.to_numpy())
+        else:
+            equal = a.equals(b)
+        return equal
+
+    def labeled_close(a, b):
+        if not a.index.equals(b.index):
+            equal = False
+        elif a.ndim == 1:
+            equal = column_close(a, b)
+        else:
+            equal = a.columns.equals(b.columns) and all(
+                column_close(a.iloc[:, i], b.iloc[:, i]) for i in range(a.shape[1])
+            )
+        return equal
+
+    if loaded[0] or loaded[2]:
+        import numpy as np
 
+    if loaded[0]:
+        out[np.ndarray] = array_close
 
-if IS_PANDAS_INSTALLED:
-    import pandas as pd
+    if loaded[1]:
+        import pandas as pd
 
-EQUALITY_CHECKERS = {}
+        out[pd.Series] = labeled_close
+        out[pd.DataFrame] = labeled_close
 
+    if loaded[2]:
+        out["jax.numpy.ndarray"] = array_close
 
-if IS_NUMPY_INSTALLED:
-    EQUALITY_CHECKERS[np.ndarray] = lambda a, b: bool((a == b).all())
+    return out, scalar_close
 
 
-if IS_PANDAS_INSTALLED:
-    EQUALITY_CHECKERS[pd.Series] = lambda a, b: a.equals(b)
-    EQUALITY_CHECKERS[pd.DataFrame] = lambda a, b: a.equals(b)
+def _loaded_libraries():
+    """Check which optional array libraries are installed and imported."""
+    out = (
+        IS_NUMPY_INSTALLED and "numpy" in sys.modules,
+        IS_PANDAS_INSTALLED and "pandas" in sys.modules,
+        IS_JAX_INSTALLED and "jax" in sys.modules,
+    )
+    return out
 
 
-if IS_JAX_INSTALLED:
-    EQUALITY_CHECKERS["jax.numpy.ndarray"] = lambda a, b: bool((a == b).all())
+def __getattr__(name):
+    if name == "EQUALITY_CHECKERS":
+        out = get_equality_checkers()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return out
@@ -0,0 +1,181 @@
+"""Keep the flattened leaves of a pytree up to date when parts of it change.
+
+A :class:`FlatCache` flattens a pytree once and looks up the range of leaves of every
+subtree in its :class:`~pybaum.leaf_index.LeafIndex`. Replacing a subtree with one of
+the same structure only replaces its range of leaves, so the cost of an update is
+proportional to the size of the replaced subtree and not to the size of the pytree.
+The changed positions are tracked until they are collected with :meth:`FlatCache.sync`.
+
+"""
+from pybaum.leaf_index import _tree_flatten_with_index
+from pybaum.registry import get_dispatch_table
+from pybaum.tree_util import _container_entry
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _tree_flatten_with_treedef
+from pybaum.treedef import PyTreeDef
+
+
+class FlatCache:
+    """The flattened leaves of a pytree that can be updated by path.
+
+    A path is a tuple with the names of the children that lead from the root to a
+    subtree, as returned by :meth:`pybaum.paths.LeafPaths.path`. Components that are
+    not strings are converted with ``str``, e.g. ``("a", 0)`` is equal to
+    ``("a", "0")``.
+
+    Example:
+
+    >>> cache = FlatCache({"a": [1, 2], "b": {"c": 3}})
+    >>> cache.update(("a", 1), 20)
+    >>> cache.update(("b",), {"c": 30})
+    >>> cache.flat
+    [1, 20, 30]
+    >>> cache.sync()
+    [1, 2]
+    >>> cache.tree()
+    {'a': [1, 20], 'b': {'c': 30}}
+
+    Args:
+        tree: a pytree.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Attributes:
+        flat (list): The leaves of the current pytree. Should not be modified.
+        treedef (PyTreeDef): The structure of the pytree, which does not change.
+        index (LeafIndex): The index of the positions of the leaves.
+
+    """
+
+    def __init__(self, tree, is_leaf=None, registry=None):
+        self._registry = _process_pytree_registry(registry)
+        self._is_leaf = _process_is_leaf(is_leaf)
+        self.flat, self.treedef, self.index = _tree_flatten_with_index(
+            tree, self._is_leaf, self._registry
+        )
+        self._dirty = []
+
+    def __len__(self):
+        return len(self.flat)
+
+    def __getitem__(self, path):
+        start, stop, node_id = self.index._locate(path)
+        if node_id is None:
+            out = self.flat[start]
+        else:
+            out = self._subtreedef(node_id).unflatten(self.flat[start:stop])
+        return out
+
+    def offset(self, path):
+        """Get the range of flat positions of the leaves of a subtree.
+
+        Args:
+            path (tuple): The path of the subtree.
+
+        Returns:
+            tuple: The start and stop of the range.
+
+        """
+        start, stop, _ = self.index._locate(path)
+        return start, stop
+
+    def update(self, path, value):
+        """Replace a subtree by a subtree with the same structure.
+
+        Args:
+            path (tuple): The path of the subtree.
+            value: The new subtree. Needs to have the same treedef as the old one.
+
+        Raises:
+            KeyError: If there is no subtree with this path.
+            ValueError: If the structure of value differs from the old subtree.
+
+        """
+        start, stop, node_id = self.index._locate(path)
+        if node_id is None:
+            entry = _container_entry(
+                value, self._is_leaf, self._registry, get_dispatch_table(self._registry)
+            )
+            if entry is not None:
+                raise ValueError(
+                    f"The subtree at {tuple(path)} is a leaf, but the new value is a "
+                    "container."
+                )
+            self.flat[start] = value
+        else:
+            leaves, treedef = _tree_flatten_with_treedef(
+                value, self._is_leaf, self._registry
+            )
+            if treedef != self._subtreedef(node_id):
+                raise ValueError(
+                    f"The new value has the structure {treedef}, but the subtree at "
+                    f"{tuple(path)} has the structure {self._subtreedef(node_id)}."
+                )
+            self.flat[start:stop] = leaves
+        if stop > start:
+            self._dirty.append((start, stop))
+
+    def tree(self):
+        """Reconstruct the current pytree.
+
+        Returns:
+            The pytree.
+
+        """
+        return self.treedef.unflatten(self.flat)
+
+    def dirty_ranges(self):
+        """Get the ranges of flat positions that changed since the last sync.
+
+        Returns:
+            list: Sorted list of non-overlapping (start, stop) tuples.
+
+        """
+        out = []
+        for start, stop in sorted(self._dirty):
+            if out and start <= out[-1][1]:
+                out[-1] = (out[-1][0], max(out[-1][1], stop))
+            else:
+                out.append((start, stop))
+        self._dirty = list(out)
+        return out
+
+    def dirty(self):
+        """Get the flat positions that changed since the last sync.
+
+        Returns:
+            list: Sorted list of positions.
+
+        """
+        out = []
+        for start, stop in self.dirty_ranges():
+            out.extend(range(start, stop))
+        return out
+
+    def sync(self):
+        """Get the flat positions that changed since the last sync and reset them.
+
+        Returns:
+            list: Sorted list of positions.
+
+        """
+        out = self.dirty()
+        self._dirty = []
+        return out
+
+    def _subtreedef(self, node_id):
+        nodes = self.treedef._nodes
+        return PyTreeDef(nodes[node_id - nodes[node_id].num_nodes + 1 : node_id + 1])
@@ -0,0 +1,280 @@
+"""Compute fingerprints of the structure of pytrees.
+
+The fingerprint is a :func:`hashlib.blake2b` digest of the node types, the auxiliary
+data of all containers, e.g. dict keys, namedtuple classes, array shapes and pandas
+indices, and the shapes and dtypes of leaves that are arrays. Leaves that are pandas
+objects in addition contribute their index and column labels. Arrays and pandas objects
+are never flattened element by element, even if they are registered as containers. The
+values of leaves are never hashed. In contrast to ``hash(treedef)``, the fingerprint
+does not depend on the Python process, so it can be stored or used as a cache key
+across runs.
+
+"""
+import hashlib
+import sys
+from collections import OrderedDict
+
+from pybaum.registry import get_dispatch_table
+from pybaum.tree_util import _container_entry
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _tree_flatten_with_treedef
+from pybaum.typecheck import _is_array
+from pybaum.typecheck import _is_pandas_object
+from pybaum.typecheck import _whole_is_leaf
+from pybaum.typecheck import get_type
+
+DIGEST_SIZE = 16
+
+INDEX_CHUNK_SIZE = 2**16
+"""int: Number of elements of a pandas Index that are hashed at once."""
+
+INDEX_DIGEST_CACHE_SIZE = 32
+
+_INDEX_DIGESTS = OrderedDict()
+
+
+def tree_structure_hash(tree, is_leaf=None, registry=None):
+    """Compute a fingerprint of the structure of a pytree.
+
+    Two pytrees with equal treedefs and leaves of the same shapes and dtypes have the
+    same fingerprint. The fingerprint is stable across Python processes as long as the
+    auxiliary data of the registry entries consists of None, booleans, numbers,
+    strings, bytes, types, tuples, lists, dicts and pandas indices. Other objects are
+    represented by their ``repr``.
+
+    Args:
+        tree: a pytree.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        str: Hexadecimal digest with ``2 * DIGEST_SIZE`` characters.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    out = _tree_digest(tree, is_leaf, registry).hexdigest()
+    return out
+
+
+def _tree_digest(tree, is_leaf, registry, values=False, pinned=None):
+    """Feed the structure and optionally the leaf values of a pytree into a digest.
+
+    Args:
+        tree: a pytree.
+        is_leaf (callable): See :func:`tree_structure_hash`.
+        registry (dict): A pytree registry.
+        values (bool): Whether leaves are hashed by value, see :func:`_update_value`.
+            Otherwise, only the shapes and dtypes of array leaves are hashed.
+        pinned (list or None): Receives the leaves that are hashed by identity if
+            ``values`` is True.
+
+    Returns:
+        hashlib.blake2b: The digest.
+
+    """
+    leaves, treedef = _tree_flatten_with_treedef(
+        tree, _whole_is_leaf(is_leaf), registry
+    )
+    dispatch = get_dispatch_table(registry)
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    # Converting dtypes to strings is slow, so it is done once per dtype.
+    dtype_strings = {}
+    leaf_iter = iter(leaves)
+    for node in treedef._nodes:
+        if node.node_type is None:
+            leaf = next(leaf_iter)
+            if _container_entry(leaf, is_leaf, registry, dispatch) is not None:
+                # Registered arrays and pandas objects are hashed like containers,
+                # such that they are distinguished from leaves.
+                _update(digest, get_type(leaf))
+                _update(digest, _whole_aux_data(leaf))
+            if values:
+                _update_value(digest, leaf, pinned)
+                continue
+            shape = getattr(leaf, "shape", None)
+            dtype = getattr(leaf, "dtype", None)
+            if _is_pandas_object(leaf):
+                digest.update(b"p")
+                _update(digest, _pandas_structure(leaf, dtype_strings))
+            elif shape is None or dtype is None:
+                digest.update(b"*")
+            else:
+                dtype_string = _dtype_string(dtype, dtype_strings)
+                digest.update(f"a{tuple(shape)}{dtype_string};".encode())
+        else:
+            _update(digest, node.node_type)
+            _update(digest, (node.num_children, node.num_leaves))
+            _update(digest, node.aux_data)
+    return digest
+
+
+def _whole_aux_data(obj):
+    """Describe the structure of an array or pandas object that is a container."""
+    if _is_pandas_object(obj):
+        labels = obj.columns if obj.ndim == 2 else obj.name
+        out = (tuple(obj.shape), obj.index, labels)
+    else:
+        out = tuple(obj.shape)
+    return out
+
+
+def _pandas_structure(obj, dtype_strings):
+    """Describe the shape, labels and dtypes of a pandas object that is a leaf."""
+    if obj.ndim == 2:
+        labels = obj.columns
+        dtypes = [_dtype_string(dtype, dtype_strings) for dtype in obj.dtypes]
+    else:
+        labels = obj.name
+        dtypes = [_dtype_string(obj.dtype, dtype_strings)]
+    out = (type(obj), tuple(obj.shape), obj.index, labels, dtypes)
+    return out
+
+
+def _dtype_string(dtype, dtype_strings):
+    """Convert a dtype to a string, using the strings in dtype_strings as cache."""
+    out = dtype_strings.get(dtype)
+    if out is None:
+        out = dtype_strings[dtype] = str(dtype)
+    return out
+
+
+def _update(digest, obj):
+    """Feed an unambiguous byte representation of obj into digest."""
+    if obj is None or isinstance(obj, bool):
+        digest.update(b"C" + repr(obj).encode())
+    elif isinstance(obj, (int, float, complex)):
+        digest.update(f"{type(obj).__name__}{obj!r};".encode())
+    elif isinstance(obj, str):
+        _update_bytes(digest, b"s", obj.encode("utf-8", "surrogatepass"))
+    elif isinstance(obj, bytes):
+        _update_bytes(digest, b"b", obj)
+    elif isinstance(obj, type):
+        _update_bytes(digest, b"t", f"{obj.__module__}.{obj.__qualname__}".encode())
+    elif isinstance(obj, (tuple, list, dict)):
+        items = obj.items() if isinstance(obj, dict) else obj
+        digest.update(f"{type(obj).__name__}{len(obj)}(".encode())
+        for item in items:
+            _update(digest, item)
+        digest.update(b")")
+    elif _is_pandas_index(obj):
+        digest.update(b"i" + _index_digest(obj))
+    else:
+        _update(digest, type(obj))
+        _update_bytes(digest, b"r", repr(obj).encode("utf-8", "surrogatepass"))
+
+
+def _update_value(digest, obj, pinned):
+    """Feed the value of a leaf into digest.
+
+    None, numbers, strings and bytes are hashed by value, numpy arrays, jax arrays and
+    pandas objects by their content. Tuples, lists and dicts, which can be leaves if
+    ``is_leaf`` says so, are hashed item by item. All other objects are hashed by
+    identity and appended to ``pinned``, such that their id is not reused while the
+    caller holds on to ``pinned``.
+
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        _update(digest, obj)
+    elif isinstance(obj, (tuple, list, dict)):
+        items = obj.items() if isinstance(obj, dict) else obj
+        digest.update(f"{type(obj).__name__}{len(obj)}(".encode())
+        for item in items:
+            if isinstance(obj, dict):
+                _update(digest, item[0])
+                item = item[1]
+            _update_value(digest, item, pinned)
+        digest.update(b")")
+    elif _is_array(obj):
+        import numpy as np
+
+        arr = np.asarray(obj)
+        _update(digest, (type(obj), arr.shape, str(arr.dtype)))
+        if arr.dtype.hasobject:
+            for item in arr.flat:
+                _update_value(digest, item, pinned)
+        else:
+            digest.update(np.ascontiguousarray(arr).view(np.uint8))
+    elif _is_pandas_object(obj):
+        import pandas as pd
+
+        try:
+            hashes = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+        except TypeError:
+            # Objects with unhashable elements are hashed by identity.
+            _update_identity(digest, obj, pinned)
+        else:
+            _update(digest, (type(obj), obj.shape))
+            if isinstance(obj, pd.DataFrame):
+                _update(digest, (obj.columns, [str(dtype) for dtype in obj.dtypes]))
+            else:
+                _update(digest, (obj.name, str(obj.dtype)))
+            digest.update(hashes.tobytes())
+    else:
+        _update_identity(digest, obj, pinned)
+
+
+def _update_identity(digest, obj, pinned):
+    digest.update(f"o{id(obj)};".encode())
+    pinned.append(obj)
+
+
+def _update_bytes(digest, tag, data):
+    digest.update(tag + str(len(data)).encode() + b":")
+    digest.update(data)
+
+
+def _is_pandas_index(obj):
+    return "pandas" in sys.modules and isinstance(obj, sys.modules["pandas"].Index)
+
+
+def _index_digest(index):
+    """Compute the digest of a pandas Index.
+
+    Digests are cached for the ``INDEX_DIGEST_CACHE_SIZE`` most recently used indices.
+    Since indices are immutable, the cache is keyed by their identity. Large indices are
+    hashed in chunks of ``INDEX_CHUNK_SIZE`` elements, such that the hashes of all
+    elements never have to be held in memory at the same time.
+
+    """
+    key = id(index)
+    cached = _INDEX_DIGESTS.get(key)
+    if cached is not None and cached[0] is index:
+        _INDEX_DIGESTS.move_to_end(key)
+        out = cached[1]
+    else:
+        out = _compute_index_digest(index)
+        _INDEX_DIGESTS[key] = (index, out)
+        if len(_INDEX_DIGESTS) > INDEX_DIGEST_CACHE_SIZE:
+            _INDEX_DIGESTS.popitem(last=False)
+    return out
+
+
+def _compute_index_digest(index):
+    import pandas as pd
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    _update(digest, type(index))
+    _update(digest, (str(index.dtype), list(index.names), len(index)))
+    if isinstance(index, pd.RangeIndex):
+        _update(digest, (index.start, index.stop, index.step))
+    else:
+        for start in range(0, len(index), INDEX_CHUNK_SIZE):
+            chunk = index[start : start + INDEX_CHUNK_SIZE]
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            digest.update(hashes.tobytes())
+    return digest.digest()
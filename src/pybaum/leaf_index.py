@@ -0,0 +1,497 @@
+"""Map positions in the flattened leaves of a pytree to paths and back.
+
+Optimizers report gradients or errors by their position in the flattened pytree.
+:func:`tree_flatten_with_index` creates a :class:`LeafIndex` in the same traversal that
+creates the treedef. The index stores the range of leaves, the names of the children
+and the shape of each container, but nothing per leaf. Consecutive leaves of the same
+container form a segment, and a position is mapped to its path by a binary search over
+the starts of the segments.
+
+"""
+import operator
+from array import array
+from bisect import bisect_right
+
+from pybaum.registry import get_dispatch_table
+from pybaum.registry import resolve_type
+from pybaum.tree_util import _consume
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _UNRESOLVED
+from pybaum.tree_util import _walk
+from pybaum.treedef import PyTreeDef
+
+
+def tree_flatten_with_index(tree, is_leaf=None, registry=None):
+    """Flatten a pytree and index the positions of its leaves.
+
+    Example:
+
+    >>> leaves, treedef, index = tree_flatten_with_index({"a": [1, 2], "b": 3})
+    >>> leaves
+    [1, 2, 3]
+    >>> index.locate(1)
+    ('a', '1')
+    >>> index.offset_of(("a",))
+    slice(0, 2, None)
+
+    Args:
+        tree: a pytree to flatten.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        tuple: List of leaves, the treedef and the :class:`LeafIndex`.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    out = _tree_flatten_with_index(tree, is_leaf, registry)
+    return out
+
+
+def _tree_flatten_with_index(tree, is_leaf, registry):
+    leaves, nodes, containers = [], [], []
+    _consume(_walk(tree, is_leaf, registry, leaves, nodes=nodes, containers=containers))
+    treedef = PyTreeDef(nodes)
+    return leaves, treedef, _build_index(treedef, containers)
+
+
+class LeafIndex:
+    """Index of the positions of the leaves in a flattened pytree.
+
+    A path is a tuple with the names of the children that lead from the root to a
+    subtree, as returned by :meth:`pybaum.paths.LeafPaths.path`. Components of paths
+    that are passed to the index and are not strings are converted with ``str``.
+    Instances are created by :func:`tree_flatten_with_index`.
+
+    """
+
+    __slots__ = ("_n_leaves", "_containers", "_segments", "_segment_starts")
+
+    def __init__(self, n_leaves, containers, segments):
+        self._n_leaves = n_leaves
+        self._containers = containers
+        self._segments = segments
+        self._segment_starts = array("q", [segment[2] for segment in segments])
+
+    def __len__(self):
+        return self._n_leaves
+
+    def locate(self, index):
+        """Get the paths of leaves from their positions.
+
+        Takes O(log n + d) time per position, where n is the number of containers and
+        d the depth of the leaf.
+
+        Args:
+            index (int or array-like): The position of a leaf in the flattened pytree
+                or an array of positions. Negative positions count from the end.
+
+        Returns:
+            tuple or list: The path of the leaf or, if index is an array, the list of
+            the paths of its elements in C order.
+
+        Raises:
+            IndexError: If a position is out of range.
+
+        """
+        try:
+            position = operator.index(index)
+        except TypeError:
+            out = self._locate_many(index)
+        else:
+            position = range(self._n_leaves)[position]
+            segment_id = bisect_right(self._segment_starts, position) - 1
+            out = self._path(segment_id, position)
+        return out
+
+    def offset_of(self, path):
+        """Get the positions of the leaves of a subtree.
+
+        Args:
+            path (tuple): The path of a leaf or container.
+
+        Returns:
+            slice: The positions of the leaves of the subtree in the flattened pytree.
+
+        Raises:
+            KeyError: If there is no subtree with this path.
+
+        """
+        start, stop, _ = self._locate(path)
+        return slice(start, stop)
+
+    def shape_of(self, path):
+        """Get the shape of a subtree.
+
+        Args:
+            path (tuple): The path of a leaf or container.
+
+        Returns:
+            tuple or None: The shape of an array-like container, e.g. of numpy arrays
+            with the "extended" registry, and None for other subtrees.
+
+        Raises:
+            KeyError: If there is no subtree with this path.
+
+        """
+        container_id, _ = self._find(path)
+        out = None if container_id is None else self._containers[container_id].shape
+        return out
+
+    def _locate_many(self, indices):
+        import numpy as np
+
+        positions = np.asarray(indices)
+        if positions.size > 0 and not np.issubdtype(positions.dtype, np.integer):
+            raise TypeError("Positions must be integers.")
+        positions = positions.astype(np.int64).ravel()
+        if ((positions < -self._n_leaves) | (positions >= self._n_leaves)).any():
+            raise IndexError("Positions are out of range.")
+        positions = np.where(positions < 0, positions + self._n_leaves, positions)
+        starts = np.frombuffer(self._segment_starts, dtype=np.int64)
+        segment_ids = np.searchsorted(starts, positions, side="right") - 1
+        out = [
+            self._path(segment_id, position)
+            for segment_id, position in zip(segment_ids.tolist(), positions.tolist())
+        ]
+        return out
+
+    def _path(self, segment_id, position):
+        container_id, child_start, flat_start, _ = self._segments[segment_id]
+        if container_id < 0:
+            out = ()
+        else:
+            container = self._containers[container_id]
+            out = self._container_path(container_id) + (
+                container.names[child_start + position - flat_start],
+            )
+        return out
+
+    def _container_path(self, container_id):
+        """Get the path of a container and cache it."""
+        container = self._containers[container_id]
+        if container.path is None:
+            parts = []
+            ancestor = container
+            while ancestor.path is None:
+                parent_id, position = ancestor.parent
+                ancestor = self._containers[parent_id]
+                parts.append(ancestor.names[position])
+            container.path = ancestor.path + tuple(reversed(parts))
+        return container.path
+
+    def _locate(self, path):
+        """Get the range of leaves and, for containers, the node id of a subtree."""
+        container_id, position = self._find(path)
+        if container_id is None:
+            out = (position, position + 1, None)
+        else:
+            container = self._containers[container_id]
+            out = (container.start, container.stop, container.node_id)
+        return out
+
+    def _find(self, path):
+        """Find a subtree by descending from the root.
+
+        Returns:
+            tuple: The id of the container and None, or None and the flat position of
+            the leaf.
+
+        Raises:
+            KeyError: If there is no subtree with this path.
+
+        """
+        path = _as_path(path)
+        out = None
+        if not self._containers:
+            if not path and self._n_leaves == 1:
+                out = (None, 0)
+        else:
+            # Containers are in post-order, so the root is the last one.
+            container_id = len(self._containers) - 1
+            for depth, name in enumerate(path):
+                container = self._containers[container_id]
+                child_position = container.child_position(name)
+                container_id = container.child_ids.get(child_position)
+                if container_id is None:
+                    if depth == len(path) - 1 and child_position is not None:
+                        position = self._position(container, child_position)
+                        out = None if position is None else (None, position)
+                    break
+            else:
+                out = (container_id, None)
+        if out is None:
+            raise KeyError(f"There is no subtree with the path {path}.")
+        return out
+
+    def _position(self, container, child_position):
+        """Get the flat position of a leaf child of a container or None."""
+        out = None
+        i = bisect_right(container.child_starts, child_position) - 1
+        if i >= 0:
+            _, child_start, flat_start, length = self._segments[
+                container.segment_ids[i]
+            ]
+            if child_position < child_start + length:
+                out = flat_start + child_position - child_start
+        return out
+
+
+class _Container:
+    """A container in a :class:`LeafIndex`.
+
+    It holds the names of the children, the shape of the container, the range of its
+    leaves, the position of its node in the treedef, the id and child position of its
+    parent, the ids of its children that are containers and the segments of its
+    children that are leaves. The path is created when it is first needed.
+
+    Args:
+        names: The names of the children, either a list or a sequence with an
+            ``index`` method as returned by the "lazy_names" entry of the registry.
+        shape (tuple or None): The shape of array-like containers.
+        start (int): The flat position of the first leaf of the container.
+        stop (int): The flat position after the last leaf of the container.
+        node_id (int): The position of the node of the container in the treedef.
+
+    """
+
+    __slots__ = (
+        "path",
+        "names",
+        "shape",
+        "start",
+        "stop",
+        "node_id",
+        "parent",
+        "child_ids",
+        "child_starts",
+        "segment_ids",
+        "_positions",
+    )
+
+    def __init__(self, names, shape, start, stop, node_id):
+        self.path = None
+        self.names = names
+        self.shape = shape
+        self.start = start
+        self.stop = stop
+        self.node_id = node_id
+        self.parent = None
+        self.child_ids = {}
+        self.child_starts = []
+        self.segment_ids = []
+        self._positions = None
+
+    def child_position(self, child):
+        if isinstance(self.names, list):
+            if self._positions is None:
+                self._positions = {}
+                for position, name in enumerate(self.names):
+                    self._positions.setdefault(name, position)
+            out = self._positions.get(child)
+        else:
+            try:
+                out = self.names.index(child)
+            except ValueError:
+                out = None
+        return out
+
+
+def _as_path(path):
+    return tuple(str(part) for part in path)
+
+
+def _build_index(treedef, infos):
+    """Create a :class:`LeafIndex` from a treedef.
+
+    Args:
+        treedef (PyTreeDef): The treedef of a pytree.
+        infos (list): The names of the children and shape of each container, in the
+            order of the nodes of the treedef.
+
+    """
+    containers, segments = [], []
+    # Holds the container ids of the children that were not yet assigned to a parent.
+    # Leaves are represented by -1.
+    stack = []
+    n_leaves = 0
+    info_iter = iter(infos)
+
+    for node_id, node in enumerate(treedef._nodes):
+        if node.node_type is None:
+            stack.append(-1)
+            n_leaves += 1
+            continue
+
+        n_children = node.num_children
+        if node.num_nodes == n_children + 1 and node.num_leaves == n_children:
+            children = None
+        else:
+            children = stack[len(stack) - n_children :]
+        del stack[len(stack) - n_children :]
+        names, shape = next(info_iter)
+        container_id = _add_container(
+            containers,
+            segments,
+            _Container(names, shape, n_leaves - node.num_leaves, n_leaves, node_id),
+            children,
+        )
+        stack.append(container_id)
+
+    out = _finish_index(n_leaves, containers, segments)
+    return out
+
+
+def _index_tree(tree, is_leaf, registry):
+    """Create a :class:`LeafIndex` without collecting the leaves of a pytree.
+
+    The names and shapes of the containers are the same as those collected by
+    :func:`~pybaum.tree_util._walk`. Containers with "flatten_block" and "lazy_names"
+    entries, e.g. arrays in the "extended" registry, are not flattened element by
+    element. Their elements are only visited if the block has object dtype, since only
+    then they can be containers.
+
+    """
+    dispatch = get_dispatch_table(registry)
+    containers, segments = [], []
+    n_leaves = n_nodes = 0
+    # A frame holds the iterator over the children of a container, its names, shape
+    # and first flat position, and the ids of its children, where leaves are -1. The
+    # first frame holds the root.
+    stack = [(iter([tree]), None, None, 0, [])]
+
+    while stack:
+        frame = stack[-1]
+        for subtree in frame[0]:
+            resolved = dispatch.get(type(subtree), _UNRESOLVED)
+            if resolved is _UNRESOLVED:
+                resolved = resolve_type(subtree, registry, dispatch)
+
+            if resolved is None or is_leaf(subtree):
+                frame[4].append(-1)
+                n_leaves += 1
+                n_nodes += 1
+                continue
+
+            entry = resolved[1]
+            shape = getattr(subtree, "shape", None)
+            if "flatten_block" in entry and "lazy_names" in entry:
+                subtrees, aux_data = entry["flatten_block"](subtree)
+                names = entry["lazy_names"](aux_data)
+                if not _may_contain_containers(subtrees):
+                    n_children = len(subtrees)
+                    n_nodes += n_children + 1
+                    container = _Container(
+                        names, shape, n_leaves, n_leaves + n_children, n_nodes - 1
+                    )
+                    n_leaves += n_children
+                    frame[4].append(
+                        _add_container(containers, segments, container, None)
+                    )
+                    continue
+            else:
+                subtrees, aux_data = entry["flatten"](subtree)
+                lazy_names = entry.get("lazy_names")
+                if lazy_names is None:
+                    names = entry["names"](subtree)
+                else:
+                    names = lazy_names(aux_data)
+            stack.append((iter(subtrees), names, shape, n_leaves, []))
+            break
+        else:
+            stack.pop()
+            if stack:
+                _, names, shape, start, children = frame
+                n_nodes += 1
+                container = _Container(names, shape, start, n_leaves, n_nodes - 1)
+                stack[-1][4].append(
+                    _add_container(containers, segments, container, children)
+                )
+
+    out = _finish_index(n_leaves, containers, segments)
+    return out
+
+
+def _may_contain_containers(block):
+    """Check if the elements of a block can be containers, i.e. if it holds objects."""
+    return getattr(getattr(block, "dtype", None), "hasobject", True)
+
+
+def _add_container(containers, segments, container, children):
+    """Add a container and the segments of its leaf children to an index.
+
+    Args:
+        containers (list): The containers of the index, in post-order.
+        segments (list): Tuples with the flat start, the container id, the child
+            position and the length of each run of leaf children.
+        container (_Container): The container.
+        children (list or None): The ids of the children of the container, where leaves
+            are -1. None means that all children are leaves.
+
+    Returns:
+        int: The id of the container.
+
+    """
+    container_id = len(containers)
+    containers.append(container)
+    start = container.start
+    if children is None:
+        if container.stop > start:
+            segments.append((start, container_id, 0, container.stop - start))
+    else:
+        flat, run_start, run_flat = start, None, None
+        for position, child in enumerate(children):
+            if child < 0:
+                if run_start is None:
+                    run_start, run_flat = position, flat
+                flat += 1
+                continue
+            if run_start is not None:
+                segments.append(
+                    (run_flat, container_id, run_start, position - run_start)
+                )
+                run_start = None
+            containers[child].parent = (container_id, position)
+            container.child_ids[position] = child
+            flat += containers[child].stop - containers[child].start
+        if run_start is not None:
+            segments.append(
+                (run_flat, container_id, run_start, len(children) - run_start)
+            )
+    return container_id
+
+
+def _finish_index(n_leaves, containers, segments):
+    """Create a :class:`LeafIndex` from the containers and segments of a pytree."""
+    if containers:
+        containers[-1].path = ()
+    elif n_leaves == 1:
+        # The pytree is a single leaf.
+        segments.append((0, -1, 0, 1))
+
+    segments.sort()
+    out_segments = []
+    for segment_id, (flat_start, container_id, child_start, length) in enumerate(
+        segments
+    ):
+        out_segments.append((container_id, child_start, flat_start, length))
+        if container_id >= 0:
+            containers[container_id].child_starts.append(child_start)
+            containers[container_id].segment_ids.append(segment_id)
+
+    out = LeafIndex(n_leaves, containers, out_segments)
+    return out
@@ -0,0 +1,202 @@
+"""Memoize functions of pytrees.
+
+The cache key of a call is a blake2b digest of its arguments, computed in the same
+traversal as :func:`~pybaum.hashing.tree_structure_hash`. Arrays and pandas objects
+are hashed by content, so equal trees hit the cache even if they are different
+objects.
+
+"""
+import functools
+import sys
+import threading
+from collections import namedtuple
+from collections import OrderedDict
+
+from pybaum.hashing import _tree_digest
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _tree_flatten
+
+KEYS = ("structure+values", "structure")
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "nbytes"])
+
+
+def tree_memoize(
+    func=None,
+    *,
+    maxsize=128,
+    maxbytes=None,
+    key="structure+values",
+    is_leaf=None,
+    registry=None,
+):
+    """Memoize a function whose arguments are pytrees.
+
+    Can be used as ``@tree_memoize`` or ``@tree_memoize(maxsize=...)``. Like
+    :func:`functools.lru_cache`, the memoized function has the methods ``cache_info``
+    and ``cache_clear``. Cached results are returned as they are, i.e. they are not
+    copied.
+
+    The positional and keyword arguments of a call are treated as one pytree. With
+    ``key="structure+values"``, the cache key is a digest of its structure and its
+    leaves: None, numbers, strings and bytes are hashed by value, numpy arrays, jax
+    arrays and pandas objects by content, and all other leaves by identity. With
+    ``key="structure"``, only the structure of the arguments is hashed, as in
+    :func:`~pybaum.hashing.tree_structure_hash`, i.e. all calls with arguments of the
+    same structure share one result.
+
+    Example:
+
+    >>> @tree_memoize(maxsize=2)
+    ... def total(tree):
+    ...     return sum(tree.values())
+    >>> total({"a": 1, "b": 2})
+    3
+    >>> total({"a": 1, "b": 2})
+    3
+    >>> total.cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=2, currsize=1, nbytes=0)
+
+    Args:
+        func (callable): The function to memoize.
+        maxsize (int or None): Maximum number of cached results. If it is exceeded,
+            the least recently used result is evicted. None means no limit.
+        maxbytes (int or None): Maximum total size in bytes of the cached results.
+            The size of a result is the sum of the ``nbytes`` of its array leaves, the
+            memory usage of its pandas leaves and :func:`sys.getsizeof` of all other
+            leaves. If it is exceeded, the least recently used results are evicted.
+            Results that are larger than ``maxbytes`` are not cached. None means that
+            sizes are not tracked.
+        key (str): "structure+values" or "structure".
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        callable: The memoized function.
+
+    """
+    if key not in KEYS:
+        raise ValueError(f"key must be one of {list(KEYS)}, not {key!r}.")
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("maxsize must be a non-negative integer or None.")
+
+    def decorator(func):
+        return _TreeCache(func, maxsize, maxbytes, key, is_leaf, registry).wrapper()
+
+    out = decorator if func is None else decorator(func)
+    return out
+
+
+class _TreeCache:
+    """The cache and statistics of a memoized function."""
+
+    def __init__(self, func, maxsize, maxbytes, key, is_leaf, registry):
+        self.func = func
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.values = key == "structure+values"
+        self.is_leaf = _process_is_leaf(is_leaf)
+        self.registry = _process_pytree_registry(registry)
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        # Maps keys to tuples of the result, its size and the leaves of the arguments
+        # that are hashed by identity and have to be kept alive.
+        self.cache = OrderedDict()
+        self.lock = threading.RLock()
+
+    def wrapper(self):
+        @functools.wraps(self.func)
+        def memoized(*args, **kwargs):
+            return self(args, kwargs)
+
+        memoized.cache_info = self.cache_info
+        memoized.cache_clear = self.cache_clear
+        return memoized
+
+    def __call__(self, args, kwargs):
+        pinned = []
+        digest = _tree_digest(
+            (args, dict(sorted(kwargs.items()))),
+            self.is_leaf,
+            self.registry,
+            values=self.values,
+            pinned=pinned,
+        )
+        key = digest.digest()
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        out = self.func(*args, **kwargs)
+
+        size = 0 if self.maxbytes is None else self._nbytes(out)
+        if self.maxsize != 0 and (self.maxbytes is None or size <= self.maxbytes):
+            with self.lock:
+                if key not in self.cache:
+                    self.cache[key] = (out, size, pinned)
+                    self.nbytes += size
+                    self._evict()
+        return out
+
+    def cache_info(self):
+        """Report the cache statistics.
+
+        Returns:
+            CacheInfo: namedtuple with the number of hits and misses, the maximum
+            size, the number of cached results and their total size in bytes.
+
+        """
+        with self.lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self.cache), self.nbytes
+            )
+
+    def cache_clear(self):
+        """Clear the cache and the statistics."""
+        with self.lock:
+            self.cache.clear()
+            self.hits = self.misses = self.nbytes = 0
+
+    def _evict(self):
+        while (self.maxsize is not None and len(self.cache) > self.maxsize) or (
+            self.maxbytes is not None and self.nbytes > self.maxbytes
+        ):
+            _, (_, size, _) = self.cache.popitem(last=False)
+            self.nbytes -= size
+
+    def _nbytes(self, result):
+        out = 0
+        for leaf in _tree_flatten(result, self.is_leaf, self.registry):
+            out += _leaf_nbytes(leaf)
+        return out
+
+
+def _leaf_nbytes(leaf):
+    """Estimate the memory size of a leaf in bytes."""
+    if "pandas" in sys.modules and isinstance(leaf, sys.modules["pandas"].DataFrame):
+        out = int(leaf.memory_usage(index=True).sum())
+    elif "pandas" in sys.modules and isinstance(leaf, sys.modules["pandas"].Series):
+        out = int(leaf.memory_usage(index=True))
+    elif isinstance(getattr(leaf, "nbytes", None), int):
+        out = leaf.nbytes
+    else:
+        out = sys.getsizeof(leaf)
+    return out
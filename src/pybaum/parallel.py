@@ -0,0 +1,244 @@
+"""Apply functions to the leaves of pytrees in parallel or concurrently.
+
+For :func:`tree_map_parallel`, the leaves are flattened, split into chunks and the
+chunks are dispatched to a :mod:`concurrent.futures` executor. Each chunk is one task,
+so the scheduling overhead and, for process pools, the pickling of leaves and results
+is paid per chunk and not per leaf.
+
+:func:`tree_map_async` awaits a coroutine function for all leaves with :mod:`asyncio`.
+
+"""
+import os
+from itertools import repeat
+
+from pybaum.tree_util import _leaf_names
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _structure_mismatch
+from pybaum.tree_util import _tree_flatten_with_treedef
+
+EXECUTORS = {"thread": "ThreadPoolExecutor", "process": "ProcessPoolExecutor"}
+"""dict: Names of the executors of :mod:`concurrent.futures` that can be created."""
+
+CHUNKS_PER_WORKER = 4
+
+
+def tree_map_parallel(
+    func,
+    *trees,
+    executor="thread",
+    max_workers=None,
+    chunksize=None,
+    is_leaf=None,
+    registry=None,
+):
+    """Apply func to the leaves of one or several pytrees in parallel.
+
+    The result has the same structure as the result of
+    :func:`~pybaum.tree_util.tree_map` or :func:`~pybaum.tree_util.tree_multimap`.
+
+    Args:
+        func (callable): Function applied to corresponding leaves of the trees. Needs to
+            be picklable if a process pool is used.
+        trees: One or several pytrees. All trees need to have the same structure.
+        executor (str or concurrent.futures.Executor): "thread" or "process" to create
+            a thread or process pool that is shut down after the call, or an existing
+            executor which is not shut down.
+        max_workers (int or None): Number of workers of the created pool. None means
+            that the default of :mod:`concurrent.futures` is used. Ignored if
+            ``executor`` is an Executor.
+        chunksize (int or None): Number of leaves per task. None means that the leaves
+            are split into ``CHUNKS_PER_WORKER`` chunks per worker of the executor.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        tree with the same structure as the elements in trees.
+
+    """
+    if not trees:
+        raise TypeError("tree_map_parallel requires at least one pytree.")
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    items, treedef = _flatten_trees(trees, is_leaf, registry)
+
+    # concurrent.futures is imported here because importing the process pool also
+    # imports multiprocessing, which makes ``import pybaum`` slow.
+    import concurrent.futures
+
+    if isinstance(executor, concurrent.futures.Executor):
+        results = _map_chunks(executor, func, items, chunksize)
+    elif executor in EXECUTORS:
+        pool_class = getattr(concurrent.futures, EXECUTORS[executor])
+        with pool_class(max_workers=max_workers) as pool:
+            results = _map_chunks(pool, func, items, chunksize)
+    else:
+        raise ValueError(
+            f"executor must be one of {list(EXECUTORS)} or an Executor, not "
+            f"{executor!r}."
+        )
+
+    out = treedef.unflatten(results)
+    return out
+
+
+class LeafEvaluationError(Exception):
+    """Error raised if func fails for a leaf in :func:`tree_map_async`.
+
+    The original exception is available as ``__cause__``.
+
+    Args:
+        name (str): The name of the leaf as returned by
+            :func:`~pybaum.tree_util.leaf_names` for the first tree.
+
+    """
+
+    def __init__(self, name, message):
+        super().__init__(message)
+        self.name = name
+
+
+async def tree_map_async(func, *trees, concurrency=None, is_leaf=None, registry=None):
+    """Await a coroutine function for the leaves of one or several pytrees.
+
+    Coroutines for all leaves are scheduled at once, but at most ``concurrency`` of
+    them run at the same time. If one of them fails, the others are cancelled.
+
+    Args:
+        func (callable): Coroutine function called with corresponding leaves of the
+            trees.
+        trees: One or several pytrees. All trees need to have the same structure.
+        concurrency (int or None): Maximum number of coroutines that run concurrently.
+            None means no limit.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        tree with the same structure as the elements in trees.
+
+    Raises:
+        LeafEvaluationError: If func raises an exception. The error contains the name
+            of the failing leaf.
+
+    """
+    if not trees:
+        raise TypeError("tree_map_async requires at least one pytree.")
+    if concurrency is not None and concurrency < 1:
+        raise ValueError("concurrency must be a positive integer or None.")
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    items, treedef = _flatten_trees(trees, is_leaf, registry)
+
+    # asyncio is imported here because importing it makes ``import pybaum`` slow.
+    import asyncio
+
+    semaphore = None if concurrency is None else asyncio.Semaphore(concurrency)
+    # Names are only needed to report errors, so they are created on the first error.
+    names = []
+
+    async def evaluate(position, item):
+        try:
+            if semaphore is None:
+                out = await func(*item)
+            else:
+                async with semaphore:
+                    out = await func(*item)
+        except Exception as error:
+            if not names:
+                names.extend(_leaf_names(trees[0], is_leaf, registry, separator="_"))
+            name = names[position]
+            raise LeafEvaluationError(
+                name, f"Evaluation failed for leaf {name!r}: {error!r}"
+            ) from error
+        return out
+
+    tasks = [
+        asyncio.ensure_future(evaluate(position, item))
+        for position, item in enumerate(items)
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    out = treedef.unflatten(results)
+    return out
+
+
+def _flatten_trees(trees, is_leaf, registry):
+    """Flatten trees with the same structure.
+
+    Returns:
+        tuple: List with one tuple of corresponding leaves per leaf and the treedef of
+        the first tree.
+
+    """
+    flat_trees, treedef = [], None
+    for tree in trees:
+        flat, other_treedef = _tree_flatten_with_treedef(tree, is_leaf, registry)
+        if treedef is None:
+            treedef = other_treedef
+        elif other_treedef != treedef:
+            raise _structure_mismatch(trees[0], tree)
+        flat_trees.append(flat)
+    out = list(zip(*flat_trees))
+    return out, treedef
+
+
+def _map_chunks(executor, func, items, chunksize):
+    """Apply func to chunks of items with executor and concatenate the results."""
+    if chunksize is None:
+        n_workers = _n_workers(executor)
+        chunksize = max(1, -(-len(items) // (n_workers * CHUNKS_PER_WORKER)))
+    elif chunksize < 1:
+        raise ValueError("chunksize must be a positive integer.")
+
+    chunks = [items[i : i + chunksize] for i in range(0, len(items), chunksize)]
+    out = []
+    for result in executor.map(_apply_to_chunk, repeat(func), chunks):
+        out.extend(result)
+    return out
+
+
+def _n_workers(executor):
+    """Get the number of workers of an executor.
+
+    The executors of :mod:`concurrent.futures` store it in the private attribute
+    ``_max_workers``. If an executor does not have it or it is not a positive integer,
+    the number of CPUs is used.
+
+    """
+    n_workers = getattr(executor, "_max_workers", None)
+    if not isinstance(n_workers, int) or n_workers < 1:
+        n_workers = os.cpu_count() or 1
+    return n_workers
+
+
+def _apply_to_chunk(func, chunk):
+    return [func(*item) for item in chunk]
@@ -0,0 +1,170 @@
+"""Index the paths of the leaves in a pytree without creating their names.
+
+:func:`~pybaum.tree_util.leaf_names` creates one string per leaf. For large arrays
+this means millions of strings, even if only a few of them are needed, e.g. for error
+messages. :func:`leaf_paths` instead creates a :class:`~pybaum.leaf_index.LeafIndex`,
+which stores the names of the children of each container but nothing per leaf, and
+creates the names of leaves from their paths when they are accessed.
+
+"""
+from pybaum.leaf_index import _index_tree
+from pybaum.tree_util import _add_prefix
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+
+
+def leaf_paths(tree, is_leaf=None, registry=None, separator="_"):
+    """Create an index of the paths of the leaves in a pytree.
+
+    Args:
+        tree: a pytree.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+        separator (str): String that separates the building blocks of the leaf name.
+
+    Returns:
+        LeafPaths: The index. ``list(leaf_paths(tree))`` is equal to
+        ``leaf_names(tree)``.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    out = LeafPaths(_index_tree(tree, is_leaf, registry), separator)
+    return out
+
+
+class LeafPaths:
+    """Compact index of the paths of the leaves in a pytree.
+
+    The path of a leaf is a tuple with the names of the children that lead from the
+    root to the leaf. Its name is the concatenation of the path with the separator.
+    Instances are created by :func:`leaf_paths`. They behave like a read-only list of
+    leaf names. Looking up the name of a leaf by position takes logarithmic time.
+    Looking up the position by name or path only creates the names of containers and
+    does not depend on the number of leaves.
+
+    Args:
+        index (LeafIndex): The index of the positions of the leaves.
+        separator (str): String that separates the building blocks of the leaf name.
+
+    """
+
+    __slots__ = ("separator", "_index", "_by_name")
+
+    def __init__(self, index, separator):
+        self.separator = separator
+        self._index = index
+        self._by_name = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, index):
+        return self.name(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.name(index)
+
+    def path(self, index):
+        """Get the path of a leaf.
+
+        Args:
+            index (int): The position of the leaf in the flattened pytree.
+
+        Returns:
+            tuple: The names of the children from the root to the leaf.
+
+        """
+        return self._index.locate(index)
+
+    def name(self, index):
+        """Get the name of a leaf.
+
+        Args:
+            index (int): The position of the leaf in the flattened pytree.
+
+        Returns:
+            str: The name of the leaf as returned by
+            :func:`~pybaum.tree_util.leaf_names`.
+
+        """
+        out = None
+        for part in self.path(index):
+            out = _add_prefix(out, part, self.separator)
+        return out
+
+    def index(self, key):
+        """Get the position of a leaf from its name or path.
+
+        Args:
+            key (str or tuple): The name or path of the leaf.
+
+        Returns:
+            int: The position of the leaf in the flattened pytree.
+
+        Raises:
+            ValueError: If there is no leaf with this name or path.
+
+        """
+        if isinstance(key, tuple):
+            try:
+                _, out = self._index._find(key)
+            except KeyError:
+                out = None
+        else:
+            out = None
+            for prefix, child in self._splits(key):
+                for container_id in self._containers_by_name().get(prefix, []):
+                    container = self._index._containers[container_id]
+                    child_position = container.child_position(child)
+                    if child_position is not None:
+                        out = self._index._position(container, child_position)
+                    if out is not None:
+                        break
+                if out is not None:
+                    break
+        if out is None:
+            raise ValueError(f"{key!r} is not the name or path of a leaf.")
+        return out
+
+    def to_list(self):
+        """Create the names of all leaves.
+
+        Returns:
+            list: List of strings with names for pytree leaves.
+
+        """
+        return list(self)
+
+    def _splits(self, name):
+        """Yield all splits of name into the name of a container and a child."""
+        if isinstance(name, str):
+            yield None, name
+            start = name.find(self.separator)
+            while start != -1 and self.separator:
+                yield name[:start], name[start + len(self.separator) :]
+                start = name.find(self.separator, start + 1)
+
+    def _containers_by_name(self):
+        """Map the names of containers to their ids."""
+        if self._by_name is None:
+            self._by_name = {}
+            for container_id in range(len(self._index._containers)):
+                name = None
+                for part in self._index._container_path(container_id):
+                    name = _add_prefix(name, part, self.separator)
+                self._by_name.setdefault(name, []).append(container_id)
+        return self._by_name
@@ -0,0 +1,360 @@
+"""Measure where the time of pytree operations goes.
+
+Inside of :func:`profile`, :func:`~pybaum.registry.get_registry` returns instrumented
+copies of the registries. Their entries count and time every call to the "flatten",
+"unflatten", "names" and the optional block and lazy names functions, and their
+dispatch tables count and time the lookup of the type of each visited node, including
+leaves. Since all
+functions in pybaum use :func:`~pybaum.registry.get_registry` if no registry is
+passed, this covers all calls with the default registries. Other registries can be
+instrumented explicitly with :meth:`Profile.instrument`, and functions that are
+applied to leaves, e.g. the func of :func:`~pybaum.tree_util.tree_map`, with
+:meth:`Profile.wrap`.
+
+Outside of :func:`profile` nothing is instrumented, so profiling has no cost when it is
+not used.
+
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+from pybaum.registry import _REGISTRY_HOOKS
+from pybaum.registry import _type_name
+from pybaum.registry import Registry
+
+
+@contextmanager
+def profile(memory=False, trace=False):
+    """Profile the registry calls of pytree operations.
+
+    Example:
+
+    >>> from pybaum import tree_map
+    >>> with profile() as prof:
+    ...     tree = tree_map(prof.wrap(abs), {"a": [-1, 2], "b": (3, -4)})
+    >>> prof.calls("list", "flatten")
+    1
+    >>> prof.calls("func", "abs")
+    4
+
+    Args:
+        memory (bool): Whether the net size of the memory allocated by each call is
+            recorded with :mod:`tracemalloc`. This slows down the profiled code.
+        trace (bool): Whether each call is recorded such that it can be exported with
+            :meth:`Profile.to_chrome_trace`.
+
+    Yields:
+        Profile: The profile. It can be inspected after the with block.
+
+    """
+    prof = Profile(memory=memory, trace=trace)
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+
+
+class Profile:
+    """Call counts, times and allocations of registry entries and wrapped functions.
+
+    Usually created by :func:`profile`. Statistics are grouped by the name of the
+    registered type, e.g. "dict" or "DataFrame", and the name of the function, e.g.
+    "flatten". The number of "flatten" calls is the number of visited containers of a
+    type. Under "dispatch", the lookups of the types of all visited nodes, including
+    leaves, are recorded. Leaves are grouped by the name of their class, e.g. "int".
+    Functions wrapped with :meth:`wrap` are grouped under "func".
+
+    Args:
+        memory (bool): Whether the net size of the memory allocated by each call is
+            recorded with :mod:`tracemalloc`.
+        trace (bool): Whether each call is recorded for :meth:`to_chrome_trace`.
+
+    """
+
+    def __init__(self, memory=False, trace=False):
+        self.memory = memory
+        self.trace = trace
+        self.active = False
+        self.total_ns = 0
+        self._stats = {}
+        self._events = []
+        self._instrumented = {}
+        self._start_ns = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        """Start recording and instrument the registries of get_registry."""
+        if self.active:
+            raise RuntimeError("The profile is already active.")
+        if self.memory:
+            # tracemalloc is imported here because it imports pickle, which makes
+            # ``import pybaum`` slow.
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        _REGISTRY_HOOKS.append(self.instrument)
+        self.active = True
+        self._start_ns = perf_counter_ns()
+
+    def stop(self):
+        """Stop recording and restore the registries of get_registry."""
+        if self.active:
+            self.total_ns += perf_counter_ns() - self._start_ns
+            self.active = False
+            _REGISTRY_HOOKS.remove(self.instrument)
+            if self._started_tracemalloc:
+                import tracemalloc
+
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def instrument(self, registry):
+        """Create an instrumented copy of a registry.
+
+        All callable entries are wrapped with :meth:`_record`. The dispatch table of the
+        copy records each lookup, i.e. each visited node of a pytree, and the time
+        needed to determine the type of classes that are encountered for the first
+        time. Instrumented copies are cached, i.e. instrumenting the same registry
+        again returns the same object.
+
+        Args:
+            registry (dict): A pytree registry.
+
+        Returns:
+            Registry: Registry with the same types as ``registry`` whose functions
+            record their calls while the profile is active.
+
+        """
+        cached = self._instrumented.get(id(registry))
+        if cached is not None and cached[0] is registry:
+            out = cached[1]
+        else:
+            entries = {}
+            for typ, entry in registry.items():
+                name = _type_name(typ)
+                entries[typ] = {
+                    key: self._record(value, name, key) if callable(value) else value
+                    for key, value in entry.items()
+                }
+            out = Registry(entries)
+            out._dispatch = _RecordedDispatchTable(self)
+            self._instrumented[id(registry)] = (registry, out)
+            self._instrumented[id(out)] = (out, out)
+        return out
+
+    def wrap(self, func, name=None):
+        """Record the calls of a function, e.g. the func passed to tree_map.
+
+        Args:
+            func (callable): The function.
+            name (str or None): Name under which the calls are recorded. None means
+                that the ``__name__`` of func is used.
+
+        Returns:
+            callable: Function that calls func and records the call.
+
+        """
+        if name is None:
+            name = getattr(func, "__name__", repr(func))
+        return self._record(func, "func", name)
+
+    def calls(self, group, name):
+        """Get the number of recorded calls of a function.
+
+        Args:
+            group (str): The name of a registered type or "func".
+            name (str): The name of the function, e.g. "flatten".
+
+        Returns:
+            int
+
+        """
+        return self._stats.get((group, name), (0, 0, 0))[0]
+
+    def stats(self):
+        """Get the recorded statistics.
+
+        Returns:
+            list: List of dicts with the entries "group", "name", "calls", "time_ns"
+            and "allocated_bytes" for all functions that were called, sorted by
+            decreasing time. "allocated_bytes" is the net size of the memory allocated
+            by the calls and None if memory was not recorded.
+
+        """
+        out = [
+            {
+                "group": group,
+                "name": name,
+                "calls": stats[0],
+                "time_ns": stats[1],
+                "allocated_bytes": stats[2] if self.memory else None,
+            }
+            for (group, name), stats in self._stats.items()
+            if stats[0] > 0
+        ]
+        out.sort(key=lambda row: row["time_ns"], reverse=True)
+        return out
+
+    def summary(self):
+        """Create a table with the recorded statistics.
+
+        The last row contains the time that was not spent in recorded calls, i.e. in
+        the traversal of pytrees and in code outside of pybaum.
+
+        Returns:
+            str: The table.
+
+        """
+        rows = [("group", "name", "calls", "total ms", "mean us", "allocated KiB")]
+        recorded_ns = 0
+        for row in self.stats():
+            recorded_ns += row["time_ns"]
+            allocated = row["allocated_bytes"]
+            rows.append(
+                (
+                    row["group"],
+                    row["name"],
+                    str(row["calls"]),
+                    f"{row['time_ns'] / 1e6:.3f}",
+                    f"{row['time_ns'] / 1e3 / max(row['calls'], 1):.3f}",
+                    "" if allocated is None else f"{allocated / 1024:.1f}",
+                )
+            )
+        total_ns = self.total_ns
+        if self.active:
+            total_ns += perf_counter_ns() - self._start_ns
+        other_ns = max(total_ns - recorded_ns, 0)
+        rows.append(("other", "", "", f"{other_ns / 1e6:.3f}", "", ""))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = [
+            "  ".join(
+                cell.ljust(width) if i < 2 else cell.rjust(width)
+                for i, (cell, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in rows
+        ]
+        return "\n".join(lines)
+
+    def to_chrome_trace(self, path=None):
+        """Export the recorded calls in the Chrome trace event format.
+
+        The trace can be opened with ``chrome://tracing`` or https://ui.perfetto.dev.
+        Calls are only recorded if the profile was created with ``trace=True``.
+
+        Args:
+            path (str or pathlib.Path or None): If given, the trace is written to this
+                file as JSON.
+
+        Returns:
+            dict: The trace.
+
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": f"{group}.{name}",
+                "cat": group,
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": tid,
+            }
+            for group, name, start, duration, tid in self._events
+        ]
+        out = {"traceEvents": events, "displayTimeUnit": "ns"}
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(out, f)
+        return out
+
+    def _record(self, func, group, name):
+        """Wrap func such that its calls are recorded while the profile is active."""
+        stats = self._stats.setdefault((group, name), [0, 0, 0])
+        events = self._events
+        if self.memory:
+            from tracemalloc import get_traced_memory
+
+        def recorded(*args, **kwargs):
+            if not self.active:
+                return func(*args, **kwargs)
+            if self.memory:
+                allocated = get_traced_memory()[0]
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = perf_counter_ns() - start
+                stats[0] += 1
+                stats[1] += duration
+                if self.memory:
+                    stats[2] += get_traced_memory()[0] - allocated
+                if self.trace:
+                    events.append((group, name, start, duration, threading.get_ident()))
+
+        recorded.__name__ = getattr(func, "__name__", name)
+        recorded.__wrapped__ = func
+        return recorded
+
+    def _add(self, group, name, start, duration):
+        """Add a call that was timed outside of :meth:`_record`."""
+        stats = self._stats.setdefault((group, name), [0, 0, 0])
+        stats[0] += 1
+        stats[1] += duration
+        if self.trace:
+            self._events.append((group, name, start, duration, threading.get_ident()))
+
+
+_MISSING = object()
+
+
+class _RecordedDispatchTable(dict):
+    """Dispatch table that records each lookup while a profile is active.
+
+    Each lookup is one visited node, so the number of "dispatch" calls of a group is
+    the number of visited nodes of that type. If a class is not in the table yet, the
+    time until :func:`~pybaum.registry.resolve_type` stores it is included, i.e. the
+    time needed by :func:`~pybaum.typecheck.get_type`.
+
+    Args:
+        prof (Profile): The profile in which the lookups are recorded.
+
+    """
+
+    def __init__(self, prof):
+        super().__init__()
+        self._profile = prof
+        self._pending = {}
+
+    def get(self, cls, default=None):
+        if self._profile.active:
+            start = perf_counter_ns()
+            out = dict.get(self, cls, _MISSING)
+            if out is _MISSING:
+                self._pending[cls] = start
+                out = default
+            else:
+                duration = perf_counter_ns() - start
+                self._profile._add(_group(cls, out), "dispatch", start, duration)
+        else:
+            out = dict.get(self, cls, default)
+        return out
+
+    def __setitem__(self, cls, resolved):
+        super().__setitem__(cls, resolved)
+        start = self._pending.pop(cls, None)
+        if start is not None and self._profile.active:
+            duration = perf_counter_ns() - start
+            self._profile._add(_group(cls, resolved), "dispatch", start, duration)
+
+
+def _group(cls, resolved):
+    """Get the group of a class with the result of resolve_type."""
+    return cls.__name__ if resolved is None else _type_name(resolved[0])
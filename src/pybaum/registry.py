@@ -1,4 +1,82 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+
 from pybaum.registry_entries import FUNC_DICT
+from pybaum.typecheck import get_type
+
+DISPATCH_CACHE_SIZE = 32
+
+_DISPATCH_TABLES = OrderedDict()
+
+_REGISTRY_CACHE = {}
+
+_REGISTRY_HOOKS = []
+"""list: Functions applied to registries returned by :func:`get_registry`.
+
+Used by :func:`pybaum.profiling.profile` to return instrumented registries.
+
+"""
+
+DEFAULT_TYPES = frozenset(
+    {"list", "tuple", "dict", "None", "namedtuple", "OrderedDict"}
+)
+
+
+class Registry(Mapping):
+    """Immutable pytree registry.
+
+    A registry maps types to dicts with the entries "flatten", "unflatten" and
+    "names". Registries behave like read-only dictionaries. They are hashable and
+    compared by their contents. Since they cannot change, each registry carries its
+    own dispatch table (see :func:`get_dispatch_table`).
+
+    To extend a registry, create a dictionary from it, e.g.
+    ``{**get_registry(), MyClass: entry}``. Plain dictionaries are accepted as
+    registries by all functions in pybaum.
+
+    Args:
+        entries (dict): Dictionary where the keys are types and the values are registry
+            entries.
+
+    """
+
+    __slots__ = ("_entries", "_hash", "_dispatch")
+
+    def __init__(self, entries):
+        self._entries = {
+            typ: MappingProxyType(dict(entry)) for typ, entry in entries.items()
+        }
+        self._hash = None
+        self._dispatch = {}
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self._entries))
+        return self._hash
+
+    def __repr__(self):
+        names = ", ".join(_type_name(typ) for typ in self._entries)
+        return f"Registry([{names}])"
+
+
+def _type_name(typ):
+    return typ if isinstance(typ, str) else typ.__name__
 
 
 def get_registry(types=None, include_defaults=True):
@@ -23,18 +101,77 @@ def get_registry(types=None, include_defaults=True):
             not specified in `types`.
 
     Returns:
-        dict: A pytree registry.
+        Registry: An immutable pytree registry. Registries are cached, i.e. calling
+        the function repeatedly with the same arguments returns the same object. Inside
+        of :func:`pybaum.profiling.profile`, an instrumented copy is returned.
 
     """
-    types = [] if types is None else types
+    key = (frozenset([] if types is None else types), include_defaults)
+    registry = _REGISTRY_CACHE.get(key)
+    if registry is None:
+        types = key[0] | DEFAULT_TYPES if include_defaults else key[0]
+        entries = {}
+        for typ in sorted(types):
+            entries.update(FUNC_DICT[typ]())
+        registry = Registry(entries)
+        _REGISTRY_CACHE[key] = registry
+    for hook in _REGISTRY_HOOKS:
+        registry = hook(registry)
+    return registry
 
-    if include_defaults:
-        default_types = {"list", "tuple", "dict", "None", "namedtuple", "OrderedDict"}
-        types = list(set(types) | default_types)
 
-    registry = {}
-    for typ in types:
-        new_entry = FUNC_DICT[typ]()
-        registry = {**registry, **new_entry}
+def get_dispatch_table(registry):
+    """Get the dispatch table of a pytree registry.
 
-    return registry
+    The dispatch table maps concrete classes to a tuple with the type under which they
+    are registered and the registry entry, or to None if objects of the class are
+    leaves. It is filled lazily by :func:`resolve_type`, such that the type of each
+    class is only determined once.
+
+    A :class:`Registry` owns its dispatch table. For registries that are plain
+    dictionaries, dispatch tables are cached for the ``DISPATCH_CACHE_SIZE`` most
+    recently used registries. A new table is created if entries of the registry were
+    added, removed or replaced.
+
+    Args:
+        registry (dict or Registry): A pytree registry.
+
+    Returns:
+        dict: The dispatch table.
+
+    """
+    if type(registry) is Registry:
+        return registry._dispatch
+
+    key = id(registry)
+    snapshot = tuple(registry.items())
+    cached = _DISPATCH_TABLES.get(key)
+    if cached is not None and cached[0] is registry and cached[1] == snapshot:
+        _DISPATCH_TABLES.move_to_end(key)
+        table = cached[2]
+    else:
+        table = {}
+        _DISPATCH_TABLES[key] = (registry, snapshot, table)
+        if len(_DISPATCH_TABLES) > DISPATCH_CACHE_SIZE:
+            _DISPATCH_TABLES.popitem(last=False)
+    return table
+
+
+def resolve_type(obj, registry, table):
+    """Determine how objects of the class of obj are handled and store it in table.
+
+    Args:
+        obj: An object in a pytree.
+        registry (dict): A pytree registry.
+        table (dict): The dispatch table of ``registry``.
+
+    Returns:
+        tuple or None: The type under which the class is registered and the registry
+        entry, or None if objects of the class are leaves.
+
+    """
+    tree_type = get_type(obj)
+    entry = registry.get(tree_type)
+    out = None if entry is None else (tree_type, entry)
+    table[type(obj)] = out
+    return out
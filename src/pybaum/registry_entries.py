@@ -1,19 +1,16 @@
 import itertools
 from collections import OrderedDict
-from itertools import product
 
 from pybaum.config import IS_JAX_INSTALLED
 from pybaum.config import IS_NUMPY_INSTALLED
 from pybaum.config import IS_PANDAS_INSTALLED
 
-if IS_NUMPY_INSTALLED:
-    import numpy as np
+INDEX_STRINGS_CACHE_SIZE = 32
 
-if IS_PANDAS_INSTALLED:
-    import pandas as pd
+_INDEX_STRINGS = OrderedDict()
 
-if IS_JAX_INSTALLED:
-    import jax
+# numpy, pandas and jax are imported inside the functions that need them, such that
+# ``import pybaum`` does not import them. The import is done when an entry is created.
 
 
 def _none():
@@ -21,54 +18,70 @@ def _none():
     entry = {
         type(None): {
             "flatten": lambda tree: ([], None),  # noqa: U100
-            "unflatten": lambda aux_data, children: None,  # noqa: U100
+            "unflatten": _unflatten_none,
             "names": lambda tree: [],  # noqa: U100
         }
     }
     return entry
 
 
+def _unflatten_none(aux_data, children):  # noqa: U100
+    return None
+
+
 def _list():
     """Create registry entry for list."""
     entry = {
         list: {
             "flatten": lambda tree: (tree, None),
-            "unflatten": lambda aux_data, children: children,  # noqa: U100
+            "unflatten": _unflatten_list,
             "names": lambda tree: [f"{i}" for i in range(len(tree))],
         },
     }
     return entry
 
 
+def _unflatten_list(aux_data, children):  # noqa: U100
+    return children
+
+
 def _dict():
     """Create registry entry for dict."""
     entry = {
         dict: {
             "flatten": lambda tree: (list(tree.values()), list(tree)),
-            "unflatten": lambda aux_data, children: dict(zip(aux_data, children)),
+            "unflatten": _unflatten_dict,
             "names": lambda tree: list(map(str, list(tree))),
         },
     }
     return entry
 
 
+def _unflatten_dict(aux_data, children):
+    return dict(zip(aux_data, children))
+
+
 def _tuple():
     """Create registry entry for tuple."""
     entry = {
         tuple: {
             "flatten": lambda tree: (list(tree), None),
-            "unflatten": lambda aux_data, children: tuple(children),  # noqa: U100
+            "unflatten": _unflatten_tuple,
             "names": lambda tree: [f"{i}" for i in range(len(tree))],
         },
     }
     return entry
 
 
+def _unflatten_tuple(aux_data, children):  # noqa: U100
+    return tuple(children)
+
+
 def _namedtuple():
     """Create registry entry for namedtuple and NamedTuple."""
     entry = {
         "namedtuple": {
-            "flatten": lambda tree: (list(tree), tree),
+            "flatten": lambda tree: (list(tree), type(tree)),
             "unflatten": _unflatten_namedtuple,
             "names": lambda tree: list(tree._fields),
         },
@@ -77,8 +90,7 @@ def _namedtuple():
 
 
 def _unflatten_namedtuple(aux_data, leaves):
-    replacements = dict(zip(aux_data._fields, leaves))
-    out = aux_data._replace(**replacements)
+    out = aux_data._make(leaves)
     return out
 
 
@@ -87,26 +99,30 @@ def _ordereddict():
     entry = {
         OrderedDict: {
             "flatten": lambda tree: (list(tree.values()), list(tree)),
-            "unflatten": lambda aux_data, children: OrderedDict(
-                zip(aux_data, children)
-            ),
+            "unflatten": _unflatten_ordereddict,
             "names": lambda tree: list(map(str, list(tree))),
         },
     }
     return entry
 
 
+def _unflatten_ordereddict(aux_data, children):
+    return OrderedDict(zip(aux_data, children))
+
+
 def _numpy_array():
     """Create registry entry for numpy.ndarray."""
-
     if IS_NUMPY_INSTALLED:
+        import numpy as np
+
         entry = {
             np.ndarray: {
-                "flatten": lambda arr: (arr.flatten().tolist(), arr.shape),
-                "unflatten": lambda aux_data, leaves: np.array(leaves).reshape(
-                    aux_data
-                ),
+                "flatten": _flatten_numpy_array,
+                "unflatten": _unflatten_numpy_array,
                 "names": _array_element_names,
+                "lazy_names": _ArrayElementNames,
+                "flatten_block": _flatten_array,
+                "unflatten_block": _unflatten_numpy_array,
             },
         }
     else:
@@ -120,15 +136,77 @@ def _array_element_names(arr):
     return names
 
 
+class _ArrayElementNames:
+    """Names of array elements that are created when they are accessed.
+
+    Supports ``len``, indexing and ``index`` like the list returned by
+    :func:`_array_element_names`, which is used as "lazy_names" registry entry.
+
+    Args:
+        shape (tuple): Shape of the array.
+
+    """
+
+    __slots__ = ("shape", "_size")
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self._size = 1
+        for n in self.shape:
+            self._size *= n
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, position):
+        position = range(self._size)[position]
+        indices = []
+        for n in reversed(self.shape):
+            position, index = divmod(position, n)
+            indices.append(str(index))
+        return "_".join(reversed(indices))
+
+    def index(self, name):
+        parts = name.split("_") if self.shape else []
+        valid = len(parts) == len(self.shape) and "_".join(parts) == name
+        out = 0
+        for part, n in zip(parts, self.shape):
+            valid = part.isdecimal() and str(int(part)) == part and int(part) < n
+            if not valid:
+                break
+            out = out * n + int(part)
+        if not valid:
+            raise ValueError(f"{name!r} is not the name of an array element.")
+        return out
+
+
+def _flatten_numpy_array(arr):
+    """Flatten an array into a list of Python scalars."""
+    return arr.ravel().tolist(), arr.shape
+
+
+def _flatten_array(arr):
+    """Flatten an array into a view of its elements, which is a copy if needed."""
+    return arr.ravel(), arr.shape
+
+
+def _unflatten_numpy_array(aux_data, leaves):
+    """Reshape the leaves into an array. A slice of an array is not copied."""
+    import numpy as np
+
+    return np.asarray(leaves).reshape(aux_data)
+
+
 def _jax_array():
     if IS_JAX_INSTALLED:
         entry = {
             "jax.numpy.ndarray": {
-                "flatten": lambda arr: (arr.flatten().tolist(), arr.shape),
-                "unflatten": lambda aux_data, leaves: jax.numpy.array(leaves).reshape(
-                    aux_data
-                ),
+                "flatten": _flatten_jax_array,
+                "unflatten": _unflatten_jax_array,
                 "names": _array_element_names,
+                "lazy_names": _ArrayElementNames,
+                "flatten_block": _flatten_array,
+                "unflatten_block": _unflatten_jax_array,
             },
         }
     else:
@@ -136,17 +214,42 @@ def _jax_array():
     return entry
 
 
+def _flatten_jax_array(arr):
+    """Flatten a jax array into a list of Python scalars.
+
+    The elements are taken from a numpy view, which does not copy arrays on the CPU.
+
+    """
+    import numpy as np
+
+    return np.asarray(arr).ravel().tolist(), arr.shape
+
+
+def _unflatten_jax_array(aux_data, leaves):
+    import jax.numpy as jnp
+
+    return jnp.asarray(leaves).reshape(aux_data)
+
+
 def _pandas_series():
     """Create registry entry for pandas.Series."""
     if IS_PANDAS_INSTALLED:
+        import pandas as pd
+
         entry = {
             pd.Series: {
                 "flatten": lambda sr: (
                     sr.tolist(),
                     {"index": sr.index, "name": sr.name},
                 ),
-                "unflatten": lambda aux_data, leaves: pd.Series(leaves, **aux_data),
-                "names": lambda sr: list(sr.index.map(_index_element_to_string)),
+                "unflatten": _unflatten_pandas_series,
+                "names": lambda sr: _index_strings(sr.index).tolist(),
+                "lazy_names": lambda aux_data: _IndexElementNames(aux_data["index"]),
+                "flatten_block": lambda sr: (
+                    sr.to_numpy(),
+                    {"index": sr.index, "name": sr.name},
+                ),
+                "unflatten_block": _unflatten_pandas_series_block,
             },
         }
     else:
@@ -154,14 +257,34 @@ def _pandas_series():
     return entry
 
 
+def _unflatten_pandas_series(aux_data, leaves):
+    import pandas as pd
+
+    return pd.Series(leaves, **aux_data)
+
+
+def _unflatten_pandas_series_block(aux_data, block):
+    import numpy as np
+    import pandas as pd
+
+    return pd.Series(np.asarray(block), **aux_data, copy=False)
+
+
 def _pandas_dataframe():
     """Create registry entry for pandas.DataFrame."""
     if IS_PANDAS_INSTALLED:
+        import pandas as pd
+
         entry = {
             pd.DataFrame: {
                 "flatten": _flatten_pandas_dataframe,
                 "unflatten": _unflatten_pandas_dataframe,
                 "names": _get_names_pandas_dataframe,
+                "lazy_names": lambda aux_data: _IndexElementNames(
+                    aux_data["index"], aux_data["columns"]
+                ),
+                "flatten_block": _flatten_pandas_dataframe_block,
+                "unflatten_block": _unflatten_pandas_dataframe_block,
             }
         }
     else:
@@ -170,26 +293,171 @@ def _pandas_dataframe():
 
 
 def _flatten_pandas_dataframe(df):
-    flat = df.to_numpy().flatten().tolist()
-    aux_data = {"columns": df.columns, "index": df.index, "shape": df.shape}
+    """Flatten a DataFrame row by row.
+
+    Each column is converted separately, such that columns of different dtypes are not
+    converted to a common object array, and the columns are interleaved afterwards.
+    The index and columns are shared with the auxiliary data.
+
+    """
+    columns = [column.tolist() for _, column in df.items()]
+    flat = list(itertools.chain.from_iterable(zip(*columns)))
+    aux_data = {
+        "columns": df.columns,
+        "index": df.index,
+        "shape": df.shape,
+        "dtypes": df.dtypes.tolist(),
+    }
     return flat, aux_data
 
 
 def _unflatten_pandas_dataframe(aux_data, leaves):
+    import pandas as pd
+
+    n_columns = aux_data["shape"][1]
+    data = {}
+    for position, dtype in enumerate(aux_data["dtypes"]):
+        values = leaves[position::n_columns]
+        if len(values) == 0:
+            # without rows, the dtype cannot be inferred from the leaves
+            column = pd.Series(values, dtype=dtype)
+        else:
+            column = pd.Series(values)
+            # keep the original dtype as long as the leaves have the same kind, e.g.
+            # float32 columns or categoricals
+            if column.dtype != dtype and column.dtype.kind == dtype.kind:
+                column = column.astype(dtype)
+        data[position] = column.array
+
+    out = pd.DataFrame(data, index=aux_data["index"], copy=False)
+    out.columns = aux_data["columns"]
+    return out
+
+
+def _flatten_pandas_dataframe_block(df):
+    block = df.to_numpy().ravel()
+    aux_data = {"columns": df.columns, "index": df.index, "shape": df.shape}
+    return block, aux_data
+
+
+def _unflatten_pandas_dataframe_block(aux_data, block):
+    import numpy as np
+    import pandas as pd
+
     out = pd.DataFrame(
-        data=np.array(leaves).reshape(aux_data["shape"]),
+        data=np.asarray(block).reshape(aux_data["shape"]),
         columns=aux_data["columns"],
         index=aux_data["index"],
+        copy=False,
     )
     return out
 
 
 def _get_names_pandas_dataframe(df):
-    index_strings = list(df.index.map(_index_element_to_string))
-    out = ["_".join([loc, col]) for loc, col in product(index_strings, df.columns)]
+    import numpy as np
+
+    index_strings = _index_strings(df.index)
+    column_suffixes = "_" + np.asarray(df.columns, dtype=object)
+    out = np.add.outer(index_strings, column_suffixes).ravel().tolist()
     return out
 
 
+def _index_strings(index):
+    """Convert the elements of a pandas Index to strings.
+
+    The result is cached for the ``INDEX_STRINGS_CACHE_SIZE`` most recently used
+    indices. Since indices are immutable, the cache is keyed by their identity.
+
+    Args:
+        index (pandas.Index): The index.
+
+    Returns:
+        numpy.ndarray: Object array with the string of each element. See
+        :func:`_index_element_to_string`.
+
+    """
+    key = id(index)
+    cached = _INDEX_STRINGS.get(key)
+    if cached is not None and cached[0] is index:
+        _INDEX_STRINGS.move_to_end(key)
+        out = cached[1]
+    else:
+        out = _compute_index_strings(index)
+        _INDEX_STRINGS[key] = (index, out)
+        if len(_INDEX_STRINGS) > INDEX_STRINGS_CACHE_SIZE:
+            _INDEX_STRINGS.popitem(last=False)
+    return out
+
+
+def _compute_index_strings(index):
+    """Convert index elements to strings with vectorized operations where possible.
+
+    The strings of a MultiIndex are created once per level value and then combined
+    with the codes of each level. Missing values in a MultiIndex have the code -1,
+    which selects "nan", the last entry of the strings of each level.
+
+    """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(index, pd.MultiIndex):
+        out = None
+        for level, codes in zip(index.levels, index.codes):
+            strings = np.append(_compute_index_strings(level), "nan")
+            part = strings[codes]
+            out = part if out is None else out + "_" + part
+    elif index.inferred_type == "string":
+        out = np.asarray(index, dtype=object)
+    elif index.inferred_type in ("integer", "boolean"):
+        out = np.asarray(index.astype(str), dtype=object)
+    else:
+        out = np.array([_index_element_to_string(e) for e in index], dtype=object)
+    return out
+
+
+class _IndexElementNames:
+    """Names of Series or DataFrame elements that are created when they are accessed.
+
+    Used as "lazy_names" registry entry. Looking up a position by name creates all
+    names once.
+
+    Args:
+        index (pandas.Index): The index of the Series or DataFrame.
+        columns (pandas.Index or None): The columns of the DataFrame.
+
+    """
+
+    __slots__ = ("_index", "_columns", "_positions")
+
+    def __init__(self, index, columns=None):
+        self._index = index
+        self._columns = columns
+        self._positions = None
+
+    def __len__(self):
+        n_columns = 1 if self._columns is None else len(self._columns)
+        return len(self._index) * n_columns
+
+    def __getitem__(self, position):
+        position = range(len(self))[position]
+        if self._columns is None:
+            out = _index_element_to_string(self._index[position])
+        else:
+            row, column = divmod(position, len(self._columns))
+            loc = _index_element_to_string(self._index[row])
+            out = "_".join([loc, self._columns[column]])
+        return out
+
+    def index(self, name):
+        if self._positions is None:
+            self._positions = {}
+            for position in range(len(self)):
+                self._positions.setdefault(self[position], position)
+        if name not in self._positions:
+            raise ValueError(f"{name!r} is not the name of an element.")
+        return self._positions[name]
+
+
 def _index_element_to_string(element):
     if isinstance(element, (tuple, list)):
         as_strings = [str(entry) for entry in element]
@@ -0,0 +1,268 @@
+"""Save pytrees to a single file whose arrays can be memory mapped.
+
+A file starts with ``MAGIC``, followed by the length of the header and the pickled
+header. The header contains the nodes of the treedef without their unflatten functions
+and a description of each leaf. numpy arrays and the columns of pandas objects with
+numpy dtypes are stored after the header as raw buffers that start at multiples of
+``ALIGNMENT`` bytes. All other leaves are pickled into the header.
+
+When a file is loaded, the unflatten functions are looked up in the registry, so the
+types of all containers need to be in the registry passed to :func:`tree_load`. Since
+the header is a pickle, files should only be loaded from trusted sources.
+
+"""
+import mmap as mmap_module
+import struct
+import sys
+
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _tree_flatten_with_treedef
+from pybaum.treedef import Node
+from pybaum.treedef import PyTreeDef
+from pybaum.typecheck import _is_pandas_object
+
+MAGIC = b"PYBAUM\x00\x01"
+
+ALIGNMENT = 64
+
+WRITE_CHUNK_SIZE = 2**20
+"""int: Number of elements of non-contiguous arrays that are copied at once."""
+
+_LENGTH = struct.Struct("<Q")
+
+
+def tree_save(path, tree, is_leaf=None, registry=None):
+    """Save a pytree to a file.
+
+    The arrays of the tree are written one after the other without creating copies
+    of them, except for chunks of ``WRITE_CHUNK_SIZE`` elements of arrays that are not
+    C-contiguous.
+
+    Args:
+        path (str or pathlib.Path): The file.
+        tree: a pytree. numpy arrays, pandas Series and DataFrames are stored as leaves
+            even if they are in the registry.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    header, buffers = _encode(tree, is_leaf, registry)
+    # pickle is imported here because importing it makes ``import pybaum`` slow.
+    import pickle
+
+    header = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for arr in buffers:
+            f.write(b"\x00" * (-f.tell() % ALIGNMENT))
+            _write_array(f, arr)
+
+
+def tree_load(path, mmap=True, registry=None):
+    """Load a pytree that was saved with :func:`tree_save`.
+
+    Args:
+        path (str or pathlib.Path): The file.
+        mmap (bool): Whether numpy arrays and the columns of pandas objects are
+            read-only memory mapped views into the file. Otherwise, they are read into
+            writeable arrays in memory.
+        registry (dict or None): A pytree container registry that contains the types of
+            all containers of the saved pytree. None means that the default registry
+            is used.
+
+    Returns:
+        The pytree.
+
+    """
+    import pickle
+
+    import numpy as np
+
+    registry = _process_pytree_registry(registry)
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a file written by tree_save.")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = pickle.loads(f.read(length))
+
+        offsets, _ = _aligned_offsets(
+            len(MAGIC) + _LENGTH.size + length, header["sizes"]
+        )
+
+        if not mmap:
+            buffers = []
+            for offset, size in zip(offsets, header["sizes"]):
+                buffer = np.empty(size, dtype=np.uint8)
+                f.seek(offset)
+                f.readinto(buffer)
+                buffers.append(buffer)
+        else:
+            # Arrays are plain ndarrays that keep the map open as long as they exist.
+            data = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ)
+            buffers = [
+                np.frombuffer(data, dtype=np.uint8, count=size, offset=offset)
+                for offset, size in zip(offsets, header["sizes"])
+            ]
+
+    out = _decode(header, buffers, registry)
+    return out
+
+
+def _encode(tree, is_leaf, registry):
+    """Split a pytree into a picklable header and the raw buffers of its arrays.
+
+    Returns:
+        tuple: The header, a dict with the nodes of the treedef without their unflatten
+        functions, the descriptions of the leaves and the sizes of the buffers, and the
+        list of buffers.
+
+    """
+
+    def is_stored_leaf(obj):
+        return _is_numpy_array(obj) or _is_pandas_object(obj) or is_leaf(obj)
+
+    leaves, treedef = _tree_flatten_with_treedef(tree, is_stored_leaf, registry)
+
+    buffers = []
+    specs = [_leaf_spec(leaf, buffers) for leaf in leaves]
+    header = {
+        "nodes": [node[:-1] for node in treedef._nodes],
+        "leaves": specs,
+        "sizes": [arr.nbytes for arr in buffers],
+    }
+    return header, buffers
+
+
+def _decode(header, buffers, registry):
+    """Reconstruct a pytree from the output of :func:`_encode`.
+
+    ``buffers`` are one-dimensional uint8 arrays. The arrays of the pytree are views
+    into them.
+
+    """
+    leaves = [_load_leaf(spec, buffers) for spec in header["leaves"]]
+
+    nodes = []
+    for node_type, aux_data, num_children, num_leaves, num_nodes in header["nodes"]:
+        unflatten = None if node_type is None else registry[node_type]["unflatten"]
+        nodes.append(
+            Node(node_type, aux_data, num_children, num_leaves, num_nodes, unflatten)
+        )
+    out = PyTreeDef(nodes).unflatten(leaves)
+    return out
+
+
+def _aligned_offsets(start, sizes):
+    """Compute the offsets of buffers that start at multiples of ``ALIGNMENT``.
+
+    Returns:
+        tuple: The list of offsets and the end of the last buffer.
+
+    """
+    offsets = []
+    position = start
+    for size in sizes:
+        position += -position % ALIGNMENT
+        offsets.append(position)
+        position += size
+    return offsets, position
+
+
+def _is_numpy_array(obj):
+    return "numpy" in sys.modules and isinstance(obj, sys.modules["numpy"].ndarray)
+
+
+def _leaf_spec(leaf, buffers):
+    """Describe how a leaf is stored and append its raw buffers to buffers."""
+    if _is_numpy_array(leaf) and not leaf.dtype.hasobject:
+        out = ("array", _column_spec(leaf, buffers), leaf.shape)
+    elif _is_pandas_object(leaf) and leaf.ndim == 1:
+        out = ("series", _column_spec(leaf, buffers), leaf.index, leaf.name)
+    elif _is_pandas_object(leaf):
+        columns = [_column_spec(column, buffers) for _, column in leaf.items()]
+        out = ("frame", columns, leaf.index, leaf.columns)
+    else:
+        out = ("object", leaf)
+    return out
+
+
+def _column_spec(values, buffers):
+    """Describe a one-dimensional array or pandas column.
+
+    Columns with numpy dtypes are stored as raw buffers, all other columns, e.g. with
+    extension dtypes, are pickled.
+
+    """
+    import numpy as np
+
+    if _is_pandas_object(values):
+        arr = values.to_numpy() if isinstance(values.dtype, np.dtype) else None
+        values = values.array
+    else:
+        arr = values
+    if arr is None or arr.dtype.hasobject:
+        out = ("pickled", values)
+    else:
+        out = ("raw", arr.dtype.str, len(buffers))
+        buffers.append(arr)
+    return out
+
+
+def _load_column(spec, buffers):
+    if spec[0] == "pickled":
+        out = spec[1]
+    else:
+        out = buffers[spec[2]].view(spec[1])
+    return out
+
+
+def _load_leaf(spec, buffers):
+    kind = spec[0]
+    if kind == "array":
+        out = _load_column(spec[1], buffers).reshape(spec[2])
+    elif kind == "series":
+        import pandas as pd
+
+        values = _load_column(spec[1], buffers)
+        out = pd.Series(values, index=spec[2], name=spec[3], copy=False)
+    elif kind == "frame":
+        import pandas as pd
+
+        columns = {i: _load_column(column, buffers) for i, column in enumerate(spec[1])}
+        out = pd.DataFrame(columns, index=spec[2], copy=False)
+        out.columns = spec[3]
+    else:
+        out = spec[1]
+    return out
+
+
+def _write_array(f, arr):
+    """Write the elements of arr in C order to f without copying the whole array."""
+    import numpy as np
+
+    if arr.flags.c_contiguous:
+        f.write(arr.reshape(-1).view(np.uint8))
+    else:
+        flat = arr.flat
+        for start in range(0, arr.size, WRITE_CHUNK_SIZE):
+            chunk = flat[start : start + WRITE_CHUNK_SIZE]
+            f.write(np.ascontiguousarray(chunk).view(np.uint8))
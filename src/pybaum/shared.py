@@ -0,0 +1,190 @@
+"""Send pytrees to other processes through shared memory.
+
+A :class:`SharedTree` copies the arrays of a pytree once into a block of
+:mod:`multiprocessing.shared_memory`. Pickling it only pickles the name of the block
+and a compact header with the treedef and small leaves, in the same format as
+:func:`~pybaum.serialization.tree_save`. A process that unpickles it attaches to the
+block and reconstructs the pytree with views into the block, without copying the
+arrays.
+
+"""
+import os
+import sys
+
+from pybaum.serialization import _aligned_offsets
+from pybaum.serialization import _decode
+from pybaum.serialization import _encode
+from pybaum.serialization import _write_array
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+
+
+class SharedTree:
+    """A pytree whose arrays live in shared memory.
+
+    The process that creates a SharedTree owns the shared memory block. It has to
+    call :meth:`unlink` once no process needs the pytree anymore. Every process has
+    to call :meth:`close` before it exits, after the pytrees returned by
+    :meth:`to_tree` are deleted. Using the SharedTree as a context manager calls both
+    in the owning process and :meth:`close` in all other processes.
+
+    Example:
+
+    >>> import numpy as np
+    >>> with SharedTree({"a": np.arange(3.0), "b": [1, 2]}) as shared:
+    ...     tree = shared.to_tree()
+    ...     print(tree["a"], tree["b"])
+    ...     del tree
+    [0. 1. 2.] [1, 2]
+
+    Args:
+        tree: a pytree. numpy arrays, pandas Series and DataFrames are leaves even if
+            they are in the registry. Their numeric buffers are copied to shared
+            memory, all other leaves are pickled with the header.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    """
+
+    def __init__(self, tree, is_leaf=None, registry=None):
+        from multiprocessing.shared_memory import SharedMemory
+
+        registry = _process_pytree_registry(registry)
+        is_leaf = _process_is_leaf(is_leaf)
+        self._header, buffers = _encode(tree, is_leaf, registry)
+        self._offsets, size = _aligned_offsets(0, self._header["sizes"])
+        # Blocks of size zero are not allowed.
+        self._shm = SharedMemory(create=True, size=max(size, 1))
+        self._owner = True
+        for arr, offset in zip(buffers, self._offsets):
+            _write_array(_BufferWriter(self._shm.buf, offset), arr)
+
+    @property
+    def name(self):
+        """str: The name of the shared memory block."""
+        return self._shm.name
+
+    @property
+    def nbytes(self):
+        """int: The size of the shared memory block in bytes."""
+        return self._shm.size
+
+    def to_tree(self, registry=None):
+        """Reconstruct the pytree with views into the shared memory block.
+
+        Arrays and the columns of pandas objects are writeable views, i.e. changes are
+        visible to all processes.
+
+        Args:
+            registry (dict or None): A pytree container registry that contains the
+                types of all containers of the pytree. None means that the default
+                registry is used.
+
+        Returns:
+            The pytree.
+
+        """
+        import numpy as np
+
+        registry = _process_pytree_registry(registry)
+        buffers = [
+            np.frombuffer(self._shm.buf, dtype=np.uint8, count=size, offset=offset)
+            for offset, size in zip(self._offsets, self._header["sizes"])
+        ]
+        out = _decode(self._header, buffers, registry)
+        return out
+
+    def close(self):
+        """Detach this process from the shared memory block.
+
+        Raises:
+            BufferError: If pytrees returned by :meth:`to_tree` still exist.
+
+        """
+        self._shm.close()
+
+    def unlink(self):
+        """Free the shared memory block. Only allowed in the owning process."""
+        if not self._owner:
+            raise RuntimeError(
+                "Only the process that created the SharedTree can free it."
+            )
+        if sys.version_info < (3, 13) and os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            # Processes that share the resource tracker with the owner unregister the
+            # block when they attach to it, see ``_attach``. Registering is idempotent
+            # and unlinking unregisters the block again.
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.close()
+        finally:
+            if self._owner:
+                self.unlink()
+
+    def __getstate__(self):
+        return {"name": self.name, "header": self._header, "offsets": self._offsets}
+
+    def __setstate__(self, state):
+        self._header = state["header"]
+        self._offsets = state["offsets"]
+        self._shm = _attach(state["name"])
+        self._owner = False
+
+    def __repr__(self):
+        return f"SharedTree(name={self.name!r}, nbytes={self.nbytes})"
+
+
+def _attach(name):
+    """Attach to an existing shared memory block.
+
+    Before Python 3.13, attaching registers the block with the resource tracker on
+    POSIX systems, which then frees it when the attaching process exits, see
+    https://github.com/python/cpython/issues/82300. Since the owner is responsible for
+    freeing the block, it is unregistered again. If the attaching process shares the
+    resource tracker with the owner, this also removes the registration of the owner,
+    so :meth:`SharedTree.unlink` registers the block again before freeing it.
+
+    """
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+
+    if sys.version_info >= (3, 13):
+        out = SharedMemory(name=name, track=False)
+    else:
+        out = SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(out._name, "shared_memory")
+    return out
+
+
+class _BufferWriter:
+    """File-like object that writes into a memoryview, used by ``_write_array``."""
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        self._position = offset
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        stop = self._position + len(data)
+        self._buffer[self._position : stop] = data
+        self._position = stop
@@ -0,0 +1,193 @@
+"""Convert between lists of pytrees and pytrees of stacked arrays.
+
+Population based optimizers evaluate many pytrees with the same structure at once.
+:func:`tree_stack` combines them into one pytree whose leaves have an additional
+dimension that indexes the trees, and :func:`tree_unstack` splits such a pytree again.
+numpy arrays, jax arrays and pandas objects are always stacked as a whole, i.e. they
+are treated as leaves even if they are in the registry.
+
+"""
+from pybaum.tree_util import _process_is_leaf
+from pybaum.tree_util import _process_pytree_registry
+from pybaum.tree_util import _structure_mismatch
+from pybaum.tree_util import _tree_flatten_with_treedef
+from pybaum.typecheck import _is_pandas_object
+from pybaum.typecheck import _whole_is_leaf
+from pybaum.typecheck import get_type
+
+
+def tree_stack(trees, axis=0, is_leaf=None, registry=None):
+    """Stack pytrees with the same structure into one pytree.
+
+    The structure of each tree is compared to the first one by its treedef. Then the
+    leaves at each position are combined with a single call of :func:`numpy.stack`, or
+    :func:`jax.numpy.stack` for jax arrays, such that numbers become one-dimensional
+    arrays. pandas objects are combined with a single call of :func:`pandas.concat`
+    along the rows, such that the outer level of their index is the position of the
+    tree in ``trees``. ``axis`` does not apply to them.
+
+    Example:
+
+    >>> stacked = tree_stack([{"a": 1.0, "b": [2, 3]}, {"a": 4.0, "b": [5, 6]}])
+    >>> stacked["a"]
+    array([1., 4.])
+    >>> stacked["b"][1]
+    array([3, 6])
+
+    Args:
+        trees (list): Non-empty list of pytrees with the same structure. Leaves at the
+            same position need to be numbers or arrays of the same shape or pandas
+            objects of the same shape.
+        axis (int): The axis of the stacked arrays that indexes the trees.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        The stacked pytree.
+
+    Raises:
+        ValueError: If trees is empty, the trees have different structures or leaves
+            at the same position have different shapes.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _whole_is_leaf(_process_is_leaf(is_leaf))
+    trees = list(trees)
+    if not trees:
+        raise ValueError("tree_stack needs at least one tree.")
+
+    first_leaves, treedef = _tree_flatten_with_treedef(trees[0], is_leaf, registry)
+    all_leaves = [first_leaves]
+    for tree in trees[1:]:
+        leaves, other_treedef = _tree_flatten_with_treedef(tree, is_leaf, registry)
+        if other_treedef != treedef:
+            raise _structure_mismatch(trees[0], tree)
+        all_leaves.append(leaves)
+
+    stacked = [_stack(column, axis) for column in zip(*all_leaves)]
+    out = treedef.unflatten(stacked)
+    return out
+
+
+def tree_unstack(tree, axis=0, is_leaf=None, registry=None):
+    """Split a stacked pytree into a list of pytrees.
+
+    This is the inverse of :func:`tree_stack`. numpy arrays are split into views along
+    ``axis``. pandas objects are split by the outer level of their index into views
+    whose index is the remaining levels.
+
+    Example:
+
+    >>> import numpy as np
+    >>> stacked = {"a": np.array([1.0, 4.0]), "b": np.array([[2, 3], [5, 6]])}
+    >>> trees = tree_unstack(stacked)
+    >>> len(trees)
+    2
+    >>> trees[1]["b"]
+    array([5, 6])
+
+    Args:
+        tree: a pytree whose leaves are arrays with the same length along ``axis`` or
+            pandas objects as created by :func:`tree_stack`.
+        axis (int): The axis of the arrays that indexes the trees.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        list: The pytrees.
+
+    Raises:
+        ValueError: If the tree has no leaves, its leaves have different lengths or the
+            rows of a tree in a pandas object are not contiguous.
+
+    """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _whole_is_leaf(_process_is_leaf(is_leaf))
+    leaves, treedef = _tree_flatten_with_treedef(tree, is_leaf, registry)
+    if not leaves:
+        raise ValueError("The number of trees of a pytree without leaves is unknown.")
+
+    columns = [_unstack(leaf, axis) for leaf in leaves]
+    if len({len(column) for column in columns}) > 1:
+        raise ValueError("All leaves must have the same length along the stacked axis.")
+    out = [treedef.unflatten(list(members)) for members in zip(*columns)]
+    return out
+
+
+def _stack(leaves, axis):
+    """Combine the leaves at one position of all trees."""
+    first = leaves[0]
+    if _is_pandas_object(first):
+        import pandas as pd
+
+        if len({leaf.shape for leaf in leaves}) > 1:
+            raise ValueError(
+                "pandas objects at the same position must have the same shape."
+            )
+        out = pd.concat(leaves, keys=range(len(leaves)))
+    elif get_type(first) == "jax.numpy.ndarray":
+        import jax.numpy as jnp
+
+        out = jnp.stack(leaves, axis=axis)
+    else:
+        import numpy as np
+
+        out = np.stack(leaves, axis=axis)
+    return out
+
+
+def _unstack(leaf, axis):
+    """Split a stacked leaf into a list with one entry per tree."""
+    if _is_pandas_object(leaf):
+        import numpy as np
+
+        index = leaf.index
+        if index.nlevels < 2:
+            raise ValueError(
+                "Stacked pandas objects need an index whose outer level is the "
+                "position of the tree, as created by tree_stack."
+            )
+        # The levels of a MultiIndex are not pruned when it is sliced, so the trees
+        # are the runs of equal codes of the outer level.
+        codes = np.asarray(index.codes[0])
+        stops = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.append(0, stops) if len(codes) else stops
+        stops = np.append(stops, len(codes))
+        if len(np.unique(codes[starts])) < len(starts):
+            raise ValueError("The rows of each tree must be contiguous.")
+        # Slicing a MultiIndex is slow, so the outer level is dropped once.
+        flat = leaf.set_axis(index.droplevel(0), axis=0)
+        out = [flat.iloc[start:stop] for start, stop in zip(starts, stops)]
+    elif get_type(leaf) == "jax.numpy.ndarray":
+        import jax.numpy as jnp
+
+        out = list(jnp.moveaxis(leaf, axis, 0))
+    else:
+        import numpy as np
+
+        out = list(np.moveaxis(leaf, axis, 0))
+    return out
@@ -6,8 +6,20 @@ The functions are not completely identical to jax. The most notable differences
 - The treedef containing information to unflatten pytrees is implemented differently.
 
 """
-from pybaum.equality import EQUALITY_CHECKERS
+import reprlib
+from collections import deque
+from itertools import repeat
+
+from pybaum.equality import get_equality_checkers
+from pybaum.equality import get_tolerance_checkers
+from pybaum.registry import get_dispatch_table
 from pybaum.registry import get_registry
+from pybaum.registry import resolve_type
+from pybaum.treedef import _aux_data_equal
+from pybaum.treedef import LEAF
+from pybaum.treedef import Node
+from pybaum.treedef import PyTreeDef
+from pybaum.typecheck import _is_pandas_object
 from pybaum.typecheck import get_type
 
 
@@ -33,15 +45,14 @@ def tree_flatten(tree, is_leaf=None, registry=None):
 
     Returns:
         A pair where the first element is a list of leaf values and the second
-        element is a treedef representing the structure of the flattened tree.
+        element is a :class:`~pybaum.treedef.PyTreeDef` representing the structure of
+        the flattened tree.
 
     """
     registry = _process_pytree_registry(registry)
     is_leaf = _process_is_leaf(is_leaf)
 
-    flat = _tree_flatten(tree, is_leaf=is_leaf, registry=registry)
-    # unflatten the flat tree to make a copy
-    treedef = tree_unflatten(tree, flat, is_leaf=is_leaf, registry=registry)
+    flat, treedef = _tree_flatten_with_treedef(tree, is_leaf, registry)
     return flat, treedef
 
 
@@ -78,19 +89,231 @@ def tree_just_flatten(tree, is_leaf=None, registry=None):
 
 
 def _tree_flatten(tree, is_leaf, registry):
-    out = []
-    tree_type = get_type(tree)
+    leaves = []
+    _consume(_walk(tree, is_leaf, registry, leaves))
+    return leaves
+
+
+def _tree_flatten_with_treedef(tree, is_leaf, registry, block_positions=None):
+    """Flatten a pytree and create its treedef in a single traversal.
+
+    If ``block_positions`` is a list, registry entries with a "flatten_block" function
+    contribute one block to the leaves and its position is appended to
+    ``block_positions``.
+
+    Returns:
+        tuple: The list of leaves and the :class:`~pybaum.treedef.PyTreeDef`.
+
+    """
+    leaves, nodes = [], []
+    walker = _walk(
+        tree, is_leaf, registry, leaves, nodes=nodes, block_positions=block_positions
+    )
+    _consume(walker)
+    return leaves, PyTreeDef(nodes)
+
+
+_UNRESOLVED = object()
+
+BULK_MIN_CHILDREN = 8
+"""int: Minimum number of children of a container that are checked to be added in bulk.
+
+For smaller containers, checking the types of all children costs more than visiting
+them one by one.
+
+"""
 
-    if tree_type not in registry or is_leaf(tree):
-        out.append(tree)
-    else:
-        subtrees, _ = registry[tree_type]["flatten"](tree)
-        for subtree in subtrees:
-            if get_type(subtree) in registry:
-                out += _tree_flatten(subtree, is_leaf, registry)
-            else:
-                out.append(subtree)
-    return out
+
+def _walk(
+    tree,
+    is_leaf,
+    registry,
+    leaves,
+    nodes=None,
+    names=None,
+    separator="_",
+    block_positions=None,
+    containers=None,
+    lazy=False,
+):
+    """Traverse a pytree depth first with an explicit stack.
+
+    This is the traversal engine behind the functions in this module. It does not
+    recurse, so the depth of a pytree is not limited by the recursion limit, it
+    visits every node exactly once and appends all results to the same output lists.
+
+    The function is a generator. If ``lazy`` is True, it yields None whenever it
+    enters or leaves a container, such that the leaves can be consumed lazily. Use
+    :func:`_consume` to run the traversal to completion.
+
+    Args:
+        tree: A pytree.
+        is_leaf (callable): Function that returns True if a subtree should be treated
+            as a leaf.
+        registry (dict): A pytree container registry.
+        leaves (list): List to which the leaves are appended.
+        nodes (list or None): If a list, the :class:`~pybaum.treedef.Node` objects of
+            the treedef are appended in post-order.
+        names (list or None): If a list, the names of the leaves are appended.
+        separator (str): String that separates the building blocks of leaf names.
+        block_positions (list or None): If a list, objects whose registry entry has a
+            "flatten_block" function are appended to ``leaves`` as a single block and
+            the position of the block in ``leaves`` is appended to block_positions.
+            Requires that ``nodes`` is a list.
+        containers (list or None): If a list, a tuple with the names of the children
+            and the shape of each container is appended whenever its node is appended
+            to ``nodes``. Requires that ``nodes`` is a list.
+        lazy (bool): Whether to yield control after each step.
+
+    """
+    record = nodes is not None
+    extra_leaves = 0
+    name = None
+    dispatch = get_dispatch_table(registry)
+    # A frame holds the iterators over the children and their names, the name of the
+    # container and the information needed to create its node once it is left.
+    stack = [(iter([tree]), iter([None]), None, None, None, None, 1, 0, 0, None)]
+
+    while stack:
+        frame = stack[-1]
+        children, child_names, prefix = frame[:3]
+        for subtree in children:
+            if names is not None:
+                name = _add_prefix(prefix, next(child_names), separator)
+
+            resolved = dispatch.get(type(subtree), _UNRESOLVED)
+            if resolved is _UNRESOLVED:
+                resolved = resolve_type(subtree, registry, dispatch)
+
+            if resolved is None or is_leaf(subtree):
+                leaves.append(subtree)
+                if record:
+                    nodes.append(LEAF)
+                if names is not None:
+                    names.append(name)
+                continue
+
+            tree_type, entry = resolved
+            if block_positions is not None and "flatten_block" in entry:
+                block, aux_data = entry["flatten_block"](subtree)
+                block_positions.append(len(leaves))
+                leaves.append(block)
+                extra_leaves += len(block) - 1
+                nodes.append(
+                    Node(
+                        tree_type, aux_data, 0, len(block), 1, entry["unflatten_block"]
+                    )
+                )
+                continue
+
+            subtrees, aux_data = entry["flatten"](subtree)
+            if not hasattr(subtrees, "__len__"):
+                subtrees = list(subtrees)
+            info = None
+            if containers is not None:
+                lazy_names = entry.get("lazy_names")
+                if lazy_names is None:
+                    info = (entry["names"](subtree), getattr(subtree, "shape", None))
+                else:
+                    info = (lazy_names(aux_data), getattr(subtree, "shape", None))
+
+            if (
+                len(subtrees) >= BULK_MIN_CHILDREN
+                and type(dispatch) is dict
+                and _all_leaf_types(subtrees, dispatch)
+            ):
+                # Containers whose children are all leaves, e.g. wide lists of numbers,
+                # are added in bulk instead of visiting the children one by one. This
+                # is skipped for the dispatch tables of profiled registries, which count
+                # the lookup of each child.
+                num_children = len(subtrees)
+                leaves.extend(subtrees)
+                if names is not None:
+                    names.extend(
+                        _add_prefix(name, child_name, separator)
+                        for child_name in entry["names"](subtree)
+                    )
+                if record:
+                    nodes.extend(repeat(LEAF, num_children))
+                    nodes.append(
+                        Node(
+                            tree_type,
+                            aux_data,
+                            num_children,
+                            num_children,
+                            num_children + 1,
+                            entry["unflatten"],
+                        )
+                    )
+                    if containers is not None:
+                        containers.append(info)
+                continue
+
+            child_names = None if names is None else iter(entry["names"](subtree))
+            if not record:
+                # Only the iterators and the name are needed if no nodes are created.
+                stack.append((iter(subtrees), child_names, name))
+                break
+            stack.append(
+                (
+                    iter(subtrees),
+                    child_names,
+                    name,
+                    tree_type,
+                    entry,
+                    aux_data,
+                    len(subtrees),
+                    len(leaves) + extra_leaves,
+                    len(nodes),
+                    info,
+                )
+            )
+            break
+        else:
+            stack.pop()
+            if record and frame[4] is not None:
+                (
+                    _,
+                    _,
+                    _,
+                    node_type,
+                    entry,
+                    aux_data,
+                    num_children,
+                    n_leaves,
+                    n_nodes,
+                    info,
+                ) = frame
+                node = Node(
+                    node_type,
+                    aux_data,
+                    num_children,
+                    len(leaves) + extra_leaves - n_leaves,
+                    len(nodes) - n_nodes + 1,
+                    entry["unflatten"],
+                )
+                nodes.append(node)
+                if containers is not None:
+                    containers.append(info)
+        if lazy:
+            yield
+
+
+def _all_leaf_types(subtrees, dispatch):
+    """Check whether the dispatch table knows that all subtrees are leaves.
+
+    Types that are not yet in the dispatch table are resolved when the children are
+    visited one by one, so the fast path is taken from the next container on.
+
+    """
+    return all(
+        dispatch.get(typ, _UNRESOLVED) is None for typ in set(map(type, subtrees))
+    )
+
+
+def _consume(walker):
+    """Run a traversal created by :func:`_walk` to completion."""
+    deque(walker, maxlen=0)
 
 
 def tree_yield(tree, is_leaf=None, registry=None):
@@ -115,14 +338,16 @@ def tree_yield(tree, is_leaf=None, registry=None):
 
     Returns:
         A pair where the first element is a generator of leaf values and the second
-        element is a treedef representing the structure of the flattened tree.
+        element is a :class:`~pybaum.treedef.PyTreeDef` representing the structure of
+        the flattened tree.
 
     """
     registry = _process_pytree_registry(registry)
     is_leaf = _process_is_leaf(is_leaf)
 
     flat = _tree_yield(tree, is_leaf=is_leaf, registry=registry)
-    return flat, tree
+    treedef = _tree_structure(tree, is_leaf=is_leaf, registry=registry)
+    return flat, treedef
 
 
 def tree_just_yield(tree, is_leaf=None, registry=None):
@@ -157,19 +382,10 @@ def tree_just_yield(tree, is_leaf=None, registry=None):
 
 
 def _tree_yield(tree, is_leaf, registry):
-    out = []
-    tree_type = get_type(tree)
-
-    if tree_type not in registry or is_leaf(tree):
-        yield tree
-    else:
-        subtrees, _ = registry[tree_type]["flatten"](tree)
-        for subtree in subtrees:
-            if get_type(subtree) in registry:
-                yield from _tree_yield(subtree, is_leaf, registry)
-            else:
-                yield subtree
-    return out
+    leaves = []
+    for _ in _walk(tree, is_leaf, registry, leaves, lazy=True):
+        yield from leaves
+        leaves.clear()
 
 
 def tree_unflatten(treedef, leaves, is_leaf=None, registry=None):
@@ -178,7 +394,10 @@ def tree_unflatten(treedef, leaves, is_leaf=None, registry=None):
     The inverse of :func:`tree_flatten`.
 
     Args:
-        treedef: the treedef to with information needed for reconstruction.
+        treedef: the treedef to with information needed for reconstruction. Usually
+            a :class:`~pybaum.treedef.PyTreeDef` returned by :func:`tree_flatten`, in
+            which case ``is_leaf`` and ``registry`` are ignored. A pytree with the
+            desired structure is also accepted.
         leaves (list): the list of leaves to use for reconstruction. The list must match
             the leaves of the treedef.
         is_leaf (callable or None): An optionally specified function that will be called
@@ -201,28 +420,17 @@ def tree_unflatten(treedef, leaves, is_leaf=None, registry=None):
         described by ``treedef``.
 
     """
+    if isinstance(treedef, PyTreeDef):
+        return treedef.unflatten(leaves)
+
     registry = _process_pytree_registry(registry)
     is_leaf = _process_is_leaf(is_leaf)
     return _tree_unflatten(treedef, leaves, is_leaf=is_leaf, registry=registry)
 
 
 def _tree_unflatten(treedef, leaves, is_leaf, registry):
-    leaves = iter(leaves)
-    tree_type = get_type(treedef)
-
-    if tree_type not in registry or is_leaf(treedef):
-        return next(leaves)
-    else:
-        items, info = registry[tree_type]["flatten"](treedef)
-        unflattened_items = []
-        for item in items:
-            if get_type(item) in registry:
-                unflattened_items.append(
-                    _tree_unflatten(item, leaves, is_leaf=is_leaf, registry=registry)
-                )
-            else:
-                unflattened_items.append(next(leaves))
-        return registry[tree_type]["unflatten"](info, unflattened_items)
+    structure = _tree_structure(treedef, is_leaf=is_leaf, registry=registry)
+    return structure.unflatten(leaves)
 
 
 def tree_map(func, tree, is_leaf=None, registry=None):
@@ -249,9 +457,9 @@ def tree_map(func, tree, is_leaf=None, registry=None):
         modified copy of tree.
 
     """
-    flat, treedef = tree_flatten(tree, is_leaf=is_leaf, registry=registry)
-    modified = [func(i) for i in flat]
-    new_tree = tree_unflatten(treedef, modified, is_leaf=is_leaf, registry=registry)
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    new_tree = _tree_map(func, (tree,), is_leaf, registry)
     return new_tree
 
 
@@ -281,22 +489,120 @@ def tree_multimap(func, *trees, is_leaf=None, registry=None):
         tree with the same structure as the elements in trees.
 
     """
-    flat_trees, treedefs = [], []
-    for tree in trees:
-        flat, treedef = tree_flatten(tree, is_leaf=is_leaf, registry=registry)
-        flat_trees.append(flat)
-        treedefs.append(treedef)
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    new_trees = _tree_map(func, trees, is_leaf, registry)
+    return new_trees
+
 
-    for treedef in treedefs:
-        if treedef != treedefs[0]:
-            raise ValueError("All trees must have the same structure.")
+def _tree_map(func, trees, is_leaf, registry):
+    """Apply func to the leaves of trees in a single pass over their structure.
 
-    modified = [func(*item) for item in zip(*flat_trees)]
+    The trees are traversed in lockstep with an explicit stack. Containers are rebuilt
+    as soon as all their children have been mapped, so neither the leaves nor a
+    treedef are materialized. The structure of the first tree determines the
+    structure of the result. Other trees are compared with it node by node, such that
+    a mismatch is detected at the first differing node.
 
-    new_trees = tree_unflatten(
-        treedefs[0], modified, is_leaf=is_leaf, registry=registry
+    Args:
+        func (callable): Function that is called with one leaf of each tree.
+        trees (tuple): The pytrees.
+        is_leaf (callable): Function that returns True if a subtree should be treated
+            as a leaf.
+        registry (dict): A pytree container registry.
+
+    Returns:
+        The mapped pytree.
+
+    """
+    dispatch = get_dispatch_table(registry)
+    single = len(trees) == 1
+    out = []
+    # A frame holds the iterator over tuples of corresponding children, the list of
+    # mapped children and the information needed to rebuild the container.
+    stack = [(iter([trees]), out, None, None)]
+
+    while stack:
+        children, results, entry, aux_data = stack[-1]
+        for subtrees in children:
+            first = subtrees[0]
+            resolved = dispatch.get(type(first), _UNRESOLVED)
+            if resolved is _UNRESOLVED:
+                resolved = resolve_type(first, registry, dispatch)
+
+            if resolved is None or is_leaf(first):
+                if not single:
+                    _check_leaves(subtrees, is_leaf, registry, dispatch)
+                results.append(func(*subtrees))
+                continue
+
+            child_entry = resolved[1]
+            flat, child_aux_data = child_entry["flatten"](first)
+            if single:
+                grandchildren = zip(flat)
+            else:
+                flats = _flatten_like(
+                    subtrees,
+                    resolved,
+                    flat,
+                    child_aux_data,
+                    is_leaf,
+                    registry,
+                    dispatch,
+                )
+                grandchildren = zip(*flats)
+            stack.append((grandchildren, [], child_entry, child_aux_data))
+            break
+        else:
+            stack.pop()
+            if entry is not None:
+                stack[-1][1].append(entry["unflatten"](aux_data, results))
+    return out[0]
+
+
+def _check_leaves(subtrees, is_leaf, registry, dispatch):
+    """Raise an error if any of subtrees is not a leaf."""
+    for other in subtrees[1:]:
+        resolved = dispatch.get(type(other), _UNRESOLVED)
+        if resolved is _UNRESOLVED:
+            resolved = resolve_type(other, registry, dispatch)
+        if resolved is not None and not is_leaf(other):
+            raise _structure_mismatch(subtrees[0], other)
+
+
+def _flatten_like(subtrees, resolved, flat, aux_data, is_leaf, registry, dispatch):
+    """Flatten the other subtrees one level and check that they match the first one.
+
+    Returns:
+        list: The lists of children of all subtrees.
+
+    """
+    if not hasattr(flat, "__len__"):
+        flat = list(flat)
+    out = [flat]
+    for other in subtrees[1:]:
+        other_resolved = dispatch.get(type(other), _UNRESOLVED)
+        if other_resolved is _UNRESOLVED:
+            other_resolved = resolve_type(other, registry, dispatch)
+        if other_resolved is None or other_resolved[0] != resolved[0] or is_leaf(other):
+            raise _structure_mismatch(subtrees[0], other)
+
+        other_flat, other_aux_data = other_resolved[1]["flatten"](other)
+        if not hasattr(other_flat, "__len__"):
+            other_flat = list(other_flat)
+        if len(other_flat) != len(flat) or not _aux_data_equal(
+            aux_data, other_aux_data
+        ):
+            raise _structure_mismatch(subtrees[0], other)
+        out.append(other_flat)
+    return out
+
+
+def _structure_mismatch(first, other):
+    return ValueError(
+        "All trees must have the same structure. The first mismatch is between "
+        f"{reprlib.repr(first)} and {reprlib.repr(other)}."
     )
-    return new_trees
 
 
 def leaf_names(tree, is_leaf=None, registry=None, separator="_"):
@@ -331,27 +637,10 @@ def leaf_names(tree, is_leaf=None, registry=None, separator="_"):
     return leaf_names
 
 
-def _leaf_names(tree, is_leaf, registry, separator, prefix=None):
-    out = []
-    tree_type = get_type(tree)
-
-    if tree_type not in registry or is_leaf(tree):
-        out.append(prefix)
-    else:
-        subtrees, info = registry[tree_type]["flatten"](tree)
-        names = registry[tree_type]["names"](tree)
-        for name, subtree in zip(names, subtrees):
-            if get_type(subtree) in registry:
-                out += _leaf_names(
-                    subtree,
-                    is_leaf=is_leaf,
-                    registry=registry,
-                    separator=separator,
-                    prefix=_add_prefix(prefix, name, separator),
-                )
-            else:
-                out.append(_add_prefix(prefix, name, separator))
-    return out
+def _leaf_names(tree, is_leaf, registry, separator):
+    names = []
+    _consume(_walk(tree, is_leaf, registry, [], names=names, separator=separator))
+    return names
 
 
 def _add_prefix(prefix, string, separator):
@@ -362,6 +651,12 @@ def _add_prefix(prefix, string, separator):
     return out
 
 
+def _tree_structure(tree, is_leaf, registry):
+    nodes = []
+    _consume(_walk(tree, is_leaf, registry, [], nodes=nodes))
+    return PyTreeDef(nodes)
+
+
 def _process_pytree_registry(registry):
     registry = registry if registry is not None else get_registry()
     return registry
@@ -374,13 +669,26 @@ def _process_is_leaf(is_leaf):
         return is_leaf
 
 
-def tree_equal(tree, other, is_leaf=None, registry=None, equality_checkers=None):
+def tree_equal(
+    tree,
+    other,
+    is_leaf=None,
+    registry=None,
+    equality_checkers=None,
+    rtol=None,
+    atol=None,
+):
     """Determine if two pytrees are equal.
 
     Two pytrees are considered equal if their leaves are equal and the names of their
     leaves are equal. While this definition of equality might not always make sense
     it makes sense in most cases and can be implemented relatively easily.
 
+    The trees are compared in lockstep and the comparison stops at the first
+    container whose children have different names or at the first unequal leaf.
+    Containers with an equality checker, e.g. arrays in the extended registry, are
+    compared as a whole if their auxiliary data is equal.
+
     Args:
         tree: A pytree.
         other: Another pytree.
@@ -400,41 +708,146 @@ def tree_equal(tree, other, is_leaf=None, registry=None, equality_checkers=None)
             to completely override the default registries.
         equality_checkers (dict, None): A dictionary where keys are types and values are
             functions which assess equality for the type of object.
+        rtol (float or None): Relative tolerance for numerical leaves. If ``rtol`` or
+            ``atol`` is not None, numbers and arrays are compared as in
+            :func:`numpy.allclose`. None means 0 if ``atol`` is given.
+        atol (float or None): Absolute tolerance for numerical leaves. None means 0 if
+            ``rtol`` is given.
 
     Returns:
         bool
 
     """
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+
+    if rtol is None and atol is None:
+        default_checkers, default = get_equality_checkers(), _equal
+    else:
+        default_checkers, default = get_tolerance_checkers(rtol or 0, atol or 0)
     equality_checkers = (
-        EQUALITY_CHECKERS
+        default_checkers
         if equality_checkers is None
-        else {**EQUALITY_CHECKERS, **equality_checkers}
+        else {**default_checkers, **equality_checkers}
     )
 
-    first_flat = tree_just_flatten(tree, is_leaf=is_leaf, registry=registry)
-    second_flat = tree_just_flatten(other, is_leaf=is_leaf, registry=registry)
+    equal = _tree_equal(tree, other, is_leaf, registry, equality_checkers, default)
+    return equal
 
-    first_names = leaf_names(tree, is_leaf=is_leaf, registry=registry)
-    second_names = leaf_names(tree, is_leaf=is_leaf, registry=registry)
 
-    equal = first_names == second_names
+def _equal(first, second):
+    return first == second
+
+
+def _tree_equal(tree, other, is_leaf, registry, equality_checkers, default):
+    """Compare two pytrees in lockstep and stop at the first difference."""
+    dispatch = get_dispatch_table(registry)
+    stack = [iter([(tree, other)])]
+    equal = True
+
+    while stack and equal:
+        for first, second in stack[-1]:
+            first_entry = _container_entry(first, is_leaf, registry, dispatch)
+            second_entry = _container_entry(second, is_leaf, registry, dispatch)
+
+            if first_entry is None or second_entry is None:
+                if first_entry is not second_entry:
+                    equal = False
+                else:
+                    check = equality_checkers.get(get_type(first), default)
+                    equal = bool(check(first, second))
+            elif first_entry is second_entry and _has_whole_checker(
+                first_entry, first, equality_checkers
+            ):
+                equal = _compare_whole(
+                    first, second, first_entry, equality_checkers, default
+                )
+            else:
+                first_children, first_aux_data = first_entry["flatten"](first)
+                second_children, second_aux_data = second_entry["flatten"](second)
+                if not hasattr(first_children, "__len__"):
+                    first_children = list(first_children)
+                if not hasattr(second_children, "__len__"):
+                    second_children = list(second_children)
+                # The names of the children are determined by the registry entry, the
+                # auxiliary data and the number of children, so they are only created
+                # if one of them differs.
+                equal = (
+                    first_entry is second_entry
+                    and len(first_children) == len(second_children)
+                    and _aux_data_equal(first_aux_data, second_aux_data)
+                ) or first_entry["names"](first) == second_entry["names"](second)
+                if equal:
+                    stack.append(zip(first_children, second_children))
+                    break
 
-    if equal:
-        for first, second in zip(first_flat, second_flat):
-            check_func = equality_checkers.get(get_type(first), lambda a, b: a == b)
-            equal = equal and check_func(first, second)
             if not equal:
                 break
+        else:
+            stack.pop()
+    return equal
+
+
+def _has_whole_checker(entry, tree, equality_checkers):
+    return "flatten_block" in entry and get_type(tree) in equality_checkers
+
+
+def _compare_whole(first, second, entry, equality_checkers, default):
+    """Compare containers with an equality checker without expanding them.
 
+    If the auxiliary data differs, the names of the children might still be equal, so
+    the children are compared one by one.
+
+    """
+    _, first_aux_data = entry["flatten_block"](first)
+    _, second_aux_data = entry["flatten_block"](second)
+    if _aux_data_equal(first_aux_data, second_aux_data) and _whole_matches_elementwise(
+        first, second
+    ):
+        equal = bool(equality_checkers[get_type(first)](first, second))
+    elif entry["names"](first) != entry["names"](second):
+        equal = False
+    else:
+        first_children, _ = entry["flatten"](first)
+        second_children, _ = entry["flatten"](second)
+        equal = all(
+            bool(equality_checkers.get(get_type(a), default)(a, b))
+            for a, b in zip(first_children, second_children)
+        )
     return equal
 
 
+def _whole_matches_elementwise(first, second):
+    """Check whether comparing whole objects agrees with comparing their elements.
+
+    ``equals`` of pandas objects requires equal dtypes and treats missing values as
+    equal, whereas elements are compared with ``==``. For other objects, e.g. arrays,
+    both comparisons agree.
+
+    """
+    if _is_pandas_object(first):
+        out = _dtypes(first) == _dtypes(second) and not (
+            first.isna().to_numpy().any() or second.isna().to_numpy().any()
+        )
+    else:
+        out = True
+    return out
+
+
+def _dtypes(df_or_sr):
+    return list(df_or_sr.dtypes) if df_or_sr.ndim == 2 else [df_or_sr.dtype]
+
+
 def tree_update(tree, other, is_leaf=None, registry=None):
     """Update leaves in a pytree with leaves from another pytree.
 
     The second pytree must be compatible with the first one but can be smaller. For
     example, lists can be shorter, dictionaries can contain subsets of entries, etc.
 
+    Containers are matched by the names of their children, as returned by the
+    "names" entry of the registry. Only containers on the paths of ``other`` are
+    rebuilt. Subtrees of ``tree`` that are not updated are shared with the result.
+
     Args:
         tree: A pytree.
         other: Another pytree.
@@ -456,15 +869,190 @@ def tree_update(tree, other, is_leaf=None, registry=None):
         Updated pytree.
 
     """
-    first_flat, first_treedef = tree_flatten(tree, is_leaf=is_leaf, registry=registry)
-    first_names = leaf_names(tree, is_leaf=is_leaf, registry=registry)
-    first_dict = dict(zip(first_names, first_flat))
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+    out = _tree_update(tree, other, is_leaf, registry)
+    return out
+
+
+def _tree_update(tree, other, is_leaf, registry):
+    """Merge other into tree along the paths of other.
 
-    other_flat, _ = tree_flatten(other, is_leaf=is_leaf, registry=registry)
-    other_names = leaf_names(other, is_leaf=is_leaf, registry=registry)
-    other_dict = dict(zip(other_names, other_flat))
+    The children of a container in ``other`` are matched with the children of the
+    corresponding container in ``tree`` by the names returned by the registry. Only
+    containers on the paths of ``other`` are flattened and, if one of their children
+    changed, rebuilt. All other subtrees of ``tree`` are shared with the result.
 
-    combined = list({**first_dict, **other_dict}.values())
+    """
+    dispatch = get_dispatch_table(registry)
+    root = [tree]
+    # A frame holds an iterator over the children of a container in other, together
+    # with their names and the positions of the corresponding children in tree, the
+    # list of children of the container in tree, the information needed to rebuild
+    # it, its name and position in its parent and whether one of its children changed.
+    # The path of a container is only built from the names on the stack for errors.
+    stack = [[iter([(0, None, other)]), root, None, None, None, 0, False]]
+
+    while stack:
+        frame = stack[-1]
+        triples, children = frame[0], frame[1]
+        for position, name, new in triples:
+            old = children[position]
+            if new is old:
+                continue
+            new_entry = _container_entry(new, is_leaf, registry, dispatch)
+            old_entry = _container_entry(old, is_leaf, registry, dispatch)
+
+            if new_entry is None:
+                if old_entry is not None:
+                    raise ValueError(
+                        f"Cannot replace the container at {_stack_path(stack, name)} "
+                        f"in tree with the leaf {reprlib.repr(new)}."
+                    )
+                frame[6] = True
+                children[position] = new
+                continue
+
+            new_children, _ = new_entry["flatten"](new)
+            new_names = new_entry["names"](new)
+            if not new_names:
+                continue
+            if old_entry is None:
+                raise ValueError(
+                    f"Cannot replace the leaf at {_stack_path(stack, name)} in tree "
+                    f"with the container {reprlib.repr(new)}."
+                )
 
-    out = tree_unflatten(first_treedef, combined, is_leaf=is_leaf, registry=registry)
+            old_children, aux_data = old_entry["flatten"](old)
+            positions = {}
+            for i, old_name in enumerate(old_entry["names"](old)):
+                positions.setdefault(old_name, i)
+            missing = [name for name in new_names if name not in positions]
+            if missing:
+                path = _stack_path(stack, name) + (missing[0],)
+                raise ValueError(f"The path {path} of other is not in tree.")
+            new_triples = zip(
+                [positions[name] for name in new_names], new_names, new_children
+            )
+            stack.append(
+                [
+                    new_triples,
+                    list(old_children),
+                    old_entry,
+                    aux_data,
+                    name,
+                    position,
+                    False,
+                ]
+            )
+            break
+        else:
+            stack.pop()
+            if stack and frame[6]:
+                _, children, entry, aux_data, _, position, _ = frame
+                parent = stack[-1]
+                parent[1][position] = entry["unflatten"](aux_data, children)
+                parent[6] = True
+    return root[0]
+
+
+def _stack_path(stack, name):
+    """Get the path of the child called name of the container on top of the stack."""
+    names = [frame[4] for frame in stack] + [name]
+    out = tuple(name for name in names if name is not None)
     return out
+
+
+def _container_entry(obj, is_leaf, registry, dispatch):
+    """Get the registry entry of a container or None if obj is a leaf."""
+    resolved = dispatch.get(type(obj), _UNRESOLVED)
+    if resolved is _UNRESOLVED:
+        resolved = resolve_type(obj, registry, dispatch)
+    return None if resolved is None or is_leaf(obj) else resolved[1]
+
+
+def tree_to_vector(tree, is_leaf=None, registry=None):
+    """Flatten a pytree into a one-dimensional float64 numpy array.
+
+    Registry entries of array-like types can define the optional entries
+    "flatten_block" and "unflatten_block". Instead of flattening such objects into one
+    Python object per element, they contribute a contiguous block to the vector. All
+    other leaves have to be scalars.
+
+    Args:
+        tree: a pytree to flatten.
+        is_leaf (callable or None): An optionally specified function that will be called
+            at each flattening step. It should return a boolean, which indicates whether
+            the flattening should traverse the current object, or if it should be
+            stopped immediately, with the whole subtree being treated as a leaf.
+        registry (dict or None): A pytree container registry that determines
+            which types are considered container objects that should be flattened.
+            ``is_leaf`` can override this in the sense that types that are in the
+            registry are still considered a leaf but it cannot declare something a
+            container that is not in the registry. None means that the default registry
+            is used, i.e. that dicts, tuples and lists are considered containers.
+            "extended" means that in addition numpy arrays and params DataFrames are
+            considered containers. Passing a dictionary where the keys are types and the
+            values are dicts with the entries "flatten", "unflatten" and "names" allows
+            to completely override the default registries.
+
+    Returns:
+        A pair where the first element is a numpy array and the second element is a
+        :class:`~pybaum.treedef.PyTreeDef` that can be passed to
+        :func:`vector_to_tree`.
+
+    """
+    import numpy as np
+
+    registry = _process_pytree_registry(registry)
+    is_leaf = _process_is_leaf(is_leaf)
+
+    block_positions = []
+    leaves, treedef = _tree_flatten_with_treedef(
+        tree, is_leaf, registry, block_positions
+    )
+
+    pieces = []
+    start = 0
+    for position in block_positions + [len(leaves)]:
+        if position > start:
+            scalars = np.array(leaves[start:position], dtype=np.float64)
+            if scalars.ndim != 1:
+                raise _not_scalar_error()
+            pieces.append(scalars)
+        if position < len(leaves):
+            pieces.append(leaves[position])
+        start = position + 1
+
+    if pieces:
+        vector = np.concatenate(pieces, dtype=np.float64)
+    else:
+        vector = np.zeros(0)
+
+    if vector.ndim != 1 or len(vector) != treedef.num_leaves:
+        raise _not_scalar_error()
+    return vector, treedef
+
+
+def _not_scalar_error():
+    return ValueError(
+        "All leaves have to be scalars or array-likes with a 'flatten_block' entry "
+        "in the registry."
+    )
+
+
+def vector_to_tree(vector, treedef):
+    """Reconstruct a pytree from a vector created by :func:`tree_to_vector`.
+
+    Array-like objects are reshaped views into ``vector`` whenever the unflatten_block
+    function of their registry entry allows it. Scalar leaves are numpy scalars.
+
+    Args:
+        vector (numpy.ndarray): One-dimensional array with the leaves.
+        treedef (PyTreeDef): The treedef returned by :func:`tree_to_vector`.
+
+    Returns:
+        The reconstructed pytree.
+
+    """
+    return treedef.unflatten(vector)
@@ -0,0 +1,201 @@
+"""Implement a compact description of the structure of a pytree.
+
+A :class:`PyTreeDef` stores the node types, the auxiliary data returned by the
+registry's flatten functions and the number of children of every node of a pytree.
+It does not hold references to the leaves. The nodes are stored in post-order, i.e.
+the children of a node are stored before the node itself and the root is the last
+node. This allows to unflatten a pytree with a single pass over the nodes.
+
+"""
+from collections import namedtuple
+
+
+Node = namedtuple(
+    "Node",
+    ["node_type", "aux_data", "num_children", "num_leaves", "num_nodes", "unflatten"],
+)
+"""namedtuple: A node in a treedef.
+
+The attributes are the type of the node as returned by
+:func:`~pybaum.typecheck.get_type`, the auxiliary data returned by the flatten
+function of the registry entry, the number of children, the number of leaves and nodes
+in the subtree rooted at the node (including the node) and the unflatten function of
+the registry entry. Leaves are represented by :data:`LEAF`.
+
+Nodes without children can own leaves. This is used for array-like nodes that are
+flattened into a contiguous block by :func:`~pybaum.tree_util.tree_to_vector`. Their
+unflatten function receives the slice of leaves that belongs to the node.
+
+"""
+
+LEAF = Node(None, None, 0, 1, 1, None)
+
+
+class PyTreeDef:
+    """Compact description of the structure of a pytree.
+
+    Treedefs are created by :func:`~pybaum.tree_util.tree_flatten`. Two treedefs are
+    equal if they have the same node types, the same number of children per node and
+    equal auxiliary data. The unflatten functions are not compared.
+
+    Args:
+        nodes (iterable): Iterable of :class:`Node` in post-order.
+
+    """
+
+    __slots__ = ("_nodes", "_hash")
+
+    def __init__(self, nodes):
+        self._nodes = tuple(nodes)
+        self._hash = None
+
+    @property
+    def num_leaves(self):
+        """int: Number of leaves in the pytree."""
+        return self._nodes[-1].num_leaves
+
+    @property
+    def num_nodes(self):
+        """int: Number of nodes in the pytree, including leaves."""
+        return len(self._nodes)
+
+    def children(self):
+        """Get the treedefs of the children of the root node.
+
+        Returns:
+            list: List of :class:`PyTreeDef`. The list is empty if the root is a leaf.
+
+        """
+        out = []
+        end = len(self._nodes) - 1
+        for _ in range(self._nodes[-1].num_children):
+            start = end - self._nodes[end - 1].num_nodes
+            out.append(PyTreeDef(self._nodes[start:end]))
+            end = start
+        out.reverse()
+        return out
+
+    def unflatten(self, leaves):
+        """Reconstruct a pytree from a list of leaves.
+
+        Args:
+            leaves (list): The leaves of the pytree. The length has to match
+                :attr:`num_leaves`.
+
+        Returns:
+            The reconstructed pytree.
+
+        """
+        if not hasattr(leaves, "__getitem__"):
+            leaves = list(leaves)
+
+        if len(leaves) != self.num_leaves:
+            raise ValueError(
+                f"Treedef has {self.num_leaves} leaves but got {len(leaves)} leaves."
+            )
+
+        stack = []
+        position = 0
+        for node in self._nodes:
+            if node.node_type is None:
+                stack.append(leaves[position])
+                position += 1
+            elif node.num_children == 0 and node.num_leaves > 0:
+                stop = position + node.num_leaves
+                stack.append(node.unflatten(node.aux_data, leaves[position:stop]))
+                position = stop
+            elif node.num_children == 0:
+                stack.append(node.unflatten(node.aux_data, []))
+            else:
+                children = stack[-node.num_children :]
+                del stack[-node.num_children :]
+                stack.append(node.unflatten(node.aux_data, children))
+        return stack[0]
+
+    def __eq__(self, other):
+        if not isinstance(other, PyTreeDef):
+            return NotImplemented
+        if self is other:
+            return True
+        if len(self._nodes) != len(other._nodes):
+            return False
+        for first, second in zip(self._nodes, other._nodes):
+            if (
+                first.node_type != second.node_type
+                or first.num_children != second.num_children
+                or not _aux_data_equal(first.aux_data, second.aux_data)
+            ):
+                return False
+        return True
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(
+                tuple(
+                    (node.node_type, node.num_children, _aux_data_hash(node.aux_data))
+                    for node in self._nodes
+                )
+            )
+        return self._hash
+
+    def __repr__(self):
+        stack = []
+        for node in self._nodes:
+            if node.node_type is None:
+                stack.append("*")
+            else:
+                children = stack[len(stack) - node.num_children :]
+                del stack[len(stack) - node.num_children :]
+                stack.append(f"{_type_name(node.node_type)}({', '.join(children)})")
+        return f"PyTreeDef({stack[0]})"
+
+
+def _type_name(node_type):
+    return node_type if isinstance(node_type, str) else node_type.__name__
+
+
+def _aux_data_equal(first, second):
+    """Check equality of auxiliary data, which may contain pandas or numpy objects."""
+    if first is second:
+        out = True
+    elif type(first) is not type(second):
+        out = False
+    elif isinstance(first, dict):
+        out = first.keys() == second.keys() and all(
+            _aux_data_equal(first[key], second[key]) for key in first
+        )
+    elif isinstance(first, (list, tuple)):
+        out = len(first) == len(second) and all(
+            _aux_data_equal(a, b) for a, b in zip(first, second)
+        )
+    elif hasattr(first, "identical"):
+        # pandas Index objects; ``identical`` also compares names and dtypes
+        out = bool(first.identical(second))
+    else:
+        try:
+            out = bool(first == second)
+        except (TypeError, ValueError):
+            out = False
+    return out
+
+
+def _aux_data_hash(aux_data):
+    """Hash auxiliary data consistently with :func:`_aux_data_equal`.
+
+    Unhashable objects that are not dicts, lists or tuples only contribute their type.
+
+    """
+    try:
+        out = hash(aux_data)
+    except TypeError:
+        if isinstance(aux_data, dict):
+            out = hash(
+                frozenset(
+                    (key, _aux_data_hash(value)) for key, value in aux_data.items()
+                )
+            )
+        elif isinstance(aux_data, (list, tuple)):
+            out = hash(tuple(_aux_data_hash(item) for item in aux_data))
+        else:
+            out = hash(type(aux_data))
+    return out
@@ -1,11 +1,11 @@
+import sys
+
 from pybaum.config import IS_JAX_INSTALLED
 from pybaum.config import IS_NUMPY_INSTALLED
 
-if IS_JAX_INSTALLED:
-    import jax.numpy as jnp
+TYPE_CACHE_SIZE = 1024
 
-if IS_NUMPY_INSTALLED:
-    import numpy as np
+_TYPE_CACHE = {}
 
 
 def get_type(obj):
@@ -14,6 +14,8 @@ def get_type(obj):
     This function allows us to reliably identify namedtuples, NamedTuples and jax arrays
     for which standard ``type`` function does not work.
 
+    The result only depends on the class of ``obj`` and is cached per class.
+
     Args:
         obj: The object to be checked
 
@@ -21,12 +23,19 @@ def get_type(obj):
         type or str: The type of the object or a string with the type name.
 
     """
-    if _is_namedtuple(obj):
-        out = "namedtuple"
-    elif _is_jax_array(obj):
-        out = "jax.numpy.ndarray"
-    else:
-        out = type(obj)
+    cls = type(obj)
+    out = _TYPE_CACHE.get(cls)
+    if out is None:
+        if _is_namedtuple(obj):
+            out = "namedtuple"
+        elif _is_jax_array(obj):
+            out = "jax.numpy.ndarray"
+        else:
+            out = cls
+
+        if len(_TYPE_CACHE) >= TYPE_CACHE_SIZE:
+            _TYPE_CACHE.clear()
+        _TYPE_CACHE[cls] = out
     return out
 
 
@@ -69,6 +78,9 @@ def _is_jax_array(obj):
     jax versions before 0.2.21, standard numpy arrays were instances of jax arrays,
     now they are not.
 
+    jax is not imported by this function. If it has not been imported yet, no object
+    can be a jax array.
+
     Resources:
     ----------
 
@@ -84,10 +96,53 @@ def _is_jax_array(obj):
         bool
 
     """
-    if not IS_JAX_INSTALLED:
+    if not IS_JAX_INSTALLED or "jax" not in sys.modules:
         out = False
-    elif IS_NUMPY_INSTALLED:
-        out = isinstance(obj, jnp.ndarray) and not isinstance(obj, np.ndarray)
     else:
-        out = isinstance(obj, jnp.ndarray)
+        import jax.numpy as jnp
+
+        if IS_NUMPY_INSTALLED:
+            import numpy as np
+
+            out = isinstance(obj, jnp.ndarray) and not isinstance(obj, np.ndarray)
+        else:
+            out = isinstance(obj, jnp.ndarray)
+    return out
+
+
+def _is_array(obj):
+    """Check if an object is a numpy array, a numpy scalar or a jax array.
+
+    numpy is not imported by this function. If it has not been imported yet, no object
+    can be an array.
+
+    """
+    if "numpy" in sys.modules:
+        np = sys.modules["numpy"]
+        out = isinstance(obj, (np.ndarray, np.generic)) or get_type(obj) == (
+            "jax.numpy.ndarray"
+        )
+    else:
+        out = False
+    return out
+
+
+def _is_pandas_object(obj):
+    """Check if an object is a pandas Series or DataFrame without importing pandas."""
+    return "pandas" in sys.modules and isinstance(
+        obj, (sys.modules["pandas"].Series, sys.modules["pandas"].DataFrame)
+    )
+
+
+def _whole_is_leaf(is_leaf):
+    """Treat arrays and pandas objects as leaves in addition to ``is_leaf``.
+
+    Used by functions that handle arrays and pandas objects as a whole, even if they
+    are registered as containers.
+
+    """
+
+    def out(obj):
+        return _is_array(obj) or _is_pandas_object(obj) or is_leaf(obj)
+
     return out
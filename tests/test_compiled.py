@@ -0,0 +1,81 @@
+from collections import namedtuple
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.compiled import compile_tree
+from pybaum.registry import get_registry
+from pybaum.tree_util import tree_equal
+from pybaum.tree_util import tree_flatten
+from pybaum.tree_util import tree_to_vector
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+@pytest.fixture
+def tree():
+    return {
+        "a": [1, (2, 3), []],
+        "b": Point(4, {"c": 5}),
+        ("d", 1): OrderedDict({"e": 6, "f": 7}),
+        2: None,
+    }
+
+
+def test_compiled_flatten_and_unflatten(tree):
+    flat, _ = tree_flatten(tree)
+    plan = compile_tree(tree)
+    assert plan.flatten(tree) == flat
+    unflat = plan.unflatten(flat)
+    assert unflat == tree
+    assert type(unflat[("d", 1)]) is OrderedDict
+    assert type(unflat["b"]) is Point
+
+
+def test_compile_tree_from_treedef(tree):
+    flat, treedef = tree_flatten(tree)
+    plan = compile_tree(treedef)
+    assert plan.treedef == treedef
+    assert plan.unflatten(list(range(7))) == treedef.unflatten(list(range(7)))
+
+
+def test_compiled_tree_with_extended_registry():
+    registry = get_registry(types=["numpy.ndarray", "pandas.Series"])
+    tree = {"a": np.arange(4).reshape(2, 2), "b": [pd.Series([1.0, 2.0]), 3]}
+    flat, _ = tree_flatten(tree, registry=registry)
+    plan = compile_tree(tree, registry=registry)
+    assert plan.flatten(tree) == flat
+    assert tree_equal(plan.unflatten(flat), tree)
+
+
+def test_compiled_tree_with_leaf():
+    plan = compile_tree(1)
+    assert plan.flatten(2) == [2]
+    assert plan.unflatten([3]) == 3
+
+
+def test_compile_tree_is_cached(tree):
+    registry = get_registry()
+    assert compile_tree(tree, registry=registry) is compile_tree(
+        tree, registry=registry
+    )
+    assert compile_tree(tree) is compile_tree(tree, registry=get_registry())
+    assert compile_tree(tree) is not compile_tree(tree, registry=dict(registry))
+
+
+def test_compiled_tree_with_wrong_structure(tree):
+    plan = compile_tree(tree)
+    with pytest.raises(ValueError):
+        plan.flatten({**tree, "a": [1, (2, 3, 4), []]})
+    with pytest.raises(ValueError):
+        plan.unflatten([1, 2])
+
+
+def test_compiled_tree_with_block_treedef():
+    registry = get_registry(types=["numpy.ndarray"])
+    tree = {"a": np.arange(4.0).reshape(2, 2), "b": 5.0}
+    vector, treedef = tree_to_vector(tree, registry=registry)
+    plan = compile_tree(treedef, registry=registry)
+    assert plan.flatten(tree) == vector.tolist()
+    assert tree_equal(plan.unflatten(vector), tree)
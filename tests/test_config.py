@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pybaum
+
+SCRIPT = """
+import sys
+
+import pybaum
+
+imported = [name for name in sys.argv[1:] if name in sys.modules]
+print(",".join(imported))
+"""
+
+SLOW_STDLIB_MODULES = ("asyncio", "concurrent.futures", "multiprocessing", "pickle")
+
+
+def _imported_by_pybaum(*modules):
+    env = {**os.environ, "PYTHONPATH": str(Path(pybaum.__file__).parents[1])}
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *modules],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    out = [name for name in result.stdout.strip().split(",") if name]
+    return out
+
+
+def test_import_does_not_import_optional_dependencies():
+    assert _imported_by_pybaum("numpy", "pandas", "jax") == []
+
+
+def test_import_does_not_import_slow_stdlib_modules():
+    assert _imported_by_pybaum(*SLOW_STDLIB_MODULES) == []
@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.flat_cache import FlatCache
+from pybaum.paths import leaf_paths
+from pybaum.registry import get_registry
+from pybaum.tree_util import tree_equal
+from pybaum.tree_util import tree_flatten
+
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+@pytest.fixture
+def tree():
+    return {
+        "a": [0, np.arange(6.0).reshape(2, 3), {"b": 1, "c": "x"}, 2],
+        "d": (pd.Series([3.0, 4.0], index=["e", "f"]), Point(5, 6)),
+        "g": np.array(7.0),
+        "h": 8,
+    }
+
+
+@pytest.fixture
+def registry():
+    return get_registry(types=["numpy.ndarray", "pandas.Series", "namedtuple"])
+
+
+def test_flat_and_tree_match_tree_flatten(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    flat, treedef = tree_flatten(tree, registry=registry)
+    assert cache.flat == flat
+    assert cache.treedef == treedef
+    assert len(cache) == len(flat)
+    assert tree_equal(cache.tree(), tree)
+    assert cache.dirty() == []
+
+
+def test_offset_and_getitem_of_all_leaves(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    paths = leaf_paths(tree, registry=registry)
+    for position in range(len(paths)):
+        path = paths.path(position)
+        assert cache.offset(path) == (position, position + 1)
+        assert cache[path] == cache.flat[position]
+
+
+def test_offset_and_getitem_of_containers(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    assert cache.offset(()) == (0, 16)
+    assert cache.offset(("a",)) == (0, 10)
+    assert cache.offset(("a", 1)) == (1, 7)
+    assert cache.offset(("d", "1")) == (12, 14)
+    assert tree_equal(cache[("a", "2")], {"b": 1, "c": "x"})
+    assert cache[("d", 1)] == Point(5, 6)
+    assert tree_equal(cache[("d", 0)], tree["d"][0])
+
+
+def test_update_leaves_and_containers(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    cache.update(("h",), 80)
+    cache.update(("a", 2), {"b": 10, "c": 20})
+    cache.update(("a", 1), np.ones((2, 3)))
+    cache.update(("a", 1, "0_1"), 30.0)
+
+    assert cache.dirty_ranges() == [(1, 9), (15, 16)]
+    assert cache.sync() == [1, 2, 3, 4, 5, 6, 7, 8, 15]
+    assert cache.sync() == []
+
+    expected = {
+        "a": [0, np.array([[1.0, 30.0, 1.0], [1.0, 1.0, 1.0]]), {"b": 10, "c": 20}, 2],
+        "d": tree["d"],
+        "g": tree["g"],
+        "h": 80,
+    }
+    assert tree_equal(cache.tree(), expected)
+
+
+def test_update_with_different_structure_raises(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    with pytest.raises(ValueError, match="structure"):
+        cache.update(("a", 2), {"b": 10})
+    with pytest.raises(ValueError, match="structure"):
+        cache.update(("a", 1), np.ones(6))
+    with pytest.raises(ValueError, match="leaf"):
+        cache.update(("h",), [1, 2])
+    assert cache.dirty() == []
+
+
+def test_unknown_path_raises(tree, registry):
+    cache = FlatCache(tree, registry=registry)
+    with pytest.raises(KeyError):
+        cache.offset(("x",))
+    with pytest.raises(KeyError):
+        cache.update(("h", "0"), 1)
+
+
+def test_tree_that_is_a_leaf():
+    cache = FlatCache(1)
+    cache.update((), 2)
+    assert cache.tree() == 2
+    assert cache.sync() == [0]
@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pybaum
+import pytest
+from pybaum import hashing
+from pybaum.hashing import tree_structure_hash
+from pybaum.registry import get_registry
+
+Point = namedtuple("Point", ["x", "y"])
+Other = namedtuple("Other", ["x", "y"])
+
+SCRIPT = """
+import pandas as pd
+from pybaum.hashing import tree_structure_hash
+from pybaum.registry import get_registry
+
+tree = {"a": [1, "b"], "c": pd.DataFrame({"d": [1.0, 2.0]}, index=["e", "f"])}
+print(tree_structure_hash(tree, registry=get_registry(types=["pandas.DataFrame"])))
+"""
+
+
+@pytest.fixture()
+def registry():
+    return get_registry(types=["numpy.ndarray", "pandas.Series", "pandas.DataFrame"])
+
+
+def test_hash_ignores_leaf_values(registry):
+    tree = {"a": Point(1, 2), "b": [np.arange(3.0), pd.Series([1, 2])]}
+    other = {"a": Point(3, 4), "b": [np.ones(3), pd.Series([5, 6])]}
+    assert tree_structure_hash(tree) == tree_structure_hash(other)
+    assert tree_structure_hash(tree, registry=registry) == tree_structure_hash(
+        other, registry=registry
+    )
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        {"a": Other(1, 2), "b": [np.arange(3.0)]},
+        {"c": Point(1, 2), "b": [np.arange(3.0)]},
+        {"b": [np.arange(3.0)], "a": Point(1, 2)},
+        {"a": Point(1, 2), "b": (np.arange(3.0),)},
+        {"a": Point(1, 2), "b": [np.arange(4.0)]},
+        {"a": Point(1, 2), "b": [np.arange(3)]},
+    ],
+)
+def test_hash_depends_on_structure(other):
+    tree = {"a": Point(1, 2), "b": [np.arange(3.0)]}
+    assert tree_structure_hash(tree) != tree_structure_hash(other)
+
+
+def test_hash_depends_on_pandas_index(registry):
+    df = pd.DataFrame({"a": [1, 2]}, index=["x", "y"])
+    same = pd.DataFrame({"a": [3, 4]}, index=["x", "y"])
+    other = pd.DataFrame({"a": [1, 2]}, index=["x", "z"])
+    assert tree_structure_hash(df, registry=registry) == tree_structure_hash(
+        same, registry=registry
+    )
+    assert tree_structure_hash(df, registry=registry) != tree_structure_hash(
+        other, registry=registry
+    )
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        pd.DataFrame({"y": [1]}),
+        pd.DataFrame({"x": [1, 2, 3]}),
+        pd.DataFrame({"x": [1.0]}),
+        pd.DataFrame({"x": [1]}, index=["a"]),
+        pd.Series([1], name="x"),
+    ],
+)
+def test_hash_depends_on_structure_of_pandas_leaves(other):
+    df = pd.DataFrame({"x": [1]})
+    assert tree_structure_hash({"a": df}) == tree_structure_hash({"a": df + 1})
+    assert tree_structure_hash({"a": df}) != tree_structure_hash({"a": other})
+
+
+def test_hash_of_large_index_is_computed_in_chunks(registry, monkeypatch):
+    monkeypatch.setattr(hashing, "INDEX_CHUNK_SIZE", 3)
+    index = pd.Index([f"a{i}" for i in range(10)])
+    changed = pd.Index([f"a{i}" for i in range(9)] + ["b"])
+    first = tree_structure_hash(pd.Series(0, index=index), registry=registry)
+    second = tree_structure_hash(pd.Series(0, index=index.copy()), registry=registry)
+    third = tree_structure_hash(pd.Series(0, index=changed), registry=registry)
+    assert first == second != third
+
+
+def test_hash_is_stable_across_processes():
+    outputs = set()
+    for seed in ["1", "2"]:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(Path(pybaum.__file__).parents[1]),
+            "PYTHONHASHSEED": seed,
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        outputs.add(result.stdout.strip())
+    assert len(outputs) == 1
+
+
+def test_registered_arrays_are_hashed_as_a_whole(registry):
+    tree = {"a": np.arange(3.0), "b": pd.DataFrame({"c": [1, 2]}, index=["x", "y"])}
+    other = {"a": np.ones(3), "b": pd.DataFrame({"c": [3, 4]}, index=["x", "y"])}
+    assert tree_structure_hash(tree, registry=registry) == tree_structure_hash(
+        other, registry=registry
+    )
+    assert tree_structure_hash(tree, registry=registry) != tree_structure_hash(tree)
+    assert tree_structure_hash(tree, registry=registry) != tree_structure_hash(
+        {**tree, "a": np.arange(3)}, registry=registry
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.leaf_index import tree_flatten_with_index
+from pybaum.paths import leaf_paths
+from pybaum.registry import get_registry
+from pybaum.tree_util import tree_flatten
+
+
+@pytest.fixture
+def tree():
+    df = pd.DataFrame({"a": [1, 2], "b": [3, 4]}, index=[("x", 0), ("y", 1)])
+    return {
+        "a": [0, np.arange(6).reshape(2, 3), {"b": 1, "c": None, "e": {}}, 2],
+        "d": (pd.Series([3, 4], index=["e", "f"]), df),
+        "g": np.array(5.0),
+        "h": 6,
+    }
+
+
+@pytest.fixture
+def registry():
+    return get_registry(types=["numpy.ndarray", "pandas.Series", "pandas.DataFrame"])
+
+
+def test_leaves_and_treedef_match_tree_flatten(tree, registry):
+    leaves, treedef, index = tree_flatten_with_index(tree, registry=registry)
+    expected_leaves, expected_treedef = tree_flatten(tree, registry=registry)
+    assert leaves == expected_leaves
+    assert treedef == expected_treedef
+    assert len(index) == len(leaves)
+
+
+def test_locate_and_offset_of_match_leaf_paths(tree, registry):
+    _, _, index = tree_flatten_with_index(tree, registry=registry)
+    paths = leaf_paths(tree, registry=registry)
+    for position in range(len(paths)):
+        path = paths.path(position)
+        assert index.locate(position) == path
+        assert index.offset_of(path) == slice(position, position + 1)
+    assert index.locate(-1) == ("h",)
+
+
+def test_vectorized_locate(tree, registry):
+    _, _, index = tree_flatten_with_index(tree, registry=registry)
+    positions = np.array([[16, 0], [-1, 3]])
+    expected = [index.locate(position) for position in positions.ravel()]
+    assert index.locate(positions) == expected
+    assert index.locate([1, 2]) == [("a", "1", "0_0"), ("a", "1", "0_1")]
+    assert index.locate(np.array([], dtype=int)) == []
+
+
+def test_offset_and_shape_of_containers(tree, registry):
+    _, _, index = tree_flatten_with_index(tree, registry=registry)
+    assert index.offset_of(()) == slice(0, 17)
+    assert index.offset_of(("a",)) == slice(0, 9)
+    assert index.offset_of(("a", 1)) == slice(1, 7)
+    assert index.offset_of(("a", 2, "e")) == slice(8, 8)
+    assert index.offset_of(("d", "1")) == slice(11, 15)
+    assert index.shape_of(("a", 1)) == (2, 3)
+    assert index.shape_of(("d", 1)) == (2, 2)
+    assert index.shape_of(("a",)) is None
+    assert index.shape_of(("h",)) is None
+
+
+def test_invalid_positions_and_paths_raise(tree, registry):
+    _, _, index = tree_flatten_with_index(tree, registry=registry)
+    with pytest.raises(IndexError):
+        index.locate(17)
+    with pytest.raises(IndexError):
+        index.locate(np.array([0, -18]))
+    with pytest.raises(TypeError):
+        index.locate(np.array([0.5]))
+    with pytest.raises(KeyError):
+        index.offset_of(("a", 5))
+    with pytest.raises(KeyError):
+        index.shape_of(("x",))
+
+
+def test_tree_that_is_a_leaf():
+    leaves, _, index = tree_flatten_with_index(1)
+    assert leaves == [1]
+    assert index.locate(0) == ()
+    assert index.offset_of(()) == slice(0, 1)
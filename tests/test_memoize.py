@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.memoize import tree_memoize
+from pybaum.registry import get_registry
+
+
+def _counting(func):
+    def counted(*args, **kwargs):
+        counted.calls += 1
+        return func(*args, **kwargs)
+
+    counted.calls = 0
+    return counted
+
+
+def test_memoize_hashes_arrays_and_dataframes_by_content():
+    func = _counting(lambda tree: tree["a"].sum() + tree["b"]["x"].sum())
+    memoized = tree_memoize(func)
+    tree = {"a": np.arange(4.0), "b": pd.DataFrame({"x": [1, 2]})}
+    equal = {"a": np.arange(4.0), "b": pd.DataFrame({"x": [1, 2]})}
+    changed = {"a": np.arange(4.0), "b": pd.DataFrame({"x": [1, 3]})}
+
+    assert memoized(tree) == memoized(equal) == 9
+    assert memoized(changed) == 10
+    assert func.calls == 2
+    info = memoized.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+
+def test_memoize_distinguishes_dtypes_and_keywords():
+    memoized = tree_memoize(_counting(lambda x, scale=1: x * scale))
+    memoized(np.arange(3))
+    memoized(np.arange(3.0))
+    memoized(np.arange(3.0), scale=2)
+    memoized(np.arange(3.0), scale=2)
+    assert memoized.cache_info().misses == 3
+
+
+def test_memoize_by_structure():
+    memoized = tree_memoize(
+        _counting(lambda tree: list(tree)),
+        key="structure",
+        registry=get_registry(types=["numpy.ndarray"]),
+    )
+    assert memoized({"a": np.zeros(2)}) == memoized({"a": np.ones(2)}) == ["a"]
+    assert memoized.cache_info().hits == 1
+
+
+def test_memoize_evicts_least_recently_used():
+    memoized = tree_memoize(maxsize=2)(lambda x: x)
+    for x in [1, 2, 1, 3, 1]:
+        memoized(x)
+    info = memoized.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 3, 2)
+
+    memoized.cache_clear()
+    assert memoized.cache_info().currsize == 0
+
+
+def test_memoize_evicts_by_memory_size():
+    memoized = tree_memoize(maxsize=None, maxbytes=2000)(np.zeros)
+    memoized(100)
+    memoized(100)
+    memoized(200)
+    info = memoized.cache_info()
+    assert (info.hits, info.currsize, info.nbytes) == (1, 1, 1600)
+    memoized(300)
+    assert memoized.cache_info().nbytes == 1600
+
+
+def test_memoize_hashes_other_objects_by_identity():
+    memoized = tree_memoize(lambda x: [x])
+    obj = object()
+    assert memoized(obj) is memoized(obj)
+    assert memoized(object()) is not memoized(object())
+
+
+def test_memoize_invalid_key():
+    with pytest.raises(ValueError, match="key must be one of"):
+        tree_memoize(lambda x: x, key="values")
+
+
+def test_memoize_with_registered_arrays():
+    registry = get_registry(types=["numpy.ndarray", "pandas.DataFrame"])
+    memoized = tree_memoize(_counting(lambda x: x.sum()), registry=registry)
+    assert memoized(np.arange(4.0)) == memoized(np.arange(4.0)) == 6
+    assert memoized(np.arange(4.0).reshape(2, 2)) == 6
+    assert memoized(np.ones(4)) == 4
+    assert memoized(pd.DataFrame({"a": [1, 2]})).tolist() == [3]
+    assert memoized(pd.DataFrame({"a": [1, 2]}, index=[2, 3])).tolist() == [3]
+    assert memoized.cache_info().misses == 5
@@ -0,0 +1,126 @@
+import asyncio
+import operator
+import os
+from concurrent.futures import Executor
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from pybaum.parallel import CHUNKS_PER_WORKER
+from pybaum.parallel import LeafEvaluationError
+from pybaum.parallel import tree_map_async
+from pybaum.parallel import tree_map_parallel
+from pybaum.registry import get_registry
+from pybaum.tree_util import tree_equal
+from pybaum.tree_util import tree_map
+from pybaum.tree_util import tree_multimap
+
+
+@pytest.fixture
+def tree():
+    return {"a": [1, -2, (3, -4)], "b": {"c": -5, "d": None}, "e": np.arange(3) - 1}
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("chunksize", [None, 1, 100])
+def test_tree_map_parallel(tree, executor, chunksize):
+    got = tree_map_parallel(
+        abs, tree, executor=executor, max_workers=2, chunksize=chunksize
+    )
+    assert tree_equal(got, tree_map(abs, tree))
+
+
+def test_tree_map_parallel_with_multiple_trees_and_registry(tree):
+    registry = get_registry(types=["numpy.ndarray"])
+    got = tree_map_parallel(operator.mul, tree, tree, registry=registry)
+    expected = tree_multimap(operator.mul, tree, tree, registry=registry)
+    assert tree_equal(got, expected)
+
+
+def test_tree_map_parallel_with_existing_executor(tree):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        got = tree_map_parallel(abs, tree, executor=executor)
+        assert tree_equal(got, tree_map(abs, tree))
+        assert executor.submit(abs, -1).result() == 1
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    def map(self, func, *iterables):  # noqa: A003
+        chunks = list(iterables[1])
+        self.n_chunks = len(chunks)
+        return super().map(func, iterables[0], chunks)
+
+
+def test_tree_map_parallel_chunks_match_workers_of_existing_executor():
+    tree = list(range(100))
+    with _CountingExecutor(max_workers=3) as executor:
+        got = tree_map_parallel(abs, tree, executor=executor)
+    assert got == tree
+    assert executor.n_chunks == 3 * CHUNKS_PER_WORKER
+
+
+class _SerialExecutor(Executor):
+    def map(self, func, *iterables):  # noqa: A003
+        chunks = list(iterables[1])
+        self.n_chunks = len(chunks)
+        return map(func, iterables[0], chunks)
+
+
+def test_tree_map_parallel_with_executor_without_max_workers():
+    n_chunks = (os.cpu_count() or 1) * CHUNKS_PER_WORKER
+    tree = list(range(10 * n_chunks))
+    executor = _SerialExecutor()
+    assert tree_map_parallel(abs, tree, executor=executor) == tree
+    assert executor.n_chunks == n_chunks
+
+
+def test_tree_map_parallel_with_different_structures_raises(tree):
+    with pytest.raises(ValueError, match="same structure"):
+        tree_map_parallel(operator.add, tree, {**tree, "f": 1})
+
+
+def test_tree_map_parallel_with_invalid_arguments_raises(tree):
+    with pytest.raises(ValueError):
+        tree_map_parallel(abs, tree, executor="gpu")
+    with pytest.raises(ValueError):
+        tree_map_parallel(abs, tree, chunksize=0)
+
+
+async def _negate(x, y=0):
+    await asyncio.sleep(0)
+    if isinstance(x, str):
+        raise RuntimeError("failed")
+    return -x - y
+
+
+@pytest.mark.parametrize("concurrency", [None, 1, 3])
+def test_tree_map_async(tree, concurrency):
+    got = asyncio.run(tree_map_async(_negate, tree, concurrency=concurrency))
+    assert tree_equal(got, tree_map(operator.neg, tree))
+
+
+def test_tree_map_async_with_multiple_trees(tree):
+    got = asyncio.run(tree_map_async(_negate, tree, tree))
+    assert tree_equal(got, tree_map(lambda x: -2 * x, tree))
+
+
+def test_tree_map_async_respects_concurrency():
+    running, peak = [0], [0]
+
+    async def track(x):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.001)
+        running[0] -= 1
+        return x
+
+    asyncio.run(tree_map_async(track, list(range(20)), concurrency=4))
+    assert peak[0] == 4
+
+
+def test_tree_map_async_reports_leaf_name(tree):
+    tree["b"]["c"] = "fail"
+    with pytest.raises(LeafEvaluationError, match="'b_c'") as excinfo:
+        asyncio.run(tree_map_async(_negate, tree, concurrency=2))
+    assert excinfo.value.name == "b_c"
+    assert isinstance(excinfo.value.__cause__, RuntimeError)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.paths import leaf_paths
+from pybaum.registry import get_registry
+from pybaum.tree_util import leaf_names
+
+
+@pytest.fixture
+def tree():
+    df = pd.DataFrame({"a": [1, 2], "b": [3, 4]}, index=[("x", 0), ("y", 1)])
+    return {
+        "a": [0, np.arange(6).reshape(2, 3), {"b": 1, "c": None}, 2],
+        "d": (pd.Series([3, 4], index=["e", "f"]), df),
+        "g": np.array(5.0),
+        "h": 6,
+    }
+
+
+@pytest.fixture
+def registry():
+    return get_registry(types=["numpy.ndarray", "pandas.Series", "pandas.DataFrame"])
+
+
+@pytest.mark.parametrize("separator", ["_", "/"])
+def test_leaf_paths_match_leaf_names(tree, registry, separator):
+    paths = leaf_paths(tree, registry=registry, separator=separator)
+    names = leaf_names(tree, registry=registry, separator=separator)
+    assert len(paths) == len(names)
+    assert list(paths) == names
+    assert paths.to_list() == names
+    assert paths[-1] == names[-1]
+
+
+def test_leaf_paths_of_arrays_that_contain_containers(registry):
+    objects = np.empty(3, dtype=object)
+    objects[:] = [{"a": 1}, [2, np.arange(2)], 3]
+    tree = {
+        "objects": objects,
+        "df": pd.DataFrame({"a": [1.0, 2.0], "b": ["x", {"c": 3}]}),
+        "empty": [np.zeros((0, 2)), {}],
+    }
+    paths = leaf_paths(tree, registry=registry)
+    names = leaf_names(tree, registry=registry)
+    assert list(paths) == names
+    assert [paths.index(name) for name in names] == list(range(len(names)))
+
+
+def test_index_of_names_and_paths(tree, registry):
+    paths = leaf_paths(tree, registry=registry)
+    for position, name in enumerate(leaf_names(tree, registry=registry)):
+        assert paths.index(name) == position
+        assert paths.index(paths.path(position)) == position
+
+
+def test_path(tree, registry):
+    paths = leaf_paths(tree, registry=registry)
+    assert paths.path(2) == ("a", "1", "0_1")
+    assert paths.path(-1) == ("h",)
+
+
+def test_index_of_unknown_name_raises(tree, registry):
+    paths = leaf_paths(tree, registry=registry)
+    for key in ["a_1_2_0", "a_1", "a_4", "x", ("a", "2", "c"), ()]:
+        with pytest.raises(ValueError):
+            paths.index(key)
+    with pytest.raises(IndexError):
+        paths.path(100)
+
+
+def test_leaf_paths_of_leaf():
+    paths = leaf_paths(1)
+    assert list(paths) == leaf_names(1)
+    assert paths.index(()) == 0
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+from pybaum.profiling import profile
+from pybaum.registry import get_registry
+from pybaum.tree_util import leaf_names
+from pybaum.tree_util import tree_flatten
+from pybaum.tree_util import tree_map
+from pybaum.tree_util import tree_unflatten
+
+
+@pytest.fixture()
+def tree():
+    return {"a": [1, 2], "b": ({"c": 3}, 4)}
+
+
+def test_profile_counts_registry_calls(tree):
+    with profile() as prof:
+        flat, treedef = tree_flatten(tree)
+        tree_unflatten(treedef, flat)
+        leaf_names(tree)
+
+    assert prof.calls("dict", "flatten") == 4
+    assert prof.calls("tuple", "flatten") == 2
+    assert prof.calls("list", "unflatten") == 1
+    assert prof.calls("dict", "names") == 2
+
+
+def test_profile_counts_visited_nodes_including_leaves(tree):
+    tree = {**tree, "d": list(range(10))}
+    with profile() as prof:
+        tree_flatten(tree)
+        tree_flatten(tree)
+
+    assert prof.calls("dict", "dispatch") == 4
+    assert prof.calls("list", "dispatch") == 4
+    assert prof.calls("tuple", "dispatch") == 2
+    assert prof.calls("int", "dispatch") == 28
+    assert all(row["time_ns"] > 0 for row in prof.stats() if row["name"] == "dispatch")
+
+
+def test_profile_restores_registries(tree):
+    registry = get_registry()
+    with profile() as prof:
+        instrumented = get_registry()
+        assert instrumented is not registry
+        assert get_registry() is instrumented
+    assert get_registry() is registry
+
+    tree_map(lambda x: x, tree, registry=instrumented)
+    assert prof.stats() == []
+
+
+def test_profile_instrument_and_wrap(tree):
+    registry = get_registry(types=["numpy.ndarray"])
+    tree = {"a": np.arange(4), "b": 1}
+    with profile(memory=True) as prof:
+        tree_map(prof.wrap(abs), tree, registry=prof.instrument(registry))
+
+    assert prof.calls("ndarray", "flatten") == 1
+    assert prof.calls("func", "abs") == 5
+    assert all(row["allocated_bytes"] is not None for row in prof.stats())
+    assert "other" in prof.summary().splitlines()[-1]
+
+
+def test_profile_chrome_trace(tree, tmp_path):
+    with profile(trace=True) as prof:
+        tree_flatten(tree)
+
+    path = tmp_path / "trace.json"
+    prof.to_chrome_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert len(events) == sum(row["calls"] for row in prof.stats())
+    assert {event["ph"] for event in events} == {"X"}
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.registry import get_dispatch_table
+from pybaum.registry import get_registry
+from pybaum.registry import Registry
+from pybaum.registry_entries import _index_element_to_string
+from pybaum.registry_entries import _index_strings
+
+
+def test_get_registry_is_cached():
+    assert get_registry() is get_registry()
+    assert get_registry(types=["numpy.ndarray"]) is get_registry(
+        types=("numpy.ndarray",)
+    )
+    assert get_registry() is not get_registry(types=["numpy.ndarray"])
+
+
+def test_registry_is_immutable_and_hashable():
+    registry = get_registry()
+    assert isinstance(registry, Registry)
+    with pytest.raises(TypeError):
+        registry[set] = registry[list]
+    with pytest.raises(TypeError):
+        registry[list]["flatten"] = None
+    assert {registry: 1}[get_registry()] == 1
+
+
+def test_registry_can_be_extended_with_dict():
+    registry = {**get_registry(), set: get_registry()[list]}
+    assert set(registry) == set(get_registry()) | {set}
+    assert Registry(registry) == registry
+
+
+def test_registry_owns_dispatch_table():
+    registry = get_registry()
+    assert get_dispatch_table(registry) is get_dispatch_table(registry)
+    assert get_dispatch_table(registry) is not get_dispatch_table(dict(registry))
+
+
+def test_include_defaults():
+    assert set(get_registry(types=["list"], include_defaults=False)) == {list}
+
+
+def test_array_block_entries_do_not_copy():
+    entry = get_registry(types=["numpy.ndarray"])[np.ndarray]
+    arr = np.arange(6.0).reshape(2, 3)
+    flat, aux_data = entry["flatten_block"](arr)
+    assert np.shares_memory(flat, arr)
+    unflat = entry["unflatten_block"](aux_data, flat[:6])
+    assert np.shares_memory(unflat, arr)
+    np.testing.assert_array_equal(unflat, arr)
+
+
+def test_array_entries_flatten_into_python_scalars():
+    entry = get_registry(types=["numpy.ndarray"])[np.ndarray]
+    arr = np.arange(6).reshape(2, 3)
+    flat, aux_data = entry["flatten"](arr)
+    assert flat == [0, 1, 2, 3, 4, 5]
+    assert all(type(leaf) is int for leaf in flat)
+    np.testing.assert_array_equal(entry["unflatten"](aux_data, flat), arr)
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        pd.Index(["a", "b"]),
+        pd.Index([1, -2]),
+        pd.Index([0.1, np.nan]),
+        pd.Index([True, False]),
+        pd.MultiIndex.from_tuples([("a", 1), ("b", np.nan), ("b", 2.5)]),
+        pd.Index([("c", 1), ("d", 2)], tupleize_cols=False),
+    ],
+)
+def test_index_strings_match_element_wise_conversion(index):
+    expected = [_index_element_to_string(element) for element in index]
+    assert _index_strings(index).tolist() == expected
+
+
+def test_index_strings_are_cached():
+    index = pd.Index(["a", "b"])
+    assert _index_strings(index) is _index_strings(index)
+    assert _index_strings(index) is not _index_strings(pd.Index(["a", "b"]))
@@ -0,0 +1,92 @@
+from collections import namedtuple
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.registry import get_registry
+from pybaum.serialization import ALIGNMENT
+from pybaum.serialization import tree_load
+from pybaum.serialization import tree_save
+from pybaum.tree_util import tree_equal
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+class Pair:
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+
+PAIR_REGISTRY = {
+    **get_registry(),
+    Pair: {
+        "flatten": lambda pair: ([pair.first, pair.second], None),
+        "unflatten": lambda aux_data, children: Pair(*children),  # noqa: U100
+        "names": lambda pair: ["first", "second"],  # noqa: U100
+    },
+}
+
+
+@pytest.fixture()
+def tree():
+    df = pd.DataFrame(
+        {
+            "value": [1.5, 2.5, 3.5],
+            "count": [1, 2, 3],
+            "name": ["a", "b", "c"],
+            "group": pd.Categorical(["x", "y", "x"]),
+        },
+        index=pd.MultiIndex.from_tuples([("a", 0), ("a", 1), ("b", 0)]),
+    )
+    return {
+        "a": np.arange(12.0).reshape(3, 4),
+        "b": np.arange(12).reshape(3, 4)[:, ::2],
+        "c": [np.array(5.0), pd.Series([1, 2], index=["x", "y"], name="s"), df],
+        "d": Point(1, "text"),
+        "e": OrderedDict([("f", None), ("g", np.array(["2020-01-01"], "M8[ns]"))]),
+    }
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load(tree, tmp_path, mmap):
+    path = tmp_path / "tree.pybaum"
+    tree_save(path, tree)
+    loaded = tree_load(path, mmap=mmap)
+    assert tree_equal(loaded, tree)
+    assert loaded["c"][2].dtypes.tolist() == tree["c"][2].dtypes.tolist()
+    assert loaded["a"].flags.writeable is not mmap
+
+
+def test_load_maps_aligned_buffers(tree, tmp_path):
+    path = tmp_path / "tree.pybaum"
+    tree_save(path, tree, registry=get_registry(types=["numpy.ndarray"]))
+    loaded = tree_load(path)
+    assert type(loaded["a"]) is np.ndarray
+    assert loaded["a"].ctypes.data % ALIGNMENT == 0
+
+    # The loaded column is a view into the file, so changes of the file are visible.
+    content = path.read_bytes()
+    position = content.find(np.array([1.5, 2.5, 3.5]).tobytes())
+    with open(path, "r+b") as f:
+        f.seek(position)
+        f.write(np.array([4.0]).tobytes())
+    assert loaded["c"][2]["value"].tolist() == [4.0, 2.5, 3.5]
+
+
+def test_save_and_load_custom_container(tmp_path):
+    tree = {"pair": Pair(np.ones(3), [1, 2])}
+    path = tmp_path / "tree.pybaum"
+    tree_save(path, tree, registry=PAIR_REGISTRY)
+    loaded = tree_load(path, registry=PAIR_REGISTRY)
+    assert isinstance(loaded["pair"], Pair)
+    assert loaded["pair"].second == [1, 2]
+    np.testing.assert_array_equal(loaded["pair"].first, np.ones(3))
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.npy"
+    np.save(path, np.ones(3))
+    with pytest.raises(ValueError, match="not a file written by tree_save"):
+        tree_load(path)
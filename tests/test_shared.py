@@ -0,0 +1,74 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.shared import SharedTree
+from pybaum.tree_util import tree_equal
+
+
+@pytest.fixture()
+def tree():
+    return {
+        "a": np.arange(10.0).reshape(2, 5),
+        "b": [pd.DataFrame({"x": [1.5, 2.5], "y": ["u", "v"]}), 3],
+        "c": pd.Series([1, 2], index=["p", "q"]),
+    }
+
+
+def _sum_of_a(shared):
+    tree = shared.to_tree()
+    out = float(tree["a"].sum())
+    del tree
+    shared.close()
+    return out
+
+
+def _double_a(shared):
+    tree = shared.to_tree()
+    tree["a"] *= 2
+    del tree
+    shared.close()
+
+
+def test_shared_tree_round_trip(tree):
+    with SharedTree(tree) as shared:
+        result = shared.to_tree()
+        assert tree_equal(result, tree)
+        del result
+
+
+def test_pickle_only_contains_header(tree):
+    tree["a"] = np.zeros(100_000)
+    with SharedTree(tree) as shared:
+        assert len(pickle.dumps(shared)) < 10_000
+        other = pickle.loads(pickle.dumps(shared))
+        result = other.to_tree()
+        assert tree_equal(result, tree)
+        del result
+        other.close()
+        with pytest.raises(RuntimeError, match="Only the process"):
+            other.unlink()
+
+
+def test_exit_unlinks_if_views_still_exist(tree):
+    with pytest.raises(BufferError):
+        with SharedTree(tree) as shared:
+            result = shared.to_tree()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=shared.name)
+    del result
+    shared.close()
+
+
+@pytest.mark.slow()
+def test_shared_tree_in_worker_processes(tree):
+    with SharedTree(tree) as shared:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            assert list(pool.map(_sum_of_a, [shared] * 2)) == [45.0, 45.0]
+            pool.submit(_double_a, shared).result()
+        result = shared.to_tree()
+        assert result["a"].sum() == 90.0
+        del result
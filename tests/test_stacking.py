@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.registry import get_registry
+from pybaum.stacking import tree_stack
+from pybaum.stacking import tree_unstack
+from pybaum.tree_util import tree_equal
+
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+def _make_tree(i):
+    return {
+        "a": float(i),
+        "b": [np.arange(6.0).reshape(2, 3) + i, Point(i, -i)],
+        "c": pd.Series([1.0, 2.0], index=["x", "y"], name="s") + i,
+        "d": pd.DataFrame({"value": [1.0, 2.0], "lower": [0, 0]}) + i,
+    }
+
+
+@pytest.fixture
+def trees():
+    return [_make_tree(i) for i in range(3)]
+
+
+EXTENDED_TYPES = ["numpy.ndarray", "pandas.Series", "pandas.DataFrame", "namedtuple"]
+
+
+@pytest.mark.parametrize("types", [None, EXTENDED_TYPES])
+def test_stack_and_unstack_round_trip(trees, types):
+    registry = get_registry(types=types)
+    stacked = tree_stack(trees, registry=registry)
+    assert tree_equal(stacked["a"], np.array([0.0, 1.0, 2.0]))
+    assert stacked["b"][0].shape == (3, 2, 3)
+    assert tree_equal(stacked["b"][1], Point(np.arange(3), -np.arange(3)))
+    assert stacked["c"].shape == (6,)
+    assert stacked["d"].shape == (6, 2)
+
+    unstacked = tree_unstack(stacked, registry=registry)
+    assert len(unstacked) == 3
+    for tree, expected in zip(unstacked, trees):
+        assert tree_equal(tree, expected)
+
+
+def test_stack_along_other_axis(trees):
+    registry = get_registry(types=["namedtuple"])
+    stacked = tree_stack(trees, axis=-1, registry=registry)
+    assert stacked["b"][0].shape == (2, 3, 3)
+    unstacked = tree_unstack(stacked, axis=-1, registry=registry)
+    for tree, expected in zip(unstacked, trees):
+        assert tree_equal(tree, expected)
+
+
+def test_unstack_returns_views():
+    stacked = {"a": np.arange(6.0).reshape(3, 2), "b": np.arange(3)}
+    unstacked = tree_unstack(stacked)
+    assert np.shares_memory(unstacked[1]["a"], stacked["a"])
+    unstacked = tree_unstack(stacked["a"], axis=1)
+    assert np.shares_memory(unstacked[0], stacked["a"])
+    sr = tree_stack([pd.Series([1.0, 2.0]), pd.Series([3.0, 4.0])])
+    unstacked = tree_unstack(sr)
+    assert np.shares_memory(unstacked[1].to_numpy(), sr.to_numpy())
+
+
+def test_stack_different_structures_raises(trees):
+    trees[1]["e"] = 1
+    with pytest.raises(ValueError, match="same structure"):
+        tree_stack(trees)
+
+
+def test_stack_different_shapes_raises(trees):
+    trees[1]["b"][0] = np.ones(3)
+    with pytest.raises(ValueError):
+        tree_stack(trees)
+    trees[1]["b"][0] = np.ones((2, 3))
+    trees[1]["c"] = pd.Series([1.0])
+    with pytest.raises(ValueError, match="same shape"):
+        tree_stack(trees)
+
+
+def test_stack_empty_list_raises():
+    with pytest.raises(ValueError, match="at least one"):
+        tree_stack([])
+
+
+def test_unstack_invalid_trees_raise():
+    with pytest.raises(ValueError, match="same length"):
+        tree_unstack({"a": np.arange(2), "b": np.arange(3)})
+    with pytest.raises(ValueError, match="without leaves"):
+        tree_unstack({"a": []})
+    with pytest.raises(ValueError, match="outer level"):
+        tree_unstack({"a": pd.Series([1.0, 2.0])})
+
+
+def test_unstack_sliced_pandas_objects():
+    stacked = tree_stack([pd.Series([1.0, 2.0, 3.0]) + 10 * i for i in range(3)])
+    unstacked = tree_unstack(stacked.loc[[0, 1]])
+    assert len(unstacked) == 2
+    assert tree_equal(unstacked[1], pd.Series([11.0, 12.0, 13.0]))
+
+    stacked = tree_stack([pd.DataFrame({"a": [1, 2]}) + i for i in range(3)])
+    unstacked = tree_unstack({"b": stacked.loc[[0, 2]], "c": np.arange(2)})
+    assert len(unstacked) == 2
+    assert tree_equal(unstacked[1]["b"], pd.DataFrame({"a": [3, 4]}))
+    assert unstacked[1]["c"] == 1
+
+
+def test_unstack_pandas_objects_with_mixed_trees_raises():
+    stacked = tree_stack([pd.Series([1.0, 2.0]), pd.Series([3.0, 4.0])])
+    with pytest.raises(ValueError, match="contiguous"):
+        tree_unstack(stacked.iloc[[0, 2, 1]])
@@ -1,6 +1,7 @@
 import inspect
 from collections import namedtuple
 from collections import OrderedDict
+from fractions import Fraction
 
 import numpy as np
 import pandas as pd
@@ -10,11 +11,16 @@ from pybaum.registry import get_registry
 from pybaum.tree_util import leaf_names
 from pybaum.tree_util import tree_equal
 from pybaum.tree_util import tree_flatten
+from pybaum.tree_util import tree_just_flatten
+from pybaum.tree_util import tree_just_yield
 from pybaum.tree_util import tree_map
 from pybaum.tree_util import tree_multimap
+from pybaum.tree_util import tree_to_vector
 from pybaum.tree_util import tree_unflatten
 from pybaum.tree_util import tree_update
 from pybaum.tree_util import tree_yield
+from pybaum.tree_util import vector_to_tree
+from pybaum.treedef import PyTreeDef
 
 
 @pytest.fixture
@@ -32,12 +38,7 @@ def example_flat():
 
 @pytest.fixture
 def example_treedef(example_tree):
-    return example_tree
-
-
-@pytest.fixture
-def extended_treedef(example_tree):
-    return example_tree
+    return tree_flatten(example_tree)[1]
 
 
 @pytest.fixture
@@ -46,16 +47,23 @@ def extended_registry():
     return get_registry(types=types)
 
 
-def test_tree_flatten(example_tree, example_flat, example_treedef):
+@pytest.fixture
+def extended_treedef(example_tree, extended_registry):
+    return tree_flatten(example_tree, registry=extended_registry)[1]
+
+
+def test_tree_flatten(example_tree, example_flat):
     flat, treedef = tree_flatten(example_tree)
-    assert treedef == example_treedef
+    assert isinstance(treedef, PyTreeDef)
+    assert treedef.num_leaves == 5
+    assert treedef.num_nodes == 8
     _assert_list_with_arrays_is_equal(flat, example_flat)
 
 
-def test_extended_tree_flatten(example_tree, extended_treedef, extended_registry):
+def test_extended_tree_flatten(example_tree, extended_registry):
     flat, treedef = tree_flatten(example_tree, registry=extended_registry)
     assert flat == list(range(7))
-    assert tree_equal(treedef, extended_treedef)
+    assert treedef.num_leaves == 7
 
 
 def test_tree_flatten_with_is_leave(example_tree, extended_registry):
@@ -188,7 +196,7 @@ def test_flatten_df_all_columns():
 def test_tree_yield(example_tree, example_treedef, example_flat):
     generator, treedef = tree_yield(example_tree)
 
-    assert tree_equal(treedef, example_treedef)
+    assert treedef == example_treedef
     assert inspect.isgenerator(generator)
     for a, b in zip(generator, example_flat):
         if isinstance(a, (np.ndarray, pd.Series)):
@@ -200,7 +208,8 @@ def test_tree_yield(example_tree, example_treedef, example_flat):
 def test_flatten_with_none():
     flat, treedef = tree_flatten(None)
     assert flat == []
-    assert treedef is None
+    assert treedef.num_leaves == 0
+    assert tree_unflatten(treedef, flat) is None
 
 
 def test_leaf_names_with_none():
@@ -210,8 +219,9 @@ def test_leaf_names_with_none():
 
 def test_flatten_with_namedtuple():
     bla = namedtuple("bla", ["a", "b"])(1, 2)
-    flat, _ = tree_flatten(bla)
+    flat, treedef = tree_flatten(bla)
     assert flat == [1, 2]
+    assert tree_unflatten(treedef, [3, 4]) == bla._replace(a=3, b=4)
 
 
 def test_names_with_namedtuple():
@@ -230,3 +240,232 @@ def test_names_with_ordered_dict():
     d = OrderedDict({"a": 1, "b": 2})
     names = leaf_names(d)
     assert names == ["a", "b"]
+
+
+def test_tree_to_vector_and_back(example_tree, extended_registry):
+    vector, treedef = tree_to_vector(example_tree, registry=extended_registry)
+    assert vector.dtype == np.float64
+    aaae(vector, np.arange(7))
+    assert treedef.num_leaves == 7
+
+    unflat = vector_to_tree(vector, treedef)
+    new_vector, new_treedef = tree_to_vector(unflat, registry=extended_registry)
+    aaae(new_vector, vector)
+    assert new_treedef == treedef
+    assert np.shares_memory(unflat[0][1], vector)
+    assert np.shares_memory(unflat[0][2]["a"].to_numpy(), vector)
+
+
+def test_vector_to_tree_with_dataframe():
+    registry = get_registry(types=["pandas.DataFrame", "numpy.ndarray"])
+    tree = {"df": pd.DataFrame({"a": [1.0, 2.0], "b": [3.0, 4.0]}), "x": np.eye(2)}
+    vector, treedef = tree_to_vector(tree, registry=registry)
+    aaae(vector, [1, 3, 2, 4, 1, 0, 0, 1])
+    unflat = vector_to_tree(vector, treedef)
+    assert tree_equal(unflat, tree)
+    assert np.shares_memory(unflat["x"], vector)
+
+
+def test_tree_to_vector_with_array_leaves_raises():
+    with pytest.raises(ValueError):
+        tree_to_vector([1, np.arange(3)])
+
+
+@pytest.mark.parametrize("tree", [{"a": np.arange(3.0)}, [np.ones(2), np.zeros(2)]])
+def test_tree_to_vector_with_only_array_leaves_raises(tree):
+    with pytest.raises(ValueError, match="scalars"):
+        tree_to_vector(tree)
+
+
+@pytest.fixture
+def deep_tree():
+    tree = 0
+    for i in range(1, 10_000):
+        tree = [tree, i]
+    return tree
+
+
+def test_flatten_and_unflatten_deep_tree(deep_tree):
+    flat, treedef = tree_flatten(deep_tree)
+    assert flat == list(range(10_000))
+    assert treedef.num_nodes == 19_999
+    assert tree_just_flatten(deep_tree) == flat
+    assert list(tree_just_yield(deep_tree)) == flat
+
+    unflat = tree_unflatten(treedef, flat)
+    assert tree_just_flatten(unflat) == flat
+
+    mapped = tree_map(lambda x: -x, deep_tree)
+    assert tree_just_flatten(mapped) == [-i for i in range(10_000)]
+
+
+def test_leaf_names_deep_tree():
+    tree = {"a": 1}
+    for _ in range(10_000):
+        tree = [tree]
+    assert leaf_names(tree, separator="") == ["0" * 10_000 + "a"]
+
+
+def test_changes_of_registry_are_respected():
+    registry = dict(get_registry())
+    assert tree_just_flatten([1, (2, 3)], registry=registry) == [1, 2, 3]
+    del registry[tuple]
+    assert tree_just_flatten([1, (2, 3)], registry=registry) == [1, (2, 3)]
+
+
+def test_tree_multimap_with_different_structures_raises():
+    tree = {"a": [1, 2], "b": (3, {"c": 4})}
+    with pytest.raises(ValueError, match="first mismatch is between"):
+        tree_multimap(lambda x, y: x + y, tree, {"a": [1, 2], "b": (3, {"d": 4})})
+    with pytest.raises(ValueError, match="same structure"):
+        tree_multimap(lambda x, y: x + y, tree, {"a": [1, 2], "b": (3, 4)})
+    with pytest.raises(ValueError, match="same structure"):
+        tree_multimap(lambda x, y: x + y, tree, {"a": [1, 2, 3], "b": (3, {"c": 4})})
+
+
+def test_tree_map_preserves_container_types():
+    point = namedtuple("point", ["x", "y"])
+    tree = OrderedDict([("b", point(1, [2, (3,)])), ("a", None)])
+    mapped = tree_map(lambda x: x + 1, tree)
+    assert mapped == OrderedDict([("b", point(2, [3, (4,)])), ("a", None)])
+    assert type(mapped["b"]) is point
+
+
+def test_tree_update_shares_unchanged_subtrees():
+    tree = {"a": {"b": [1, 2]}, "c": {"d": 3}, "e": [4, 5]}
+    updated = tree_update(tree, {"a": {"b": [6]}, "e": [4]})
+    assert updated == {"a": {"b": [6, 2]}, "c": {"d": 3}, "e": [4, 5]}
+    assert updated["c"] is tree["c"]
+    assert updated["e"] is tree["e"]
+    assert tree == {"a": {"b": [1, 2]}, "c": {"d": 3}, "e": [4, 5]}
+
+
+def test_tree_update_does_not_confuse_paths_with_separator():
+    tree = {"a_b": 1, "a": {"b": 2}}
+    assert tree_update(tree, {"a": {"b": 3}}) == {"a_b": 1, "a": {"b": 3}}
+    assert tree_update(tree, {"a_b": 4}) == {"a_b": 4, "a": {"b": 2}}
+
+
+def test_tree_update_with_incompatible_other_raises():
+    tree = {"a": [1, 2], "b": 3}
+    with pytest.raises(ValueError, match="not in tree"):
+        tree_update(tree, {"c": 1})
+    with pytest.raises(ValueError, match="container"):
+        tree_update(tree, {"a": 1})
+    with pytest.raises(ValueError, match="leaf"):
+        tree_update(tree, {"b": [1]})
+
+
+def test_tree_update_reports_path_of_deeply_nested_error():
+    tree = other = 1
+    for _ in range(2000):
+        tree, other = {"a": tree}, {"a": other}
+    tree["b"], other["b"] = [1], {"c": 2}
+    updated = tree_update(tree, {"a": other["a"]})
+    assert updated["a"] is tree["a"]
+    with pytest.raises(ValueError, match=r"\('b', 'c'\) of other"):
+        tree_update(tree, other)
+
+
+def test_tree_equal_compares_names_of_other():
+    assert not tree_equal({"a": 1}, {"b": 1})
+    assert not tree_equal({"a": [1, 2]}, {"a": [1, 2, 3]})
+    assert not tree_equal({"a": [1, 2]}, {"a": 1})
+
+
+def test_tree_equal_stops_at_first_difference():
+    calls = []
+
+    def check(a, b):
+        calls.append(a)
+        return a == b
+
+    tree = {"a": [Fraction(0), Fraction(1)], "b": [Fraction(2)] * 100}
+    other = {"a": [Fraction(0), Fraction(3)], "b": [Fraction(2)] * 100}
+    assert not tree_equal(tree, other, equality_checkers={Fraction: check})
+    assert calls == [0, 1]
+
+
+def test_tree_equal_compares_arrays_as_a_whole(extended_registry):
+    tree = {"a": np.arange(3.0), "b": pd.DataFrame({"c": [1.0, 2.0]})}
+    assert tree_equal(tree, tree_map(lambda x: x, tree), registry=extended_registry)
+    other = {**tree, "a": np.array([0.0, 1.0, 2.5])}
+    assert not tree_equal(tree, other, registry=extended_registry)
+    assert not tree_equal(
+        tree, {**tree, "a": np.arange(4.0)}, registry=extended_registry
+    )
+
+
+def test_tree_equal_compares_pandas_objects_like_their_elements(extended_registry):
+    int_df = pd.DataFrame({"c": [1, 2]})
+    assert tree_equal(int_df, int_df.astype(float), registry=extended_registry)
+    sr = pd.Series([1.0, np.nan])
+    assert not tree_equal(sr, sr.copy(), registry=extended_registry)
+    assert tree_equal(sr, sr.copy(), registry=extended_registry) == tree_equal(
+        sr.to_numpy(), sr.to_numpy(), registry=extended_registry
+    )
+
+
+def test_tree_equal_with_tolerance():
+    tree = {"a": [1.0, np.array([2.0, 3.0])], "b": "x"}
+    other = {"a": [1.0 + 1e-9, np.array([2.0, 3.0 + 1e-9])], "b": "x"}
+    assert not tree_equal(tree, other)
+    assert tree_equal(tree, other, atol=1e-8)
+    assert tree_equal(tree, other, rtol=1e-8)
+    assert not tree_equal(tree, {**other, "b": "y"}, atol=1e-8)
+    assert not tree_equal(tree, {"a": [1.1, other["a"][1]], "b": "x"}, rtol=1e-8)
+
+
+@pytest.mark.parametrize("extended", [False, True])
+def test_tree_equal_with_tolerance_and_non_numeric_dtypes(extended, extended_registry):
+    registry = extended_registry if extended else None
+    df = pd.DataFrame({"value": [1.0, 2.0], "lower_bound": [0, 0], "name": ["a", "b"]})
+    close = df.assign(value=[1.0, 2.0 + 1e-9])
+    assert tree_equal({"p": df}, {"p": close}, rtol=1e-8, registry=registry)
+    assert not tree_equal(
+        {"p": df}, {"p": close.assign(name=["a", "c"])}, rtol=1e-8, registry=registry
+    )
+
+    strings = np.array(["a", "b"])
+    assert tree_equal(strings, strings.copy(), atol=1e-8, registry=registry)
+    assert not tree_equal(strings, np.array(["a", "c"]), atol=1e-8, registry=registry)
+
+
+def test_dataframe_round_trip_preserves_dtypes():
+    registry = get_registry(types=["pandas.DataFrame"])
+    df = pd.DataFrame(
+        {
+            "value": np.arange(3, dtype=np.float32),
+            "lower_bound": [-1, 0, 1],
+            "name": ["a", "b", "c"],
+            "fixed": [True, False, True],
+        },
+        index=["x", "y", "z"],
+    )
+    flat, treedef = tree_flatten(df, registry=registry)
+    assert flat[:4] == [0.0, -1, "a", True]
+    assert leaf_names(df, registry=registry)[:4] == [
+        "x_value",
+        "x_lower_bound",
+        "x_name",
+        "x_fixed",
+    ]
+    unflat = tree_unflatten(treedef, flat)
+    pd.testing.assert_frame_equal(unflat, df)
+    assert unflat.index is df.index
+
+
+def test_empty_dataframe_round_trip_preserves_dtypes():
+    registry = get_registry(types=["pandas.DataFrame"])
+    df = pd.DataFrame(
+        {
+            "value": np.array([], dtype=np.float32),
+            "lower_bound": np.array([], dtype=np.int64),
+            "fixed": np.array([], dtype=bool),
+            "group": pd.Categorical([]),
+        }
+    )
+    flat, treedef = tree_flatten(df, registry=registry)
+    assert flat == []
+    unflat = tree_unflatten(treedef, flat)
+    pd.testing.assert_frame_equal(unflat, df)
@@ -0,0 +1,73 @@
+import pickle
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+from pybaum.registry import get_registry
+from pybaum.tree_util import tree_equal
+from pybaum.tree_util import tree_flatten
+from pybaum.tree_util import tree_unflatten
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+@pytest.fixture
+def tree():
+    return {"a": [1, (2, 3)], "b": Point(4, 5), "c": None}
+
+
+def test_num_leaves_and_num_nodes(tree):
+    _, treedef = tree_flatten(tree)
+    assert treedef.num_leaves == 5
+    assert treedef.num_nodes == 10
+
+
+def test_treedef_does_not_depend_on_leaf_values(tree):
+    _, treedef = tree_flatten(tree)
+    _, other_treedef = tree_flatten(tree_unflatten(treedef, list("abcde")))
+    assert treedef == other_treedef
+    assert hash(treedef) == hash(other_treedef)
+
+
+def test_treedef_with_different_structure_is_not_equal(tree):
+    _, treedef = tree_flatten(tree)
+    _, other_treedef = tree_flatten({**tree, "d": 6})
+    assert treedef != other_treedef
+
+
+def test_treedef_unflatten(tree):
+    flat, treedef = tree_flatten(tree)
+    assert treedef.unflatten(flat) == tree
+
+
+def test_treedef_unflatten_with_wrong_number_of_leaves(tree):
+    _, treedef = tree_flatten(tree)
+    with pytest.raises(ValueError):
+        treedef.unflatten([1, 2])
+
+
+def test_treedef_children(tree):
+    _, treedef = tree_flatten(tree)
+    children = treedef.children()
+    assert [child.num_leaves for child in children] == [3, 2, 0]
+    assert children[0].unflatten([1, 2, 3]) == [1, (2, 3)]
+    assert tree_flatten(2)[1].children() == []
+
+
+def test_treedef_holds_no_leaves():
+    registry = get_registry(types=["numpy.ndarray", "pandas.DataFrame"])
+    tree = {"a": np.arange(3), "b": pd.DataFrame({"c": [1.0, 2.0]})}
+    _, treedef = tree_flatten(tree, registry=registry)
+    _, other_treedef = tree_flatten(
+        {"a": np.zeros(3), "b": pd.DataFrame({"c": [3.0, 4.0]})}, registry=registry
+    )
+    assert treedef == other_treedef
+    assert hash(treedef) == hash(other_treedef)
+
+
+def test_treedef_can_be_pickled(tree):
+    flat, treedef = tree_flatten(tree)
+    unpickled = pickle.loads(pickle.dumps(treedef))
+    assert unpickled == treedef
+    assert tree_equal(unpickled.unflatten(flat), tree)
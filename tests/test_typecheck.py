@@ -1,6 +1,9 @@
 from collections import namedtuple
 from typing import NamedTuple
 
+import numpy as np
+import pandas as pd
+from pybaum.typecheck import _whole_is_leaf
 from pybaum.typecheck import get_type
 
 
@@ -20,3 +23,19 @@ def test_typed_namedtuple_is_discovered():
 
 def test_standard_tuple_is_not_discovered():
     assert get_type((1, 2)) == tuple
+
+
+def test_namedtuple_is_discovered_after_plain_tuple():
+    bla = namedtuple("bla", ["a", "b"])(1, 2)
+    assert get_type((1, 2)) == tuple
+    assert get_type(bla) == "namedtuple"
+    assert get_type(bla) == "namedtuple"
+
+
+def test_whole_is_leaf_treats_arrays_and_pandas_objects_as_leaves():
+    is_leaf = _whole_is_leaf(lambda obj: isinstance(obj, str))
+    for obj in [np.arange(2), np.float64(1), pd.Series([1]), pd.DataFrame({"a": [1]})]:
+        assert is_leaf(obj)
+    assert is_leaf("a")
+    assert not is_leaf([1, 2])
+    assert not is_leaf(pd.Index([1]))
@@ -5,6 +5,7 @@ from pybaum.tree_util import leaf_names
 from pybaum.tree_util import tree_equal
 from pybaum.tree_util import tree_flatten
 from pybaum.tree_util import tree_just_flatten
+from pybaum.tree_util import tree_unflatten
 
 if IS_JAX_INSTALLED:
     import jax.numpy as jnp
@@ -36,7 +37,7 @@ def test_tree_just_flatten_with_jax(tree, registry, flat):
 def test_tree_flatten_with_jax(tree, registry, flat):
     got_flat, got_treedef = tree_flatten(tree, registry=registry)
     assert got_flat == flat
-    assert tree_equal(got_treedef, tree)
+    assert tree_equal(tree_unflatten(got_treedef, got_flat), tree)
 
 
 def test_leaf_names_with_jax(tree, registry):